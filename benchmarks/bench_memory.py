@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Memory benchmark: peak memory of a photo generator run that writes the manifest.
+
+Builds (or reuses) a synthetic corpus and warms the metadata cache, then deletes the
+manifest so the next run has to write it, and measures that run in a fresh interpreter:
+peak traced Python allocations (tracemalloc) and peak RSS. Records are served from the
+cache, which is the common case for a large archive.
+
+Usage:
+    python benchmarks/bench_memory.py [--count 2000] [--corpus DIR]
+"""
+
+import argparse
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from corpus import make_photo_corpus, run_photo_generator
+
+PROLOGUE = """
+import tracemalloc
+tracemalloc.start()
+"""
+EPILOGUE = """
+import resource
+print(f"PEAK:{tracemalloc.get_traced_memory()[1]}")
+print(f"RSS:{resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}")
+"""
+
+
+def measure(web_root, photo_root, cache_file, argv=()):
+    """Returns (peak traced bytes, peak RSS in KiB, records) for a run writing the manifest."""
+    (web_root / "photo_manifest.json").unlink(missing_ok=True)
+    _, output = run_photo_generator(
+        web_root, photo_root, cache_file, argv, prologue=PROLOGUE, epilogue=EPILOGUE
+    )
+    values = dict(line.split(":", 1) for line in output.splitlines() if line.startswith(("PEAK:", "RSS:")))
+    records = sum(1 for _ in photo_root.rglob("*") if _.is_file())
+    return int(values["PEAK"]), int(values["RSS"]), records
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        web_root = Path(args.corpus) if args.corpus else Path(tmp) / "Web"
+        photo_root = web_root / "photos"
+        if not photo_root.exists():
+            print(f"Building corpus of {args.count} photos...")
+            make_photo_corpus(photo_root, args.count)
+        cache_file = Path(tmp) / "cache.json"
+        run_photo_generator(web_root, photo_root, cache_file)
+
+        peak, rss, records = measure(web_root, photo_root, cache_file)
+        print(f"Records:                  {records:10d}")
+        print(f"Peak traced allocations:  {peak / 2**20:10.1f} MiB ({peak / records:,.0f} bytes/record)")
+        print(f"Peak RSS:                 {rss / 2**10:10.1f} MiB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure peak memory of a manifest-writing generator run.")
+    parser.add_argument("--count", type=int, default=2000, help="Photos in the synthetic corpus (default: 2000).")
+    parser.add_argument("--corpus", type=str, help="Existing web root containing a photos/ corpus to reuse.")
+    main(parser.parse_args())
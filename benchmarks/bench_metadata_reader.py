@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Metadata reader benchmark: Pillow file objects against memory-mapped files.
+
+Builds (or reuses) a synthetic corpus and extracts the metadata of every photo with each
+reader of --metadata-reader, in the same process, with the files in the page cache. The
+passes alternate between the readers and the median pass is reported, so both see the
+same machine state. Python has no allocation counter; the memory columns come from
+tracemalloc instead: the mean and largest peak allocated while reading one file.
+
+Both readers must produce the same records: benchmarks/differential.py --candidate mmap
+checks that.
+
+Usage:
+    python benchmarks/bench_metadata_reader.py [--count 200] [--size 1600x1200] [--passes 5] [--corpus DIR]
+"""
+
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from corpus import make_photo_corpus
+
+from generate_manifest import EXTRACTION_STAGES, METADATA_READERS, extract_photo_metadata
+
+IMAGE_SUFFIXES = (".jpg", ".jpeg", ".avif")
+
+
+def time_pass(paths, reader):
+    """Returns the seconds one extraction pass over paths takes."""
+    start = time.perf_counter()
+    for path in paths:
+        extract_photo_metadata(path, EXTRACTION_STAGES, reader)
+    return time.perf_counter() - start
+
+
+def measure_allocations(paths, reader):
+    """Returns the mean and max of the peak bytes allocated per file, over one traced pass."""
+    peaks = []
+    tracemalloc.start()
+    try:
+        for path in paths:
+            tracemalloc.reset_peak()
+            current = tracemalloc.get_traced_memory()[0]
+            extract_photo_metadata(path, EXTRACTION_STAGES, reader)
+            peaks.append(tracemalloc.get_traced_memory()[1] - current)
+    finally:
+        tracemalloc.stop()
+    return statistics.mean(peaks), max(peaks)
+
+
+def main(args):
+    width, _, height = args.size.partition("x")
+    with tempfile.TemporaryDirectory() as tmp:
+        photo_root = Path(args.corpus) if args.corpus else Path(tmp) / "photos"
+        if not args.corpus:
+            print(f"Building corpus of {args.count} {args.size} photos...")
+            make_photo_corpus(photo_root, args.count, size=(int(width), int(height)))
+        paths = sorted(p for p in photo_root.rglob("*") if p.suffix.lower() in IMAGE_SUFFIXES)
+        if not paths:
+            print(f"Error: No photos in {photo_root}")
+            return 1
+        size = sum(p.stat().st_size for p in paths)
+        print(f"{len(paths)} photos, {size / len(paths) / 1024:.0f} KiB on average")
+
+        # Warm-up: imports, the page cache and Pillow's plugin registry
+        for reader in METADATA_READERS:
+            time_pass(paths, reader)
+        timings = {reader: [] for reader in METADATA_READERS}
+        for _ in range(args.passes):
+            for reader in METADATA_READERS:
+                timings[reader].append(time_pass(paths, reader))
+
+        print(f"\n{'Reader':8} {'files/s':>9} {'MiB/s':>8} {'peak KiB/file':>14} {'max KiB':>8}")
+        for reader in METADATA_READERS:
+            seconds = statistics.median(timings[reader])
+            mean_peak, max_peak = measure_allocations(paths, reader)
+            print(
+                f"{reader:8} {len(paths) / seconds:9.0f} {size / seconds / 2**20:8.1f} "
+                f"{mean_peak / 1024:14.1f} {max_peak / 1024:8.1f}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the throughput and allocations of the metadata readers.")
+    parser.add_argument("--count", type=int, default=200, help="Photos in the synthetic corpus (default: 200).")
+    parser.add_argument("--size", type=str, default="1600x1200", help="Size of the synthetic photos, WIDTHxHEIGHT (default: 1600x1200).")
+    parser.add_argument("--passes", type=int, default=5, help="Timed passes per reader (default: 5).")
+    parser.add_argument("--corpus", type=str, help="Existing folder of photos to read instead of a synthetic corpus.")
+    sys.exit(main(parser.parse_args()))
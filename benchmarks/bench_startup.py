@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark: wall time of a generator run with nothing to do.
+
+Builds (or reuses) a synthetic corpus, warms the metadata cache with one full run, then
+times repeated no-op runs and a --debug-image run in fresh interpreters. Also reports
+the import-time breakdown of generate_manifest and which heavy modules a no-op run ends
+up loading (ideally none).
+
+Usage:
+    python benchmarks/bench_startup.py [--count 500] [--runs 10] [--corpus DIR]
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from corpus import GENERATOR_ENV, REPO_ROOT, make_photo_corpus, run_photo_generator
+
+# Wall-time budget for a run with nothing to do
+TARGET_SECONDS = 0.100
+HEAVY_MODULES = ("PIL.Image", "pillow_avif", "exifread", "numpy", "jsonschema", "asyncio")
+
+
+def run_generator(web_root, photo_root, cache_file, argv=(), report_modules=False):
+    """Runs the photo generator in a fresh interpreter; returns (seconds, stdout)."""
+    epilogue = f'print("LOADED:" + ",".join(m for m in {HEAVY_MODULES!r} if m in sys.modules))'
+    return run_photo_generator(
+        web_root, photo_root, cache_file, argv, epilogue=epilogue if report_modules else ""
+    )
+
+
+def import_breakdown(module="generate_manifest", limit=8):
+    """Returns the slowest imports (cumulative microseconds) triggered by importing a module."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True, cwd=REPO_ROOT, env=GENERATOR_ENV,
+    )
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        # Only report direct imports (one level of indentation) and the module itself
+        depth = (len(name) - len(name.lstrip())) // 2
+        if depth <= 1:
+            entries.append((int(cumulative), name.strip()))
+    return sorted(entries, reverse=True)[:limit]
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        web_root = Path(args.corpus) if args.corpus else Path(tmp) / "Web"
+        photo_root = web_root / "photos"
+        if not photo_root.exists():
+            print(f"Building corpus of {args.count} photos...")
+            make_photo_corpus(photo_root, args.count)
+        cache_file = Path(tmp) / "cache.json"
+
+        seconds, _ = run_generator(web_root, photo_root, cache_file)
+        print(f"Cold run (extract + analyze):  {seconds * 1000:8.1f} ms")
+
+        timings = []
+        for _ in range(args.runs):
+            seconds, _ = run_generator(web_root, photo_root, cache_file)
+            timings.append(seconds)
+        _, output = run_generator(web_root, photo_root, cache_file, report_modules=True)
+        loaded = output.rsplit("LOADED:", 1)[-1].strip() or "none"
+        print(f"No-op run (median of {args.runs}):   {statistics.median(timings) * 1000:8.1f} ms "
+              f"(min {min(timings) * 1000:.1f} ms, target {TARGET_SECONDS * 1000:.0f} ms)")
+        print(f"Heavy modules loaded by no-op: {loaded}")
+
+        sample = next(photo_root.rglob("*.jpg"))
+        seconds, _ = run_generator(web_root, photo_root, cache_file, ["--debug-image", str(sample)])
+        print(f"--debug-image run:             {seconds * 1000:8.1f} ms")
+
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "pass"], check=True, env=GENERATOR_ENV)
+        baseline = time.perf_counter() - start
+        print(f"Bare interpreter:              {baseline * 1000:8.1f} ms")
+
+        print("\nSlowest imports of generate_manifest (cumulative):")
+        for microseconds, name in import_breakdown():
+            print(f"  {microseconds / 1000:7.1f} ms  {name}")
+
+        status = "PASS" if statistics.median(timings) <= TARGET_SECONDS else "FAIL"
+        print(f"\n{status}: no-op startup target of {TARGET_SECONDS * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark generator startup for runs with nothing to do.")
+    parser.add_argument("--count", type=int, default=500, help="Photos in the synthetic corpus (default: 500).")
+    parser.add_argument("--runs", type=int, default=10, help="Number of timed no-op runs (default: 10).")
+    parser.add_argument("--corpus", type=str, help="Existing web root containing a photos/ corpus to reuse.")
+    main(parser.parse_args())
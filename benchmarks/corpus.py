@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Synthetic benchmark corpus and helpers to run the generators against it.
+
+The corpus mimics Darktable exports: YYYY/MM/DD folders of small JPEG and AVIF files
+with EXIF (camera, lens, exposure, GPS) and XMP (title, description, hierarchical tags,
+notes) metadata. Pixel content is smooth noise, so analyzers have something to chew on.
+
+Usage:
+    python benchmarks/corpus.py OUTPUT_DIR [--count N] [--avif-share 0.25]
+"""
+
+import argparse
+import os
+import random
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+CAMERAS = [
+    ("NIKON Z 6_2", "NIKKOR Z 24-70mm f/4 S", 1.0),
+    ("RICOH GR III", "GR LENS 18.3mm F2.8", 1.53),
+    ("DC-G9", "LUMIX G VARIO 12-60/F3.5-5.6", 2.0),
+]
+TAGS = [
+    "places|France|Paris", "places|France|Lyon", "places|Japan|Kyoto",
+    "subjects|street", "subjects|architecture", "subjects|portrait",
+    "darktable|exported", "darktable|format|avif",
+]
+PLACES = [(48.8566, 2.3522), (45.7640, 4.8357), (35.0116, 135.7681)]
+
+XMP_TEMPLATE = """<x:xmpmeta xmlns:x="adobe:ns:meta/">
+ <rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#">
+  <rdf:Description rdf:about="" xmlns:dc="http://purl.org/dc/elements/1.1/"
+    xmlns:xmp="http://ns.adobe.com/xap/1.0/" xmp:notes="{notes}">
+   <dc:title><rdf:Alt><rdf:li xml:lang="x-default">{title}</rdf:li></rdf:Alt></dc:title>
+   <dc:description><rdf:Alt><rdf:li xml:lang="x-default">{description}</rdf:li></rdf:Alt></dc:description>
+   <dc:creator><rdf:Seq><rdf:li>Jane Photographer</rdf:li></rdf:Seq></dc:creator>
+   <dc:rights><rdf:Alt><rdf:li xml:lang="x-default">CC BY-SA 4.0</rdf:li></rdf:Alt></dc:rights>
+   <dc:subject><rdf:Bag>{subjects}</rdf:Bag></dc:subject>
+  </rdf:Description>
+ </rdf:RDF>
+</x:xmpmeta>"""
+
+
+def _degrees_minutes_seconds(value):
+    value = abs(value)
+    degrees = int(value)
+    minutes = int((value - degrees) * 60)
+    seconds = round((value - degrees - minutes / 60) * 3600, 2)
+    return (float(degrees), float(minutes), seconds)
+
+
+def make_photo(rng, size=(320, 240)):
+    """Returns a PIL image of smooth random noise."""
+    import numpy as np
+    from PIL import Image
+
+    seed = np.random.default_rng(rng.getrandbits(32))
+    small = seed.integers(0, 256, (6, 8, 3), dtype=np.uint8)
+    return Image.fromarray(small).resize(size, Image.Resampling.BICUBIC)
+
+
+def make_metadata(rng, index, date):
+    """Returns (exif, xmp bytes) for one synthetic photo."""
+    from PIL import Image
+    from PIL.TiffImagePlugin import IFDRational
+
+    model, lens, crop = rng.choice(CAMERAS)
+    focal_length = rng.choice([12, 18.3, 24, 35, 50, 70])
+    exif = Image.Exif()
+    exif[0x010F] = model.split()[0]  # Make
+    exif[0x0110] = model  # Model
+    exif[0x0132] = date  # DateTime
+    exif[0x013B] = "Jane Photographer"  # Artist
+    exif[0x8298] = "CC BY-SA 4.0"  # Copyright
+    exif_ifd = exif.get_ifd(0x8769)
+    exif_ifd[0x9003] = date  # DateTimeOriginal
+    exif_ifd[0x829A] = IFDRational(1, rng.choice([60, 125, 250, 1000]))  # ExposureTime
+    exif_ifd[0x829D] = IFDRational(rng.choice([28, 40, 56, 80]), 10)  # FNumber
+    exif_ifd[0x8827] = rng.choice([100, 200, 400, 1600])  # ISOSpeedRatings
+    exif_ifd[0x9209] = rng.choice([0, 16, 1])  # Flash
+    exif_ifd[0x920A] = IFDRational(int(focal_length * 10), 10)  # FocalLength
+    exif_ifd[0xA405] = int(round(focal_length * crop))  # FocalLengthIn35mmFilm
+    exif_ifd[0xA434] = lens  # LensModel
+    if rng.random() < 0.7:
+        latitude, longitude = rng.choice(PLACES)
+        latitude += rng.uniform(-0.05, 0.05)
+        longitude += rng.uniform(-0.05, 0.05)
+        exif[0x8825] = {
+            1: "N" if latitude >= 0 else "S", 2: _degrees_minutes_seconds(latitude),
+            3: "E" if longitude >= 0 else "W", 4: _degrees_minutes_seconds(longitude),
+            5: b"\x00", 6: IFDRational(rng.randint(0, 3000), 10),
+        }
+
+    subjects = rng.sample(TAGS, rng.randint(1, 4))
+    xmp = XMP_TEMPLATE.format(
+        title=f"Photo {index}",
+        description=f"Synthetic photo number {index} for benchmarks",
+        notes=f"Shot {index} of the benchmark corpus" if rng.random() < 0.5 else "",
+        subjects="".join(f"<rdf:li>{subject}</rdf:li>" for subject in subjects),
+    )
+    return exif, xmp.encode("utf-8")
+
+
+def make_photo_corpus(root, count=500, avif_share=0.25, seed=0, size=(320, 240)):
+    """
+    Writes a synthetic photo collection under root/YYYY/MM/DD, with photos of the given
+    (width, height).
+
+    Returns:
+        List of written paths
+    """
+    rng = random.Random(seed)
+    root = Path(root)
+    paths = []
+    for index in range(count):
+        year, month, day = rng.randint(2019, 2025), rng.randint(1, 12), rng.randint(1, 28)
+        date = f"{year:04d}:{month:02d}:{day:02d} {rng.randint(6, 21):02d}:{rng.randint(0, 59):02d}:00"
+        folder = root / f"{year:04d}" / f"{month:02d}" / f"{day:02d}"
+        folder.mkdir(parents=True, exist_ok=True)
+        exif, xmp = make_metadata(rng, index, date)
+        img = make_photo(rng, size)
+        if rng.random() < avif_share:
+            import pillow_avif  # noqa: F401  Registers AVIF support in PIL
+
+            path = folder / f"DSC_{index:05d}.avif"
+            img.save(path, exif=exif, xmp=xmp, quality=50)
+        else:
+            path = folder / f"DSC_{index:05d}.jpg"
+            img.save(path, exif=exif, xmp=xmp, quality=85)
+        paths.append(path)
+    return paths
+
+
+def configure_photo_generator(module, web_root, photo_root, cache_file):
+    """Points generate_manifest's configuration constants at a corpus."""
+    web_root, photo_root = Path(web_root), Path(photo_root)
+    module.WEB_ROOT = web_root
+    module.PHOTO_ROOT_DIR = photo_root
+    module.COLLECTION_PATH = photo_root.relative_to(web_root)
+    module.OUTPUT_JSON_FILE = web_root / "photo_manifest.json"
+    module.GEO_INDEX_FILE = web_root / "photo_geo_index.json"
+    module.LAYOUT_FILE = web_root / "photo_layouts.json"
+    module.TAG_TREE_FILE = web_root / "photo_tag_tree.json"
+    module.SEARCH_INDEX_DIR = web_root / "photo_search"
+    module.CACHE_FILE = Path(cache_file)
+
+
+# Bytecode is cached after the first run of an installed tool, even when the calling
+# environment disables writing it
+GENERATOR_ENV = {key: value for key, value in os.environ.items() if key != "PYTHONDONTWRITEBYTECODE"}
+
+GENERATOR_RUNNER = """
+import sys
+sys.path[:0] = [{repo!r}, {benchmarks!r}]
+{prologue}
+import generate_manifest
+from corpus import configure_photo_generator
+configure_photo_generator(generate_manifest, {web_root!r}, {photo_root!r}, {cache_file!r})
+generate_manifest.main(generate_manifest.build_arg_parser().parse_args({argv!r}))
+{epilogue}
+"""
+
+
+def run_photo_generator(web_root, photo_root, cache_file, argv=(), prologue="", epilogue=""):
+    """
+    Runs generate_manifest against a corpus in a fresh interpreter.
+
+    Args:
+        prologue, epilogue: Python code run before importing the generator and after it finishes
+
+    Returns:
+        Tuple of (wall seconds, stdout)
+    """
+    code = GENERATOR_RUNNER.format(
+        repo=str(REPO_ROOT), benchmarks=str(Path(__file__).resolve().parent),
+        web_root=str(web_root), photo_root=str(photo_root), cache_file=str(cache_file),
+        argv=list(argv), prologue=prologue, epilogue=epilogue,
+    )
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True, env=GENERATOR_ENV
+    )
+    return time.perf_counter() - start, result.stdout
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic photo corpus for benchmarks.")
+    parser.add_argument("output_dir", type=str, help="Directory to write YYYY/MM/DD folders into.")
+    parser.add_argument("--count", type=int, default=500, help="Number of photos (default: 500).")
+    parser.add_argument("--avif-share", type=float, default=0.25, help="Fraction of AVIF files (default: 0.25).")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0).")
+    cli_args = parser.parse_args()
+    written = make_photo_corpus(cli_args.output_dir, cli_args.count, cli_args.avif_share, cli_args.seed)
+    print(f"Wrote {len(written)} photos to {Path(cli_args.output_dir).resolve()}")
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Differential correctness check of metadata extractors.
+
+A faster extraction path is only safe to enable if it produces the same manifest records
+as the reference, extract_photo_metadata (get_exif_data plus field processing). This
+harness runs the reference and one or more candidate extractors over a synthetic corpus,
+the sample-data files, and truncated and fuzzed copies of some of them, assembles each
+result into a manifest record the way the generator does, and reports every field whose
+JSON differs.
+
+Each extractor runs in an IsolatedWorker, so a candidate that hangs or crashes on a
+broken file is reported as a failure instead of stopping the check. On such files the
+candidate is expected to fail where the reference fails; the error messages may differ.
+
+Candidates are given by name (see CANDIDATES) or as module:function, taking an image path
+and returning a dict of metadata fields like extract_photo_metadata. A candidate with
+several partial results returns a list of (label, metadata) pairs instead; each is
+compared on its own, on the fields it contains.
+
+Usage:
+    python benchmarks/differential.py [--candidate mmap] [--count 100] [--report FILE]
+"""
+
+import argparse
+import importlib
+import itertools
+import json
+import random
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from corpus import REPO_ROOT, make_photo_corpus
+
+import generate_manifest
+from isolated_worker import IsolatedWorker, WorkerError, WorkerFailure
+from photo_record import RECORD_FIELDS, PhotoRecord, metadata_row
+
+REFERENCE = "generate_manifest:extract_photo_metadata"
+SAMPLE_DATA_DIR = REPO_ROOT / "sample-data"
+IMAGE_SUFFIXES = (".jpg", ".jpeg", ".avif")
+# Truncated copies keep this many leading bytes (negative: drop that many trailing bytes)
+TRUNCATE_LENGTHS = (64, 1024, 4096, -16)
+# Fuzzed copies flip FUZZ_BYTES random bytes within the first FUZZ_SPAN bytes, where the
+# EXIF and XMP metadata of JPEG and AVIF files sits
+FUZZ_COPIES = 3
+FUZZ_BYTES = 8
+FUZZ_SPAN = 16384
+
+
+def extract_by_stage(image_path):
+    """
+    Candidate: the stage-selective extraction used for --fields runs, for every subset of
+    the stages.
+
+    Each subset must agree with the full extraction on the fields FIELD_STAGES allows it,
+    since --fields runs reuse the fields of full runs from the cache and vice versa.
+
+    Returns:
+        List of ("stages dims+exif", metadata) pairs, one per subset
+    """
+    results = []
+    for count in range(1, len(generate_manifest.EXTRACTION_STAGES)):
+        for stages in itertools.combinations(generate_manifest.EXTRACTION_STAGES, count):
+            metadata = generate_manifest.extract_photo_metadata(image_path, stages)
+            allowed = {name for name, needed in generate_manifest.FIELD_STAGES.items() if needed <= set(stages)}
+            results.append((f"stages {'+'.join(stages)}", {name: value for name, value in metadata.items() if name in allowed}))
+    return results
+
+
+def extract_mapped(image_path):
+    """Candidate: the memory-mapped metadata reader (--metadata-reader mmap)."""
+    return generate_manifest.extract_photo_metadata(image_path, reader="mmap")
+
+
+# Built-in candidates, by name; faster extractors register here to be checked
+CANDIDATES = {
+    "split-stages": f"{__name__}:extract_by_stage",
+    "mmap": f"{__name__}:extract_mapped",
+}
+
+
+def resolve_extractor(spec):
+    """Returns the function for a candidate name or a module:function spec."""
+    module_name, _, function_name = CANDIDATES.get(spec, spec).partition(":")
+    if not function_name:
+        raise ValueError(f"Unknown candidate '{spec}'. Use one of {', '.join(CANDIDATES)} or module:function")
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def make_variants(paths, output_dir, count, seed=0):
+    """
+    Writes truncated and fuzzed copies of up to count files, keeping their extensions.
+
+    Returns:
+        List of written paths
+    """
+    rng = random.Random(seed)
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    variants = []
+    for path in rng.sample(list(paths), min(count, len(paths))):
+        data = Path(path).read_bytes()
+        for length in TRUNCATE_LENGTHS:
+            variants.append(output_dir / f"{path.stem}.truncated{length}{path.suffix}")
+            variants[-1].write_bytes(data[:length])
+        for copy in range(FUZZ_COPIES):
+            fuzzed = bytearray(data)
+            for offset in rng.sample(range(min(FUZZ_SPAN, len(data))), min(FUZZ_BYTES, len(data))):
+                fuzzed[offset] = rng.randrange(256)
+            variants.append(output_dir / f"{path.stem}.fuzzed{copy}{path.suffix}")
+            variants[-1].write_bytes(bytes(fuzzed))
+    return variants
+
+
+def assemble_record(image_path, metadata):
+    """Builds the manifest record of extracted metadata, through the cached row form like the generator."""
+    filename = Path(image_path).name
+    path_values = (filename, filename, None, None, None, Path(filename).stem)
+    return PhotoRecord.from_row(path_values, metadata_row(metadata), {}).to_dict(RECORD_FIELDS)
+
+
+def run_extractor(worker, extractor, image_path):
+    """
+    Returns ("record", record), ("partial", [(label, fields, record)]) or ("error",
+    message) for one file.
+    """
+    try:
+        result = worker.call(extractor, image_path)
+    except (WorkerError, WorkerFailure) as e:
+        return "error", f"{type(e).__name__}: {e}"
+    if isinstance(result, list):
+        return "partial", [(label, list(metadata), assemble_record(image_path, metadata)) for label, metadata in result]
+    return "record", assemble_record(image_path, result)
+
+
+def compare_outcomes(reference, candidate):
+    """
+    Returns the differences between two outcomes of run_extractor as a list of
+    (field, reference value, candidate value); failures are compared as a whole, and the
+    fields of partial results are labelled "field (label)".
+    """
+    if (reference[0] == "error") != (candidate[0] == "error"):
+        return [("<outcome>", reference[1] if reference[0] == "error" else "record",
+                 candidate[1] if candidate[0] == "error" else "record")]
+    if reference[0] == "error":
+        return []  # Both failed
+    if candidate[0] == "record":
+        return [
+            (field, reference[1][field], candidate[1][field])
+            for field in RECORD_FIELDS
+            if json.dumps(reference[1][field]) != json.dumps(candidate[1][field])
+        ]
+    return [
+        (f"{field} ({label})", reference[1][field], record[field])
+        for label, fields, record in candidate[1]
+        for field in fields
+        if json.dumps(reference[1][field]) != json.dumps(record[field])
+    ]
+
+
+def check(paths, candidates, file_timeout=30):
+    """
+    Runs the reference and each candidate on every file.
+
+    Args:
+        paths: Image paths
+        candidates: Candidate names or module:function specs
+        file_timeout: Seconds an extractor may take on one file
+
+    Returns:
+        Dict of candidate -> {path: differences}, only listing files that differ
+    """
+    reference = resolve_extractor(REFERENCE)
+    extractors = {spec: resolve_extractor(spec) for spec in candidates}
+    results = {spec: {} for spec in candidates}
+    with IsolatedWorker(file_timeout) as worker:
+        for path in paths:
+            expected = run_extractor(worker, reference, path)
+            for spec, extractor in extractors.items():
+                differences = compare_outcomes(expected, run_extractor(worker, extractor, path))
+                if differences:
+                    results[spec][str(path)] = differences
+    return results
+
+
+def print_report(results, file_count):
+    for spec, files in results.items():
+        print(f"\n{spec}: {len(files)} of {file_count} files differ from the reference")
+        for path, differences in files.items():
+            print(f"  {path}")
+            for field, expected, actual in differences:
+                print(f"    {field}: reference {expected!r}, candidate {actual!r}")
+
+
+def main(args):
+    candidates = args.candidate or list(CANDIDATES)
+    try:
+        for spec in candidates:
+            resolve_extractor(spec)
+    except (ImportError, AttributeError, ValueError) as e:
+        print(f"Error: {e}")
+        return 1
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus_dir = Path(args.corpus) if args.corpus else Path(tmp) / "corpus"
+        if not args.corpus:
+            make_photo_corpus(corpus_dir, args.count, seed=args.seed)
+        generated = sorted(p for p in corpus_dir.rglob("*") if p.suffix.lower() in IMAGE_SUFFIXES)
+        sample_dir = Path(args.sample_data)
+        samples = sorted(p for p in sample_dir.rglob("*") if p.suffix.lower() in IMAGE_SUFFIXES) if sample_dir.is_dir() else []
+        variants = make_variants(generated + samples, Path(tmp) / "variants", args.variants, args.seed)
+        paths = generated + samples + variants
+        print(f"Checking {len(paths)} files ({len(generated)} generated, {len(samples)} from {sample_dir}, "
+              f"{len(variants)} truncated or fuzzed) against {REFERENCE}")
+        results = check(paths, candidates, args.file_timeout)
+
+    print_report(results, len(paths))
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump({
+                spec: {path: [{"field": field, "reference": expected, "candidate": actual}
+                              for field, expected, actual in differences]
+                       for path, differences in files.items()}
+                for spec, files in results.items()
+            }, f, indent=2, default=str)
+        print(f"\nReport written to {Path(args.report).resolve()}")
+    return 1 if any(results.values()) else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare candidate metadata extractors with the reference, field by field.")
+    parser.add_argument("--candidate", action="append", help=f"Candidate to check, by name ({', '.join(CANDIDATES)}) or module:function; repeatable (default: all built-in candidates).")
+    parser.add_argument("--count", type=int, default=100, help="Photos in the generated corpus (default: 100).")
+    parser.add_argument("--corpus", type=str, help="Check an existing YYYY/MM/DD folder instead of generating a corpus.")
+    parser.add_argument("--sample-data", type=str, default=str(SAMPLE_DATA_DIR), help="Folder of real sample images, if present (default: sample-data).")
+    parser.add_argument("--variants", type=int, default=20, help=f"Files to write {len(TRUNCATE_LENGTHS)} truncated and {FUZZ_COPIES} fuzzed copies of (default: 20).")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the corpus and the variants (default: 0).")
+    parser.add_argument("--file-timeout", type=float, default=30, help="Seconds an extractor may take on one file (default: 30).")
+    parser.add_argument("--report", type=str, help="Also write the differences as JSON to this path.")
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,149 @@
+"""
+TOML configuration of several collections, generated together by generate_collections.py.
+
+A config lists collections of either type, each with its own root folder and outputs:
+
+    web_root = "/mnt/Web"
+    workers = 4
+
+    [[collection]]
+    name = "photos"
+    type = "photo"
+    root = "/mnt/Web/photos"
+    output = "/mnt/Web/photo_manifest.json"
+    geo_index = "/mnt/Web/photo_geo_index.json"
+    layouts = "/mnt/Web/photo_layouts.json"
+    tag_tree = "/mnt/Web/photo_tag_tree.json"
+    search_index = "/mnt/Web/photo_search"
+    excluded_tags = ["family"]
+
+    [[collection]]
+    name = "images"
+    type = "image"
+    root = "/mnt/Web/images"
+    output = "/mnt/Web/image_manifest.json"
+
+Relative paths are resolved against the folder of the config file. Every collection root
+must lie under its web root (the top-level web_root unless the collection sets its own),
+since manifest paths are relative to it.
+"""
+
+import os
+import tomllib
+from pathlib import Path
+
+COLLECTION_TYPES = ("photo", "image")
+# Optional outputs and settings that only photo collections have
+PHOTO_ONLY_KEYS = ("geo_index", "layouts", "tag_tree", "search_index", "excluded_tags")
+COLLECTION_KEYS = ("name", "type", "root", "web_root", "output", *PHOTO_ONLY_KEYS)
+
+
+def _path(value, base_dir, where):
+    if not isinstance(value, str) or not value:
+        raise ValueError(f"{where} must be a non-empty string")
+    return base_dir / Path(value).expanduser()
+
+
+def load_config(path):
+    """
+    Loads and checks a collections config.
+
+    Args:
+        path: Path to the TOML file
+
+    Returns:
+        Dict with "cache" (Path, or None for the default), "workers" (int, or None for the
+        default) and "collections": a list of collection dicts with "name", "type", "root",
+        "collection_path" (root relative to the web root), "output", and for photo
+        collections "geo_index", "layouts", "tag_tree" and "search_index" (Path or
+        None) and "excluded_tags" (set of lowercase tags)
+
+    Raises:
+        OSError: If the file can't be read
+        ValueError: If it is not valid TOML or does not describe valid collections
+    """
+    path = Path(path)
+    with open(path, "rb") as f:
+        try:
+            data = tomllib.load(f)
+        except tomllib.TOMLDecodeError as e:
+            raise ValueError(f"{path}: {e}") from None
+    base_dir = path.parent
+
+    try:
+        web_root = _path(data["web_root"], base_dir, "web_root") if "web_root" in data else None
+        cache = _path(data["cache"], base_dir, "cache") if "cache" in data else None
+        workers = data.get("workers")
+        if workers is not None and (not isinstance(workers, int) or workers < 1):
+            raise ValueError("workers must be a positive integer")
+        unknown = set(data) - {"web_root", "cache", "workers", "collection"}
+        if unknown:
+            raise ValueError(f"Unknown settings: {', '.join(sorted(unknown))}")
+        entries = data.get("collection", [])
+        if not entries:
+            raise ValueError("No [[collection]] tables")
+
+        collections = []
+        names = set()
+        outputs = set()
+        for index, entry in enumerate(entries, 1):
+            collections.append(_load_collection(entry, index, web_root, base_dir))
+            name = collections[-1]["name"]
+            if name in names:
+                raise ValueError(f"Collection name '{name}' is used twice")
+            names.add(name)
+            for key in ("output", "geo_index", "layouts", "tag_tree", "search_index"):
+                output = collections[-1].get(key)
+                if output is not None:
+                    if os.path.abspath(output) in outputs:
+                        raise ValueError(f"Collection '{name}': {key} {output} is written by another collection too")
+                    outputs.add(os.path.abspath(output))
+    except ValueError as e:
+        raise ValueError(f"{path}: {e}") from None
+    return {"cache": cache, "workers": workers, "collections": collections}
+
+
+def _load_collection(entry, index, default_web_root, base_dir):
+    name = entry.get("name")
+    if not isinstance(name, str) or not name:
+        raise ValueError(f"Collection #{index} needs a name")
+    where = f"Collection '{name}'"
+    unknown = set(entry) - set(COLLECTION_KEYS)
+    if unknown:
+        raise ValueError(f"{where}: unknown settings: {', '.join(sorted(unknown))}")
+    kind = entry.get("type")
+    if kind not in COLLECTION_TYPES:
+        raise ValueError(f"{where}: type must be one of {', '.join(COLLECTION_TYPES)}")
+    for key in ("root", "output"):
+        if key not in entry:
+            raise ValueError(f"{where}: {key} is required")
+
+    root = _path(entry["root"], base_dir, f"{where}: root")
+    web_root = _path(entry["web_root"], base_dir, f"{where}: web_root") if "web_root" in entry else default_web_root
+    if web_root is None:
+        raise ValueError(f"{where}: web_root is required (here or at the top level)")
+    try:
+        collection_path = Path(os.path.abspath(root)).relative_to(os.path.abspath(web_root))
+    except ValueError:
+        raise ValueError(f"{where}: root {root} is not under the web root {web_root}") from None
+
+    collection = {
+        "name": name,
+        "type": kind,
+        "root": root,
+        "collection_path": collection_path,
+        "output": _path(entry["output"], base_dir, f"{where}: output"),
+    }
+    if kind == "image":
+        used = [key for key in PHOTO_ONLY_KEYS if key in entry]
+        if used:
+            raise ValueError(f"{where}: {', '.join(used)} only apply to photo collections")
+        return collection
+
+    for key in ("geo_index", "layouts", "tag_tree", "search_index"):
+        collection[key] = _path(entry[key], base_dir, f"{where}: {key}") if key in entry else None
+    excluded_tags = entry.get("excluded_tags", [])
+    if not isinstance(excluded_tags, list) or not all(isinstance(tag, str) for tag in excluded_tags):
+        raise ValueError(f"{where}: excluded_tags must be a list of strings")
+    collection["excluded_tags"] = {tag.lower() for tag in excluded_tags}
+    return collection
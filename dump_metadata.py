@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Dump the raw metadata of many images as JSON Lines, for grep/jq analysis.
+
+`generate_manifest.py --debug-image` prints one file's metadata for a human. This dumps
+every view of the metadata the generator works from, for whole folders at once: Pillow's
+base EXIF IFD, the Exif, GPS and Interop sub-IFDs, exifread's tags, and the XMP packet
+(raw and as parsed by Pillow). Files are processed in parallel by isolated worker
+processes, so a file that hangs or crashes a decoder only produces an error line.
+
+Each output line is one JSON object: {"path", "format", "size", "mode", "exif", "ifds",
+"exifread", "xmp", "xmpParsed"}, or {"path", "error"} for files that could not be read.
+Lines are written in input order.
+
+Usage:
+    python dump_metadata.py /mnt/Web/photos/2025/05 --output may.jsonl
+    python dump_metadata.py "/mnt/Web/photos/2025/*/1?/*.avif" | jq 'select(.exif.Model == null) | .path'
+"""
+
+import argparse
+import base64
+import glob
+import io
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from image_io import open_image
+from isolated_worker import WorkerError, WorkerFailure, WorkerPool
+
+IMAGE_SUFFIXES = (".jpg", ".jpeg", ".avif", ".png", ".webp", ".tif", ".tiff")
+# Sub-IFDs of the base EXIF IFD, by pointer tag
+SUB_IFDS = {"Exif": 0x8769, "GPSInfo": 0x8825, "Interop": 0xA005}
+# Seconds a single file may take before it is reported as an error
+DUMP_TIMEOUT = 60
+
+
+def json_value(value):
+    """Converts an EXIF value to something JSON can represent, losing as little as possible."""
+    if isinstance(value, (str, int, bool)) or value is None:
+        return value
+    if isinstance(value, float):
+        return value if value == value else None  # NaN (e.g. 0/0 rationals) is not valid JSON
+    if isinstance(value, bytes):
+        try:
+            return value.decode("ascii")
+        except UnicodeDecodeError:
+            return "base64:" + base64.b64encode(value).decode()
+    if isinstance(value, (tuple, list)):
+        return [json_value(item) for item in value]
+    if isinstance(value, dict):
+        return {str(key): json_value(item) for key, item in value.items()}
+    if hasattr(value, "numerator") and hasattr(value, "denominator"):
+        # IFDRational: the exact fraction, as [numerator, denominator]
+        return [value.numerator, value.denominator] if value.denominator != 1 else value.numerator
+    return str(value)
+
+
+def named_tags(ifd, names):
+    return {str(names.get(tag_id, tag_id)): json_value(value) for tag_id, value in ifd.items()}
+
+
+def dump_metadata(image_path):
+    """
+    Reads every view of an image's metadata.
+
+    Args:
+        image_path: Path to the image
+
+    Returns:
+        JSON-serializable dict (see the module docstring)
+    """
+    import exifread
+    from PIL.ExifTags import GPSTAGS, TAGS
+
+    dump = {"path": str(image_path)}
+    with open_image(image_path) as img:
+        dump["format"] = img.format
+        dump["size"] = list(img.size)
+        dump["mode"] = img.mode
+        exif = img.getexif()
+        dump["exif"] = named_tags({tag: value for tag, value in exif.items() if tag not in SUB_IFDS.values()}, TAGS)
+        dump["ifds"] = {}
+        for name, pointer in SUB_IFDS.items():
+            try:
+                ifd = exif.get_ifd(pointer)
+            except KeyError:
+                continue  # Pillow looks for the Interop IFD in the Exif IFD, which may be missing
+            if ifd:
+                dump["ifds"][name] = named_tags(ifd, GPSTAGS if name == "GPSInfo" else TAGS)
+
+        # exifread reads the bare TIFF structure, without the APP1 "Exif\0\0" header
+        exif_bytes = img.info.get("exif") or b""
+        if exif_bytes.startswith(b"Exif\x00\x00"):
+            exif_bytes = exif_bytes[6:]
+        tags = exifread.process_file(io.BytesIO(exif_bytes), details=False) if exif_bytes else {}
+        dump["exifread"] = {name: str(tag) for name, tag in sorted(tags.items())}
+
+        xmp = img.info.get("xmp")
+        dump["xmp"] = xmp.decode("utf-8", errors="replace") if isinstance(xmp, bytes) else xmp
+        try:
+            dump["xmpParsed"] = json_value(img.getxmp()) if xmp else None
+        except Exception as e:
+            dump["xmpParsed"] = {"error": f"{type(e).__name__}: {e}"}
+    return dump
+
+
+def expand_paths(patterns):
+    """
+    Expands directories (recursively), glob patterns and file paths into image paths.
+
+    Returns:
+        Sorted list of unique paths, as strings
+    """
+    paths = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for root, _, files in os.walk(pattern):
+                paths.update(os.path.join(root, name) for name in files if name.lower().endswith(IMAGE_SUFFIXES))
+        elif glob.has_magic(pattern):
+            paths.update(
+                path for path in glob.glob(pattern, recursive=True)
+                if os.path.isfile(path) and path.lower().endswith(IMAGE_SUFFIXES)
+            )
+        else:
+            paths.add(pattern)
+    return sorted(paths)
+
+
+def dump_many(paths, workers, timeout=DUMP_TIMEOUT):
+    """
+    Dumps the metadata of many images in parallel.
+
+    Yields:
+        One dump dict per path, in order
+    """
+    def dump_one(path):
+        try:
+            return pool.call(dump_metadata, path)
+        except (WorkerError, WorkerFailure) as e:
+            return {"path": path, "error": str(e)}
+
+    with WorkerPool(workers, timeout) as pool, ThreadPoolExecutor(workers) as threads:
+        yield from threads.map(dump_one, paths)
+
+
+def main(args):
+    paths = expand_paths(args.paths)
+    if not paths:
+        print("Error: No images match the given paths.", file=sys.stderr)
+        return 1
+    workers = min(args.workers or os.cpu_count() or 1, len(paths))
+    output = open(args.output, "w") if args.output else sys.stdout
+    errors = 0
+    try:
+        for dump in dump_many(paths, workers, args.timeout):
+            errors += "error" in dump
+            output.write(json.dumps(dump, ensure_ascii=False, separators=(",", ":")) + "\n")
+    finally:
+        if args.output:
+            output.close()
+    print(f"Dumped the metadata of {len(paths)} files ({errors} errors) with {workers} workers.", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Dump the raw EXIF, IFD, exifread and XMP metadata of many images as JSON Lines.")
+    parser.add_argument("paths", nargs="+", type=str, help="Image files, directories (searched recursively) or glob patterns (quote them; ** matches nested folders).")
+    parser.add_argument("--output", type=str, help="JSON Lines file to write (default: standard output).")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: the number of CPUs).")
+    parser.add_argument("--timeout", type=float, default=DUMP_TIMEOUT, help=f"Seconds a file may take before it is reported as an error (default: {DUMP_TIMEOUT}).")
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,113 @@
+"""
+Near-duplicate detection over 64-bit perceptual hashes.
+
+Uses multi-index hashing (Norouzi et al., "Fast Search in Hamming Space with Multi-Index
+Hashing"): each hash is split into CHUNKS disjoint 16-bit substrings. If two hashes are
+within Hamming distance r, at least one pair of their substrings is within
+floor(r / CHUNKS) bits, so only hashes whose substring falls in that small neighbourhood
+need to be compared. The join over each substring is done with sorted arrays in NumPy,
+which keeps a 100k-photo archive well under a few seconds instead of 5 * 10^9 comparisons.
+"""
+
+from collections import defaultdict
+from itertools import combinations
+
+HASH_BITS = 64
+CHUNKS = 4
+CHUNK_BITS = HASH_BITS // CHUNKS
+CHUNK_MASK = (1 << CHUNK_BITS) - 1
+
+# Default Hamming radius for considering two photos the same frame
+DEFAULT_DUPLICATE_RADIUS = 6
+
+
+def _probe_masks(radius):
+    """Returns every CHUNK_BITS-bit mask with at most `radius` bits set."""
+    masks = [0]
+    for bit_count in range(1, radius + 1):
+        for bits in combinations(range(CHUNK_BITS), bit_count):
+            masks.append(sum(1 << bit for bit in bits))
+    return masks
+
+
+def find_near_duplicate_pairs(hashes, radius=DEFAULT_DUPLICATE_RADIUS):
+    """
+    Finds all pairs of hashes within a Hamming radius.
+
+    Args:
+        hashes: Sequence of 64-bit integer hashes
+        radius: Maximum Hamming distance
+
+    Returns:
+        Tuple of (first, second, distance) integer arrays, with first < second
+    """
+    import numpy as np  # Imported here so that loading this module stays cheap
+
+    hashes = np.asarray(hashes, dtype=np.uint64)
+    positions = np.arange(len(hashes))
+    firsts, seconds = [], []
+
+    for chunk in range(CHUNKS):
+        substrings = ((hashes >> np.uint64(chunk * CHUNK_BITS)) & np.uint64(CHUNK_MASK)).astype(np.int64)
+        order = np.argsort(substrings, kind="stable")
+        sorted_substrings = substrings[order]
+        for mask in _probe_masks(radius // CHUNKS):
+            keys = substrings ^ mask
+            starts = np.searchsorted(sorted_substrings, keys, side="left")
+            counts = np.searchsorted(sorted_substrings, keys, side="right") - starts
+            if not counts.any():
+                continue
+            # Expand every (query, bucket range) into explicit candidate pairs
+            queries = np.repeat(positions, counts)
+            offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+            candidates = order[np.repeat(starts, counts) + offsets]
+            keep = queries < candidates
+            queries, candidates = queries[keep], candidates[keep]
+            within = np.bitwise_count(hashes[queries] ^ hashes[candidates]) <= radius
+            firsts.append(queries[within])
+            seconds.append(candidates[within])
+
+    if not firsts:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, empty
+    # The same pair can be found through several chunks
+    pairs = np.unique(np.stack([np.concatenate(firsts), np.concatenate(seconds)], axis=1), axis=0)
+    first, second = pairs[:, 0], pairs[:, 1]
+    return first, second, np.bitwise_count(hashes[first] ^ hashes[second]).astype(np.int64)
+
+
+def find_duplicate_clusters(hashes, radius=DEFAULT_DUPLICATE_RADIUS):
+    """
+    Groups hashes into clusters of near-duplicates.
+
+    Clusters are the connected components of the "within radius" relation, so a chain of
+    successive edits of the same frame ends up in one cluster.
+
+    Args:
+        hashes: Sequence of 64-bit integer hashes; None entries are ignored
+        radius: Maximum Hamming distance between two members of a pair
+
+    Returns:
+        List of clusters with at least two members, each a sorted list of positions in `hashes`
+    """
+    known = [position for position, value in enumerate(hashes) if value is not None]
+    first, second, _ = find_near_duplicate_pairs([hashes[p] for p in known], radius)
+
+    parent = {}
+
+    def find(i):
+        parent.setdefault(i, i)
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for a, b in zip(first.tolist(), second.tolist()):
+        root_a, root_b = find(known[a]), find(known[b])
+        if root_a != root_b:
+            parent[max(root_a, root_b)] = min(root_a, root_b)
+
+    clusters = defaultdict(list)
+    for position in parent:
+        clusters[find(position)].append(position)
+    return [sorted(members) for members in clusters.values()]
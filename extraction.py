@@ -0,0 +1,239 @@
+"""
+Importable extraction API: image files in, manifest records out.
+
+The generators build every record through this module, so other tools and services get
+exactly the records the manifests contain without running a generator:
+
+    from extraction import extract, extract_many
+
+    record = extract("/mnt/Web/photos/2025/05/17/DSC_1234.avif")
+    print(record.slug, record.dateTaken, record.tags)
+
+    with ProcessPoolExecutor() as executor:
+        for path, record in extract_many(paths, executor=executor, cache=MetadataCache.load(cache_file)):
+            if isinstance(record, Exception):
+                print(f"Error processing {path}: {record}")
+
+Photo records are PhotoRecords (see photo_record.py); image records are dicts. Paths are
+made relative to the web root through their collection (by default the one configured in
+generate_manifest.py or generate_image_manifest.py), and must lie under its root.
+"""
+
+import os
+from collections import deque
+from pathlib import Path
+
+import generate_manifest
+from photo_record import PhotoRecord, metadata_row
+from pixel_analysis import analysis_cache_name, cached_analysis, parse_analyzer_names
+
+# Files extract_many() keeps in flight (submitted or waiting to be yielded) at a time
+EXTRACT_BATCH_SIZE = 64
+
+
+def build_photo_record(path_values, row, analysis_fields, excluded_tags=None, no_gps=False):
+    """
+    Assembles a photo manifest record from its parts.
+
+    Args:
+        path_values: Tuple of (path relative to web root, filename, year, month, day)
+        row: Metadata row (see photo_record.metadata_row)
+        analysis_fields: Dict of pixel analysis fields
+        excluded_tags: Optional set of lowercase tags to drop, in addition to EXCLUDED_TAGS
+        no_gps: Whether to leave the GPS position out
+
+    Returns:
+        PhotoRecord
+    """
+    relative_path = path_values[0]
+    # Generate slug from the path relative to web root
+    slug = os.path.splitext(relative_path)[0].replace('/', '-')
+    record = PhotoRecord.from_row((*path_values, slug), row, analysis_fields)
+    if excluded_tags and record.tags:
+        record.tags = generate_manifest.filter_tags(record.tags, excluded_tags)
+    if excluded_tags and record.tagPaths:
+        record.tagPaths = generate_manifest.filter_tags(record.tagPaths, excluded_tags)
+    if no_gps:
+        record.latitude = record.longitude = record.altitude = None
+    return record
+
+
+def build_image_record(relative_path, filename, width, height, file_info):
+    """
+    Assembles an image manifest record from its parts.
+
+    Args:
+        relative_path: Path relative to web root (a PurePath)
+        filename: File name
+        width, height: Image dimensions
+        file_info: Dict with "fileSize" and "lastModified" (see get_file_info)
+
+    Returns:
+        Record dict
+    """
+    return {
+        "relativePath": str(relative_path.as_posix()),
+        "filename": filename,
+        "width": width,
+        "height": height,
+        # Generate slug from the path relative to web root
+        "slug": str(relative_path.with_suffix('')).replace(os.sep, '-'),
+        "fileSize": file_info["fileSize"],
+        "lastModified": file_info["lastModified"],
+    }
+
+
+def _relative_parts(image_path, collection):
+    """Returns the folder names from the collection root down to the image."""
+    relative = Path(os.path.abspath(image_path)).relative_to(os.path.abspath(collection["root"]))
+    return relative.parts[:-1]
+
+
+def photo_path_values(image_path, collection):
+    """
+    Derives a photo's path fields from its location in a collection.
+
+    Returns:
+        Tuple of (path relative to web root, filename, year, month, day)
+
+    Raises:
+        ValueError: If the photo is not under the collection root
+    """
+    path_parts = _relative_parts(image_path, collection)
+    filename = os.path.basename(image_path)
+    relative_path = "/".join([*collection["collection_path"].parts, *path_parts, filename])
+    return (relative_path, filename, *generate_manifest.folder_date(path_parts))
+
+
+def _default_collection(image_path):
+    """Picks the configured photo or image collection holding a file."""
+    import generate_image_manifest
+
+    image_collection = generate_image_manifest.default_image_collection()
+    try:
+        Path(os.path.abspath(image_path)).relative_to(os.path.abspath(image_collection["root"]))
+        return image_collection
+    except ValueError:
+        return generate_manifest.default_photo_collection()
+
+
+def _extract_image(image_path, collection, cache):
+    import generate_image_manifest
+
+    image_path = Path(image_path)
+    relative_path = collection["collection_path"].joinpath(*_relative_parts(image_path, collection), image_path.name)
+    width, height = generate_image_manifest.read_dimensions(image_path, relative_path.as_posix(), cache)
+    return build_image_record(relative_path, image_path.name, width, height, generate_image_manifest.get_file_info(image_path))
+
+
+def extract(image_path, collection=None, analyzers=generate_manifest.DEFAULT_ANALYZERS):
+    """
+    Extracts the manifest record of one image, without any cache.
+
+    Args:
+        image_path: Path to the image
+        collection: Collection dict the image belongs to (default: the configured photo
+            or image collection whose root holds it)
+        analyzers: Comma-separated pixel analyzers to run, for photos
+
+    Returns:
+        PhotoRecord for photo collections, record dict for image collections
+
+    Raises:
+        ValueError: If the image is not under the collection root or an analyzer is unknown
+        Exception: Whatever reading the image raised
+    """
+    collection = collection or _default_collection(image_path)
+    if collection["type"] == "image":
+        return _extract_image(image_path, collection, None)
+    path_values = photo_path_values(image_path, collection)
+    metadata, computed = generate_manifest.process_photo(
+        image_path, generate_manifest.EXTRACTION_STAGES, parse_analyzer_names(analyzers)
+    )
+    analysis_fields = {}
+    for results in computed.values():
+        analysis_fields.update(results)
+    return build_photo_record(path_values, metadata_row(metadata), analysis_fields, collection.get("excluded_tags"))
+
+
+def extract_many(image_paths, collection=None, executor=None, cache=None, analyzers=generate_manifest.DEFAULT_ANALYZERS, batch_size=EXTRACT_BATCH_SIZE):
+    """
+    Extracts the manifest records of many images, streaming the results in input order.
+
+    Files the cache knows (same fingerprint) are not read. The others are decoded on the
+    executor, at most batch_size at a time, so results start arriving before the last
+    file is submitted and memory stays bounded. The cache is only used from the calling
+    thread; save it afterwards to keep the new results.
+
+    Args:
+        image_paths: Iterable of image paths, all in one collection
+        collection: Collection dict (default: the configured collection of the first path)
+        executor: concurrent.futures executor to decode photos on (a ProcessPoolExecutor
+            to use several CPUs), or None to decode in the calling thread
+        cache: MetadataCache to read and extend, or None
+        analyzers: Comma-separated pixel analyzers to run, for photos
+        batch_size: Number of files in flight
+
+    Yields:
+        Tuples of (image path, PhotoRecord or image record dict), or (image path, exception)
+        for files that could not be read
+    """
+    analyzer_names = parse_analyzer_names(analyzers)
+    metadata_name = f"metadata@{generate_manifest.METADATA_VERSION}"
+    in_flight = deque()
+
+    def start(image_path):
+        """Returns the job of one file: its parts, and a future if it has to be decoded."""
+        if collection["type"] == "image":
+            try:
+                return {"path": image_path, "record": _extract_image(image_path, collection, cache)}
+            except Exception as e:
+                return {"path": image_path, "error": e}
+        job = {"path": image_path, "row": None, "analysis_fields": {}, "pending": analyzer_names, "fingerprint": None}
+        try:
+            job["path_values"] = photo_path_values(image_path, collection)
+            if cache is not None:
+                job["fingerprint"] = cache.fingerprint(image_path, job["path_values"][0])
+                job["row"] = cache.get(job["fingerprint"], metadata_name)
+                job["analysis_fields"], job["pending"] = cached_analysis(job["fingerprint"], cache, analyzer_names)
+            if job["row"] is None or job["pending"]:
+                stages = generate_manifest.EXTRACTION_STAGES if job["row"] is None else None
+                if executor is None:
+                    job["result"] = generate_manifest.process_photo(image_path, stages, job["pending"])
+                else:
+                    job["future"] = executor.submit(generate_manifest.process_photo, image_path, stages, job["pending"])
+        except Exception as e:
+            job["error"] = e
+        return job
+
+    def finish(job):
+        if "error" in job:
+            return job["path"], job["error"]
+        if "record" in job:
+            return job["path"], job["record"]
+        try:
+            if "future" in job:
+                job["result"] = job["future"].result()
+            if "result" in job:
+                metadata, computed = job["result"]
+                if metadata is not None:
+                    job["row"] = metadata_row(metadata)
+                    if cache is not None:
+                        cache.put(job["fingerprint"], metadata_name, job["row"])
+                for name, results in computed.items():
+                    if cache is not None:
+                        cache.put(job["fingerprint"], analysis_cache_name(name), results)
+                    job["analysis_fields"].update(results)
+            record = build_photo_record(job["path_values"], job["row"], job["analysis_fields"], collection.get("excluded_tags"))
+        except Exception as e:
+            return job["path"], e
+        return job["path"], record
+
+    for image_path in image_paths:
+        if collection is None:
+            collection = _default_collection(image_path)
+        in_flight.append(start(image_path))
+        if len(in_flight) >= batch_size:
+            yield finish(in_flight.popleft())
+    while in_flight:
+        yield finish(in_flight.popleft())
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Generate the manifests of several photo and image collections described in a TOML config.
+
+Collections are generated concurrently, one thread each, and share a single metadata
+cache, one pool of isolated decoder processes and one throttle: a large collection that
+needs decoding keeps the pool busy while small or unchanged ones finish from the cache,
+and no collection holds workers idle. See collection_config.py for the config format.
+
+Usage:
+    python generate_collections.py collections.toml [--throttle] [--resume] ...
+
+Takes the options of generate_manifest.py that apply to whole runs; they apply to every
+photo collection.
+"""
+
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import generate_image_manifest
+import generate_manifest
+from collection_config import load_config
+from isolated_worker import WorkerPool
+
+# Cache shared by the collections of a config, unless it sets its own. Kept apart from the
+# photo generator's cache, since a standalone run prunes the entries of other collections.
+COLLECTIONS_CACHE_FILE = generate_manifest.CACHE_FILE.with_name("collections_cache.json")
+# Options of generate_manifest.py that select a single collection's outputs
+UNSUPPORTED_OPTIONS = ("debug_image", "partition", "fields", "output", "duplicate_report")
+
+
+def run_collection(args, collection, cache, worker, throttle, stop):
+    """Generates one collection; returns True if its outputs are complete."""
+    if collection["type"] == "photo":
+        return generate_manifest.generate_photo_collection(
+            args, collection, cache=cache, worker=worker, throttle=throttle, stop=stop,
+        )
+    return generate_image_manifest.generate_image_collection(collection, cache=cache, stop=stop, verbose=args.verbose)
+
+
+def main(args):
+    used = [option for option in UNSUPPORTED_OPTIONS if getattr(args, option)]
+    if used:
+        print(f"Error: --{used[0].replace('_', '-')} is not supported with a collections config.")
+        return 1
+    try:
+        config = load_config(args.config)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        return 1
+    collections = config["collections"]
+
+    cache = generate_manifest.load_cache(config["cache"] or COLLECTIONS_CACHE_FILE, args.resume)
+    throttle = generate_manifest.configure_throttle(args)
+    worker_count = args.max_workers or config["workers"] or (
+        generate_manifest.THROTTLE_MAX_WORKERS if args.throttle else os.cpu_count() or 1
+    )
+    # Without a timeout, each collection's thread extracts in-process
+    pool = WorkerPool(worker_count, args.file_timeout) if args.file_timeout else None
+    stop = threading.Event()
+    print(f"Generating {len(collections)} collections with {worker_count if pool else 'no'} shared workers.")
+
+    executor = ThreadPoolExecutor(max_workers=len(collections))
+    futures = [
+        executor.submit(run_collection, args, collection, cache, pool, throttle, stop)
+        for collection in collections
+    ]
+    try:
+        wait(futures)
+    except KeyboardInterrupt:
+        print("\nInterrupted; stopping all collections...")
+        stop.set()
+        wait(futures)
+    finally:
+        executor.shutdown()
+        if pool:
+            pool.close()
+
+    incomplete = []
+    for collection, future in zip(collections, futures):
+        try:
+            completed = future.result()
+        except Exception as e:
+            print(f"Error generating {collection['name']}: {e}")
+            completed = False
+        if not completed:
+            incomplete.append(collection["name"])
+    if incomplete:
+        cache.checkpoint()
+        print(f"\nIncomplete: {', '.join(incomplete)}. Progress is checkpointed; run again with --resume to continue.")
+        return 1
+    cache.save(prune=True)
+    print(f"\nAll {len(collections)} collections are up to date.")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = generate_manifest.build_arg_parser()
+    parser.description = "Generate the manifests of the collections described in a TOML config."
+    parser.add_argument("config", type=str, help="Collections config (TOML), see collection_config.py.")
+    sys.exit(main(parser.parse_args()))
@@ -1,9 +1,14 @@
+import argparse
 import json
 import os
+import sys
 from datetime import datetime
 from pathlib import Path
 
-from PIL import Image
+from extraction import build_image_record
+from image_io import open_image
+from manifest_validation import IMAGE_SCHEMA_FILE, RecordValidator
+from progress import ProgressReporter
 
 # --- Configuration ---
 # The root directory of the web server (where manifests and collection folders are located)
@@ -17,6 +22,9 @@ OUTPUT_JSON_FILE = Path("/mnt/Web/image_manifest.json")
 COLLECTION_PATH = IMAGE_ROOT_DIR.relative_to(WEB_ROOT)
 # --- End Configuration ---
 
+# Cache value name for image dimensions, when run with a shared cache
+DIMENSIONS_CACHE_NAME = "dims@1"
+
 
 def get_file_info(image_path):
     """
@@ -38,23 +46,89 @@ def get_file_info(image_path):
         }
 
 
-def main():
+def default_image_collection():
+    """
+    Describes the collection configured by the constants at the top of this file, in the
+    form collection_config.load_config() returns for collections.toml entries.
+    """
+    return {
+        "name": "images",
+        "type": "image",
+        "root": IMAGE_ROOT_DIR,
+        "collection_path": COLLECTION_PATH,
+        "output": OUTPUT_JSON_FILE,
+    }
+
+
+def read_dimensions(image_path, cache_key, cache):
+    """Returns (width, height) of an image, from the cache if one is given and knows the file."""
+    return _dimensions(image_path, cache_key, cache)[:2]
+
+
+def _dimensions(image_path, cache_key, cache, progress=None):
+    """Returns (width, height, whether the image was opened)."""
+    if cache is None:
+        fingerprint = None
+    else:
+        fingerprint = cache.fingerprint(image_path, cache_key)
+        dimensions = cache.get(fingerprint, DIMENSIONS_CACHE_NAME)
+        if dimensions is not None:
+            return (*dimensions, False)
+    if progress is not None:
+        progress.reading(cache_key)
+    img = open_image(image_path)
+    width, height = img.size
+    img.close()
+    if cache is not None:
+        cache.put(fingerprint, DIMENSIONS_CACHE_NAME, [width, height])
+    return width, height, True
+
+
+def main(args):
+    generate_image_collection(default_image_collection(), verbose=args.verbose)
+    return 0
+
+
+def generate_image_collection(collection, cache=None, stop=None, verbose=False):
+    """
+    Generates the manifest of one image collection.
+
+    Args:
+        collection: Collection dict (see default_image_collection)
+        cache: MetadataCache shared with other collections, for image dimensions; the
+            caller saves it. Without one, every image is opened.
+        stop: threading.Event that stops the run early
+        verbose: Whether to log every image read instead of a progress line
+
+    Returns:
+        True if the manifest was written, False if the run stopped early
+    """
+    image_root = collection["root"]
+    output_path = collection["output"]
     all_images_data = []
     processed_count = 0
     skipped_count = 0
+    invalid_count = 0
+    record_validator = RecordValidator(IMAGE_SCHEMA_FILE)
     
-    print(f"Scanning for images in: {IMAGE_ROOT_DIR.resolve()}")
+    print(f"Scanning for images in: {image_root.resolve()}")
+    # With a shared cache, other collections run concurrently: no status line
+    progress = ProgressReporter(collection["name"], verbose=verbose, live=None if cache is None else False)
     
     # Check if the directory exists
-    if not IMAGE_ROOT_DIR.exists():
-        print(f"Warning: Directory {IMAGE_ROOT_DIR} does not exist. Creating empty manifest.")
-        with open(OUTPUT_JSON_FILE, "w") as f:
+    if not image_root.exists():
+        print(f"Warning: Directory {image_root} does not exist. Creating empty manifest.")
+        with open(output_path, "w") as f:
             json.dump([], f, indent=2)
-        print(f"Empty manifest created: {OUTPUT_JSON_FILE.resolve()}")
-        return
+        print(f"Empty manifest created: {output_path.resolve()}")
+        return True
     
     # Walk through all subdirectories
-    for root, _, files in os.walk(IMAGE_ROOT_DIR):
+    for root, _, files in os.walk(image_root):
+        if stop is not None and stop.is_set():
+            progress.finish()
+            print(f"Stopped {collection['name']} after {processed_count} images.")
+            return False
         for filename in files:
             # Support common image formats
             if not filename.lower().endswith((".jpg", ".jpeg", ".png", ".webp", ".avif", ".gif", ".svg")):
@@ -63,58 +137,61 @@ def main():
             image_path = Path(root) / filename
             
             try:
-                relative_path = image_path.relative_to(IMAGE_ROOT_DIR)
+                relative_path = image_path.relative_to(image_root)
                 # Prepend collection path to make path relative to web root
-                relative_path_from_web_root = COLLECTION_PATH / relative_path
-                print(f"Processing: {relative_path_from_web_root}")
+                relative_path_from_web_root = collection["collection_path"] / relative_path
                 
                 # Get image dimensions
                 # Note: SVG files might not work with PIL, handle that case
                 try:
-                    img = Image.open(image_path)
-                    width, height = img.size
-                    img.close()
+                    # Namespaced like the photo collections' keys in a shared cache
+                    cache_key = f"{collection['name']}:{relative_path_from_web_root.as_posix()}"
+                    width, height, opened = _dimensions(image_path, cache_key, cache, progress)
                 except Exception:
                     # If we can't open it (e.g., SVG), skip it
-                    print(f"Warning: Could not read dimensions for {relative_path}, skipping.")
+                    progress.problem(f"Warning: Could not read dimensions for {relative_path}, skipping.")
                     skipped_count += 1
                     continue
                 
                 # Get file metadata
                 file_info = get_file_info(image_path)
                 
-                # Generate slug from relative_path_from_web_root
-                slug = str(relative_path_from_web_root.with_suffix('')).replace(os.sep, '-')
-                
-                image_data = {
-                    "relativePath": str(relative_path_from_web_root.as_posix()),
-                    "filename": filename,
-                    "width": width,
-                    "height": height,
-                    "slug": slug,
-                    "fileSize": file_info["fileSize"],
-                    "lastModified": file_info["lastModified"]
-                }
-                
+                image_data = build_image_record(relative_path_from_web_root, filename, width, height, file_info)
+
+                errors = record_validator.errors(image_data)
+                if errors:
+                    progress.problem("\n".join([f"Warning: {relative_path_from_web_root} does not match the schema:", *(f"  {error}" for error in errors)]))
+                    invalid_count += 1
+
                 all_images_data.append(image_data)
                 processed_count += 1
+                progress.file_done(opened)
                 
             except Exception as e:
-                print(f"Error processing {image_path}: {e}")
+                progress.problem(f"Error processing {image_path}: {e}")
                 skipped_count += 1
+    progress.finish()
     
     # Sort by relative path for consistency
     all_images_data.sort(key=lambda x: x["relativePath"])
     
     # Write output
-    with open(OUTPUT_JSON_FILE, "w") as f:
+    # Swapped in atomically, so readers such as manifest_server.py never see a partial file
+    temp_path = output_path.with_name(output_path.name + ".tmp")
+    with open(temp_path, "w") as f:
         json.dump(all_images_data, f, indent=2)
+    os.replace(temp_path, output_path)
     
     print(f"\nSuccessfully processed {processed_count} images.")
     if skipped_count > 0:
         print(f"Skipped {skipped_count} files due to errors.")
-    print(f"Manifest file created: {OUTPUT_JSON_FILE.resolve()}")
+    if invalid_count > 0:
+        print(f"{invalid_count} records do not match {IMAGE_SCHEMA_FILE.name}.")
+    print(f"Manifest file created: {output_path.resolve()}")
+    return True
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Generate the image manifest.")
+    parser.add_argument("--verbose", action="store_true", help="Log every image read instead of a progress line.")
+    sys.exit(main(parser.parse_args()))
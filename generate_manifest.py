@@ -1,15 +1,25 @@
 import argparse  # For command-line arguments for debugging
+import hashlib
 import json
 import os
+import time
 from datetime import datetime
+from itertools import chain
 from pathlib import Path
 import io
 
-import pillow_avif  # Register AVIF support in PIL
-from PIL import Image
-from PIL.ExifTags import TAGS
-from PIL.TiffImagePlugin import IFDRational
-import exifread
+from duplicates import DEFAULT_DUPLICATE_RADIUS, find_duplicate_clusters
+from image_io import open_image
+from isolated_worker import WorkerFailure, WorkerPool
+from manifest_cache import MetadataCache
+from manifest_stream import seek_index_path, write_manifest, write_seek_index
+from manifest_validation import PHOTO_SCHEMA_FILE, RecordValidator
+from photo_record import RECORD_FIELDS, ValuePool, metadata_row, record_to_json
+from pixel_analysis import ANALYZERS, analysis_cache_name, cached_analysis, parse_analyzer_names, run_analyzers
+from progress import ProgressReporter
+
+# Pillow, the AVIF plugin, exifread and NumPy are imported inside the functions that use
+# them, so --debug-image and runs with nothing to do don't pay for loading every decoder.
 
 # --- Configuration ---
 # The root directory of the web server (where manifests and collection folders are located)
@@ -18,10 +28,50 @@ WEB_ROOT = Path("/mnt/Web")
 PHOTO_ROOT_DIR = Path("/mnt/Web/photos")
 # The name of the output JSON file.
 OUTPUT_JSON_FILE = Path("/mnt/Web/photo_manifest.json")
+# Precomputed geohash clusters for map views (not written with --no-gps).
+GEO_INDEX_FILE = Path("/mnt/Web/photo_geo_index.json")
+# Precomputed justified-grid layouts for the gallery (not written for partitions or --fields),
+# for each container width and target row height below, with the gap between photos, in px.
+LAYOUT_FILE = Path("/mnt/Web/photo_layouts.json")
+LAYOUT_CONTAINER_WIDTHS = (360, 768, 1280, 1920)
+LAYOUT_ROW_HEIGHTS = (200, 300)
+LAYOUT_GAP = 4
+# Precomputed tree of hierarchical tags ("places|France|Paris"), with the photos under each
+# node (not written for partitions or --fields).
+TAG_TREE_FILE = Path("/mnt/Web/photo_tag_tree.json")
+# Folder of the full-text search index over titles, descriptions, notes and tags, sharded by
+# term prefix and updated in place (not written for partitions or --fields).
+SEARCH_INDEX_DIR = Path("/mnt/Web/photo_search")
+# Pixel analyzers run by default (see pixel_analysis.py); override with --analyzers.
+DEFAULT_ANALYZERS = "thumbhash,palette,phash"
+# Cache of fingerprints, extracted metadata and pixel analysis results reused between runs.
+# Kept outside WEB_ROOT so it is never served.
+CACHE_FILE = Path.home() / ".cache" / "photodraft" / "photo_manifest_cache.json"
+# Seconds between checkpoints of newly computed results during long runs (see --resume).
+CHECKPOINT_INTERVAL = 60
+# Seconds a single image may take to decode and analyze before it is quarantined (see
+# --file-timeout). Images are processed in a separate worker process so that one that hangs
+# or crashes the decoder cannot take the whole run down with it.
+FILE_TIMEOUT = 120
+# Limits applied by --throttle, for background runs on the host serving WEB_ROOT: file read
+# rate in MB/s, threads used for decoding, and the 1-minute load average above which the run
+# pauses. --max-read-rate, --max-workers and --max-load override them.
+THROTTLE_READ_RATE = 20
+THROTTLE_MAX_WORKERS = 1
+THROTTLE_MAX_LOAD = os.cpu_count() or 1
+# Files that have to be read go through a staged pipeline (see pipeline.py): threads looking
+# files up in the cache (fingerprinting the changed ones), worker processes extracting
+# metadata (one per CPU unless --cpu-workers or --max-workers say otherwise), and the
+# queue size between stages. --io-workers, --cpu-workers and --queue-size override them.
+IO_WORKERS = 4
+PIPELINE_QUEUE_SIZE = 64
+# Seconds between queue depth lines printed with --pipeline-stats
+PIPELINE_PROGRESS_INTERVAL = 5
 
 # Calculate the collection path relative to web root (e.g., "photos" or "photography/archive")
 COLLECTION_PATH = PHOTO_ROOT_DIR.relative_to(WEB_ROOT)
-# Tags to exclude from the manifest (case-insensitive)
+# Tags to exclude from the manifest (case-insensitive). A hierarchical tag is excluded if
+# the whole tag or any part of its path is listed: "darktable" drops "darktable|exported".
 # These are typically technical tags added by photo editing software that aren't useful for users
 EXCLUDED_TAGS = {
     "darktable",  # Darktable editor tag
@@ -35,6 +85,28 @@ EXCLUDED_TAGS = {
 }
 # --- End Configuration ---
 
+EXCLUDED_TAGS_LOWER = frozenset(tag.lower() for tag in EXCLUDED_TAGS)
+
+# Bump when the output of extract_photo_metadata changes, to invalidate cached metadata
+METADATA_VERSION = 3
+# Parsing stages of extract_photo_metadata: image header (dimensions), EXIF and XMP
+EXTRACTION_STAGES = ("dims", "exif", "xmp")
+# Ways to read image metadata (see get_exif_data); they produce the same fields
+METADATA_READERS = ("pillow", "mmap")
+# Stages each metadata field is read from. Fields with an EXIF fallback for missing XMP
+# need both. See --fields.
+FIELD_STAGES = {
+    "width": {"dims"}, "height": {"dims"},
+    "title": {"exif", "xmp"}, "description": {"exif", "xmp"}, "tags": {"exif", "xmp"},
+    "tagPaths": {"xmp"},
+    "creator": {"exif", "xmp"}, "copyright": {"exif", "xmp"}, "notes": {"xmp"},
+    **dict.fromkeys((
+        "dateTaken", "cameraModel", "lensModel", "flash", "focalLength", "focalLength35mmEquiv",
+        "focalLengthCategory", "cropFactor", "apertureValue", "isoSpeedRatings", "exposureTime",
+        "latitude", "longitude", "altitude",
+    ), {"exif"}),
+}
+
 def clean_exif_string(value):
     """Cleans null characters from a string and strips whitespace."""
     if isinstance(value, str):
@@ -45,6 +117,8 @@ def clean_exif_string(value):
 
 def format_ifd_rational_value(value):
     """Converts IFDRational objects to float for JSON serialization."""
+    from PIL.TiffImagePlugin import IFDRational
+
     if isinstance(value, IFDRational):
         return float(value)  # IFDRational can be directly converted to float
     elif isinstance(value, tuple):
@@ -52,244 +126,295 @@ def format_ifd_rational_value(value):
         return tuple(format_ifd_rational_value(item) for item in value)
     return value  # Return other types as is
 
-def get_exif_data(image_path):
-    """Extracts EXIF and attempts to extract XMP data from an image."""
+def get_exif_data(image_path, exif=True, xmp=True, reader="pillow"):
+    """
+    Extracts EXIF and attempts to extract XMP data from an image.
+
+    Args:
+        image_path: Path to the image
+        exif: Read the EXIF data, including the GPS IFD
+        xmp: Read and walk the XMP packet
+        reader: "pillow", or "mmap" to parse the metadata in place in a memory-mapped
+            file (see mapped_image.py); files it can't read are read through Pillow
+    """
+    from PIL.ExifTags import GPSTAGS, TAGS
+
     exif_data = {}
     xmp_data_dict = {}  # For parsed XMP
 
     try:
-        img = Image.open(image_path)
-
-        # Handle EXIF extraction based on image format
-        if img.format == 'AVIF':
-            # For AVIF files, use multiple methods to get comprehensive EXIF data
-            
-            # Method 1: Standard getexif() for basic data
+        img = None
+        if reader == "mmap":
             try:
-                basic_exif = img.getexif()
-                if basic_exif:
-                    for tag_id, value in basic_exif.items():
-                        tag_name = TAGS.get(tag_id, tag_id)
-                        exif_data[tag_name] = value
+                from mapped_image import open_mapped
+
+                img = open_mapped(image_path)
             except Exception:
-                pass
+                # Anything the mapped reader can't handle, including its own failures, is
+                # read through Pillow rather than cached as a file without metadata
+                img = None
+        if img is None:
+            img = open_image(image_path)
+
+        gps_data = {}
+        if exif:
+            # Handle EXIF extraction based on image format
+            if img.format == 'AVIF':
+                # For AVIF files, use multiple methods to get comprehensive EXIF data
             
-            # Method 2: Get detailed EXIF data from IFD
-            try:
-                exif_ifd = img.getexif().get_ifd(0x8769)  # EXIF IFD
-                if exif_ifd:
-                    for tag_id, value in exif_ifd.items():
-                        tag_name = TAGS.get(tag_id, tag_id)
-                        exif_data[tag_name] = value
-            except Exception:
-                pass
+                # Method 1: Standard getexif() for basic data
+                try:
+                    basic_exif = img.getexif()
+                    if basic_exif:
+                        for tag_id, value in basic_exif.items():
+                            tag_name = TAGS.get(tag_id, tag_id)
+                            exif_data[tag_name] = value
+                except Exception:
+                    pass
             
-            # Method 3: Parse raw EXIF bytes with exifread for maximum compatibility
-            try:
-                if 'exif' in img.info:
-                    exif_bytes = img.info['exif']
-                    exif_stream = io.BytesIO(exif_bytes)
-                    tags = exifread.process_file(exif_stream, details=False)
-                    
-                    for tag_name, tag_value in tags.items():
-                        # Convert exifread tag names to standard EXIF tag names
-                        if tag_name.startswith('EXIF '):
-                            clean_tag = tag_name.replace('EXIF ', '')
-                        elif tag_name.startswith('Image '):
-                            clean_tag = tag_name.replace('Image ', '')
+                # Method 2: Get detailed EXIF data from IFD
+                try:
+                    exif_ifd = img.getexif().get_ifd(0x8769)  # EXIF IFD
+                    if exif_ifd:
+                        for tag_id, value in exif_ifd.items():
+                            tag_name = TAGS.get(tag_id, tag_id)
+                            exif_data[tag_name] = value
+                except Exception:
+                    pass
+            
+                # Method 3: Parse raw EXIF bytes with exifread for maximum compatibility
+                try:
+                    if 'exif' in img.info:
+                        import exifread
+
+                        if hasattr(img, "exif_file"):
+                            exif_stream = img.exif_file()  # Mapped: read in place
                         else:
-                            clean_tag = tag_name
+                            exif_stream = io.BytesIO(img.info['exif'])
+                        tags = exifread.process_file(exif_stream, details=False)
+                    
+                        for tag_name, tag_value in tags.items():
+                            # Convert exifread tag names to standard EXIF tag names
+                            if tag_name.startswith('EXIF '):
+                                clean_tag = tag_name.replace('EXIF ', '')
+                            elif tag_name.startswith('Image '):
+                                clean_tag = tag_name.replace('Image ', '')
+                            else:
+                                clean_tag = tag_name
                         
-                        # Convert common tag names to PIL standard names
-                        tag_mapping = {
-                            'ExposureTime': 'ExposureTime',
-                            'FNumber': 'FNumber', 
-                            'ISOSpeedRatings': 'ISOSpeedRatings',
-                            'FocalLength': 'FocalLength',
-                            'Flash': 'Flash',
-                            'DateTimeOriginal': 'DateTimeOriginal',
-                            'DateTime': 'DateTime',
-                            'Make': 'Make',
-                            'Model': 'Model',
-                            'Artist': 'Artist',
-                            'Copyright': 'Copyright',
-                            'LensModel': 'LensModel'
-                        }
+                            # Convert common tag names to PIL standard names
+                            tag_mapping = {
+                                'ExposureTime': 'ExposureTime',
+                                'FNumber': 'FNumber', 
+                                'ISOSpeedRatings': 'ISOSpeedRatings',
+                                'FocalLength': 'FocalLength',
+                                'Flash': 'Flash',
+                                'DateTimeOriginal': 'DateTimeOriginal',
+                                'DateTime': 'DateTime',
+                                'Make': 'Make',
+                                'Model': 'Model',
+                                'Artist': 'Artist',
+                                'Copyright': 'Copyright',
+                                'LensModel': 'LensModel'
+                            }
                         
-                        mapped_tag = tag_mapping.get(clean_tag, clean_tag)
+                            mapped_tag = tag_mapping.get(clean_tag, clean_tag)
                         
-                        # Convert exifread values to appropriate types
-                        str_value = str(tag_value)
-                        if '/' in str_value and clean_tag in ['ExposureTime', 'FNumber', 'FocalLength']:
-                            # Handle fractional values
-                            try:
-                                parts = str_value.split('/')
-                                if len(parts) == 2:
-                                    exif_data[mapped_tag] = float(parts[0]) / float(parts[1])
-                                else:
+                            # Convert exifread values to appropriate types
+                            str_value = str(tag_value)
+                            if '/' in str_value and clean_tag in ['ExposureTime', 'FNumber', 'FocalLength']:
+                                # Handle fractional values
+                                try:
+                                    parts = str_value.split('/')
+                                    if len(parts) == 2:
+                                        exif_data[mapped_tag] = float(parts[0]) / float(parts[1])
+                                    else:
+                                        exif_data[mapped_tag] = str_value
+                                except ValueError:
                                     exif_data[mapped_tag] = str_value
-                            except ValueError:
+                            elif clean_tag in ['ISOSpeedRatings'] and str_value.isdigit():
+                                # Convert ISO to integer
+                                exif_data[mapped_tag] = int(str_value)
+                            elif clean_tag in ['FNumber'] and str_value.replace('.', '').isdigit():
+                                # Convert f-number to float
+                                exif_data[mapped_tag] = float(str_value)
+                            else:
                                 exif_data[mapped_tag] = str_value
-                        elif clean_tag in ['ISOSpeedRatings'] and str_value.isdigit():
-                            # Convert ISO to integer
-                            exif_data[mapped_tag] = int(str_value)
-                        elif clean_tag in ['FNumber'] and str_value.replace('.', '').isdigit():
-                            # Convert f-number to float
-                            exif_data[mapped_tag] = float(str_value)
-                        else:
-                            exif_data[mapped_tag] = str_value
-            except Exception:
-                pass
+                except Exception:
+                    pass
                 
-        else:
-            # Standard EXIF extraction for JPEG and other formats
-            exif_data_raw = img._getexif()  # pylint: disable=protected-access
-            if exif_data_raw:
-                for tag_id, value in exif_data_raw.items():
-                    tag_name = TAGS.get(tag_id, tag_id)
+            else:
+                # Standard EXIF extraction for JPEG and other formats
+                exif_data_raw = img._getexif()  # pylint: disable=protected-access
+                if exif_data_raw:
+                    for tag_id, value in exif_data_raw.items():
+                        tag_name = TAGS.get(tag_id, tag_id)
 
-                    if isinstance(value, bytes):
-                        try:
-                            # Special handling for XPKeywords (often UCS-2 encoded byte string)
-                            if (
-                                tag_name == "XPKeywords"
-                            ):
-                                decoded_value = value.decode("utf-16-le", errors="ignore")
-                                cleaned_value = decoded_value.rstrip("\x00")
-                                exif_data[tag_name] = [
-                                    tag.strip()
-                                    for tag in cleaned_value.split(";")
-                                    if tag.strip()
-                                ]
-                                continue
-                            else:
-                                value = value.decode("utf-8", errors="ignore")
-                        except UnicodeDecodeError:
-                            pass
+                        if isinstance(value, bytes):
+                            try:
+                                # Special handling for XPKeywords (often UCS-2 encoded byte string)
+                                if (
+                                    tag_name == "XPKeywords"
+                                ):
+                                    decoded_value = value.decode("utf-16-le", errors="ignore")
+                                    cleaned_value = decoded_value.rstrip("\x00")
+                                    exif_data[tag_name] = [
+                                        tag.strip()
+                                        for tag in cleaned_value.split(";")
+                                        if tag.strip()
+                                    ]
+                                    continue
+                                else:
+                                    value = value.decode("utf-8", errors="ignore")
+                            except UnicodeDecodeError:
+                                pass
 
-                    exif_data[tag_name] = (
-                        clean_exif_string(value) if isinstance(value, str) else value
-                    )
+                        exif_data[tag_name] = (
+                            clean_exif_string(value) if isinstance(value, str) else value
+                        )
 
-        # Attempt to get XMP data
-        try:
-            xmp_info = img.getxmp()
-            if xmp_info:
-                # Helper to navigate the XMP structure
-                def find_in_xmp(data, path_keys):
-                    current = data
-                    for key_part in path_keys:
-                        if isinstance(current, list):
-                            if current:
-                                current = current[0]
-                            else:
+            # GPS IFD: read through Pillow for every format, so JPEG and AVIF are handled alike
+            try:
+                gps_ifd = img.getexif().get_ifd(0x8825)  # GPS IFD
+                for tag_id, value in gps_ifd.items():
+                    gps_data[GPSTAGS.get(tag_id, tag_id)] = value
+            except Exception:
+                pass
+
+        if xmp:
+            # Attempt to get XMP data
+            try:
+                xmp_info = img.getxmp()
+                if xmp_info:
+                    # Helper to navigate the XMP structure
+                    def find_in_xmp(data, path_keys):
+                        current = data
+                        for key_part in path_keys:
+                            if isinstance(current, list):
+                                if current:
+                                    current = current[0]
+                                else:
+                                    return None
+                            if not isinstance(current, dict) or key_part not in current:
                                 return None
-                        if not isinstance(current, dict) or key_part not in current:
-                            return None
-                        current = current[key_part]
-                    return current
-
-                # Helper to get a simple text value or the first from a list of text values
-                def get_xmp_text_or_list_first(item_dict, key):
-                    value = item_dict.get(key)
-                    if isinstance(value, list) and value:
-                        if all(isinstance(v, str) for v in value):
-                            return str(value[0]).strip()
-                    elif isinstance(value, str):
-                        return value.strip()
-                    elif isinstance(value, dict) and "Bag" in value and isinstance(value["Bag"], dict) and "li" in value["Bag"]:
-                        li_items = value["Bag"]["li"]
-                        if isinstance(li_items, list) and li_items:
-                            if all(isinstance(v, str) for v in li_items):
-                                return str(li_items[0]).strip()
-                        elif isinstance(li_items, str):
-                            return li_items.strip()
-                    return None
-
-                # Helper to get text from a language alternative structure
-                def get_xmp_lang_alt(item_dict, key):
-                    value = item_dict.get(key)
-                    if isinstance(value, dict):
-                        alt_node = value.get("Alt")
-                        if isinstance(alt_node, dict) and "li" in alt_node:
-                            li_items = alt_node["li"]
-                            if not isinstance(li_items, list):
-                                li_items = [li_items]
-                            for li_item in li_items:
-                                if isinstance(li_item, dict) and li_item.get("xml:lang") == "x-default":
-                                    return str(li_item.get("#text", li_item.get("text"))).strip() # Handle cases where text is under #text or text
-                            for li_item in li_items: # Fallback if no x-default
-                                if isinstance(li_item, dict) and ("#text" in li_item or "text" in li_item):
-                                    return str(li_item.get("#text", li_item.get("text"))).strip()
-                                elif isinstance(li_item, str):
-                                    return str(li_item).strip()
-                        elif 'x-default' in value and isinstance(value['x-default'], str):
-                            return value['x-default'].strip()
-                    elif isinstance(value, str):
-                        return value.strip()
-                    return None
-
-                rdf_description = find_in_xmp(xmp_info, ["xmpmeta", "RDF", "Description"])
-                if rdf_description:
-                    descriptions_list = rdf_description if isinstance(rdf_description, list) else [rdf_description]
-                    for desc_item in descriptions_list:
-                        if isinstance(desc_item, dict):
-                            # Subject (Tags)
-                            subject_node = desc_item.get("subject")
-                            if subject_node and isinstance(subject_node, dict) and "Bag" in subject_node and \
-                               isinstance(subject_node["Bag"], dict) and "li" in subject_node["Bag"]:
-                                xmp_tags_list = subject_node["Bag"]["li"]
-                                if isinstance(xmp_tags_list, list):
-                                    xmp_data_dict["dc:subject"] = [str(tag).strip() for tag in xmp_tags_list if tag]
-                                elif isinstance(xmp_tags_list, (str, dict)):
-                                    xmp_data_dict["dc:subject"] = [str(xmp_tags_list).strip()]
-                            elif "subject" in desc_item: # Simpler structure
-                                subject_val = desc_item["subject"]
-                                if isinstance(subject_val, list):
-                                    xmp_data_dict["dc:subject"] = [str(tag).strip() for tag in subject_val if tag]
-                                elif isinstance(subject_val, str):
-                                    xmp_data_dict["dc:subject"] = [subject_val.strip()]
-
-                            # Title
-                            if "dc:title" not in xmp_data_dict:
-                                xmp_title = get_xmp_lang_alt(desc_item, "title")
-                                if xmp_title:
-                                    xmp_data_dict["dc:title"] = xmp_title
-
-                            # Description
-                            if "dc:description" not in xmp_data_dict:
-                                xmp_desc_val = get_xmp_lang_alt(desc_item, "description")
-                                if xmp_desc_val:
-                                    xmp_data_dict["dc:description"] = xmp_desc_val
-
-                            # Creator
-                            if "dc:creator" not in xmp_data_dict:
-                                xmp_creator = get_xmp_text_or_list_first(desc_item, "creator")
-                                if xmp_creator:
-                                    xmp_data_dict["dc:creator"] = xmp_creator
-
-                            # Rights (Copyright)
-                            if "dc:rights" not in xmp_data_dict:
-                                xmp_rights = get_xmp_lang_alt(desc_item, "rights")
-                                if xmp_rights:
-                                    xmp_data_dict["dc:rights"] = xmp_rights
-
-                            # Notes (Darktable-specific field)
-                            if "xmp:notes" not in xmp_data_dict:
-                                xmp_notes = desc_item.get("notes")
-                                if xmp_notes and isinstance(xmp_notes, str):
-                                    xmp_data_dict["xmp:notes"] = xmp_notes.strip()
-
-                            # If we found all desired XMP fields in one description block, we can often break
-                            # However, sometimes fields are split, so we iterate all for safety unless performance dictates otherwise.
-        except AttributeError:
-            pass # img.getxmp() not available
-        except Exception:
-            pass # General XMP parsing error
+                            current = current[key_part]
+                        return current
+
+                    # Helper to get a simple text value or the first from a list of text values
+                    def get_xmp_text_or_list_first(item_dict, key):
+                        value = item_dict.get(key)
+                        if isinstance(value, list) and value:
+                            if all(isinstance(v, str) for v in value):
+                                return str(value[0]).strip()
+                        elif isinstance(value, str):
+                            return value.strip()
+                        elif isinstance(value, dict) and "Bag" in value and isinstance(value["Bag"], dict) and "li" in value["Bag"]:
+                            li_items = value["Bag"]["li"]
+                            if isinstance(li_items, list) and li_items:
+                                if all(isinstance(v, str) for v in li_items):
+                                    return str(li_items[0]).strip()
+                            elif isinstance(li_items, str):
+                                return li_items.strip()
+                        return None
 
+                    # Helper to get text from a language alternative structure
+                    def get_xmp_lang_alt(item_dict, key):
+                        value = item_dict.get(key)
+                        if isinstance(value, dict):
+                            alt_node = value.get("Alt")
+                            if isinstance(alt_node, dict) and "li" in alt_node:
+                                li_items = alt_node["li"]
+                                if not isinstance(li_items, list):
+                                    li_items = [li_items]
+                                for li_item in li_items:
+                                    if isinstance(li_item, dict) and li_item.get("xml:lang") == "x-default":
+                                        return str(li_item.get("#text", li_item.get("text"))).strip() # Handle cases where text is under #text or text
+                                for li_item in li_items: # Fallback if no x-default
+                                    if isinstance(li_item, dict) and ("#text" in li_item or "text" in li_item):
+                                        return str(li_item.get("#text", li_item.get("text"))).strip()
+                                    elif isinstance(li_item, str):
+                                        return str(li_item).strip()
+                            elif 'x-default' in value and isinstance(value['x-default'], str):
+                                return value['x-default'].strip()
+                        elif isinstance(value, str):
+                            return value.strip()
+                        return None
+
+                    rdf_description = find_in_xmp(xmp_info, ["xmpmeta", "RDF", "Description"])
+                    if rdf_description:
+                        descriptions_list = rdf_description if isinstance(rdf_description, list) else [rdf_description]
+                        for desc_item in descriptions_list:
+                            if isinstance(desc_item, dict):
+                                # Subject (Tags)
+                                subject_node = desc_item.get("subject")
+                                if subject_node and isinstance(subject_node, dict) and "Bag" in subject_node and \
+                                   isinstance(subject_node["Bag"], dict) and "li" in subject_node["Bag"]:
+                                    xmp_tags_list = subject_node["Bag"]["li"]
+                                    if isinstance(xmp_tags_list, list):
+                                        xmp_data_dict["dc:subject"] = [str(tag).strip() for tag in xmp_tags_list if tag]
+                                    elif isinstance(xmp_tags_list, (str, dict)):
+                                        xmp_data_dict["dc:subject"] = [str(xmp_tags_list).strip()]
+                                elif "subject" in desc_item: # Simpler structure
+                                    subject_val = desc_item["subject"]
+                                    if isinstance(subject_val, list):
+                                        xmp_data_dict["dc:subject"] = [str(tag).strip() for tag in subject_val if tag]
+                                    elif isinstance(subject_val, str):
+                                        xmp_data_dict["dc:subject"] = [subject_val.strip()]
+
+                                # Hierarchical keywords as paths ("places|France|Paris"), Darktable and Lightroom
+                                hierarchy_node = desc_item.get("hierarchicalSubject")
+                                if isinstance(hierarchy_node, dict) and isinstance(hierarchy_node.get("Bag"), dict):
+                                    hierarchy_node = hierarchy_node["Bag"].get("li")
+                                if isinstance(hierarchy_node, str):
+                                    hierarchy_node = [hierarchy_node]
+                                if isinstance(hierarchy_node, list):
+                                    hierarchy = [str(tag).strip() for tag in hierarchy_node if tag and isinstance(tag, str)]
+                                    if hierarchy:
+                                        xmp_data_dict["lr:hierarchicalSubject"] = hierarchy
+
+                                # Title
+                                if "dc:title" not in xmp_data_dict:
+                                    xmp_title = get_xmp_lang_alt(desc_item, "title")
+                                    if xmp_title:
+                                        xmp_data_dict["dc:title"] = xmp_title
+
+                                # Description
+                                if "dc:description" not in xmp_data_dict:
+                                    xmp_desc_val = get_xmp_lang_alt(desc_item, "description")
+                                    if xmp_desc_val:
+                                        xmp_data_dict["dc:description"] = xmp_desc_val
+
+                                # Creator
+                                if "dc:creator" not in xmp_data_dict:
+                                    xmp_creator = get_xmp_text_or_list_first(desc_item, "creator")
+                                    if xmp_creator:
+                                        xmp_data_dict["dc:creator"] = xmp_creator
+
+                                # Rights (Copyright)
+                                if "dc:rights" not in xmp_data_dict:
+                                    xmp_rights = get_xmp_lang_alt(desc_item, "rights")
+                                    if xmp_rights:
+                                        xmp_data_dict["dc:rights"] = xmp_rights
+
+                                # Notes (Darktable-specific field)
+                                if "xmp:notes" not in xmp_data_dict:
+                                    xmp_notes = desc_item.get("notes")
+                                    if xmp_notes and isinstance(xmp_notes, str):
+                                        xmp_data_dict["xmp:notes"] = xmp_notes.strip()
+
+                                # If we found all desired XMP fields in one description block, we can often break
+                                # However, sometimes fields are split, so we iterate all for safety unless performance dictates otherwise.
+            except AttributeError:
+                pass # img.getxmp() not available
+            except Exception:
+                pass # General XMP parsing error
+
+        size = img.size
         img.close()
 
         final_data = exif_data.copy() # Start with EXIF data
+        # Dimensions from the same header parse, so callers don't open the file again
+        final_data["ProcessedSize"] = size
 
         # Title: XMP dc:title or EXIF ImageDescription
         if "dc:title" in xmp_data_dict:
@@ -316,6 +441,11 @@ def get_exif_data(image_path):
         elif "XPKeywords" in exif_data:
             final_data["ProcessedTags"] = exif_data["XPKeywords"]
 
+        # Tag paths: XMP lr:hierarchicalSubject, for the tag tree. It has the full path of
+        # each keyword, where dc:subject may only have the last part.
+        if "lr:hierarchicalSubject" in xmp_data_dict:
+            final_data["ProcessedTagPaths"] = xmp_data_dict["lr:hierarchicalSubject"]
+
         # Creator: XMP dc:creator or EXIF Artist
         if "dc:creator" in xmp_data_dict:
             final_data["ProcessedCreator"] = clean_exif_string(xmp_data_dict["dc:creator"])
@@ -332,10 +462,65 @@ def get_exif_data(image_path):
         if "xmp:notes" in xmp_data_dict:
             final_data["ProcessedNotes"] = clean_exif_string(xmp_data_dict["xmp:notes"])
 
+        # GPS position (decimal degrees, meters)
+        gps_position = parse_gps_position(gps_data)
+        if gps_position:
+            final_data["ProcessedGPS"] = gps_position
+
         return final_data
     except Exception:
         return {}
 
+def convert_gps_coordinate(value, ref):
+    """
+    Converts an EXIF GPS coordinate to signed decimal degrees.
+
+    Args:
+        value: (degrees, minutes, seconds) tuple of rationals
+        ref: Hemisphere reference ('N', 'S', 'E' or 'W')
+
+    Returns:
+        Decimal degrees rounded to 6 places (~10 cm), or None if not parseable
+    """
+    try:
+        degrees, minutes, seconds = (float(part) for part in value)
+    except (TypeError, ValueError, ZeroDivisionError):
+        return None
+    decimal = degrees + minutes / 60 + seconds / 3600
+    if isinstance(ref, bytes):
+        ref = ref.decode("ascii", errors="ignore")
+    if isinstance(ref, str) and clean_exif_string(ref).upper() in ("S", "W"):
+        decimal = -decimal
+    return round(decimal, 6)
+
+def parse_gps_position(gps_data):
+    """
+    Extracts latitude, longitude and altitude from a GPS IFD dictionary keyed by tag name.
+
+    Returns:
+        Dict with "latitude", "longitude" and "altitude" (None when missing), or None if the
+        image has no usable position
+    """
+    latitude = convert_gps_coordinate(gps_data.get("GPSLatitude"), gps_data.get("GPSLatitudeRef"))
+    longitude = convert_gps_coordinate(gps_data.get("GPSLongitude"), gps_data.get("GPSLongitudeRef"))
+    if latitude is None or longitude is None:
+        return None
+    # Cameras without a fix often write 0/0; out-of-range values are corrupt
+    if (latitude == 0 and longitude == 0) or abs(latitude) > 90 or abs(longitude) > 180:
+        return None
+
+    altitude = None
+    try:
+        if gps_data.get("GPSAltitude") is not None:
+            altitude = round(float(gps_data["GPSAltitude"]), 1)
+            altitude_ref = gps_data.get("GPSAltitudeRef")
+            if altitude_ref in (1, b"\x01", "1"):  # Below sea level
+                altitude = -altitude
+    except (TypeError, ValueError, ZeroDivisionError):
+        altitude = None
+
+    return {"latitude": latitude, "longitude": longitude, "altitude": altitude}
+
 def interpret_flash_value(flash_val):
     """Interprets the EXIF Flash tag value."""
     if flash_val is None:
@@ -354,9 +539,11 @@ def print_all_metadata_for_image(image_path_str):
         print(f"Error: Image not found at {image_path_str}")
         return
 
+    from PIL.ExifTags import TAGS
+
     print(f"--- Metadata for {image_path.name} ---")
     try:
-        img = Image.open(image_path)
+        img = open_image(image_path)
         print(f"Image format: {img.format}")
         print(f"Image size: {img.size}")
         
@@ -390,6 +577,8 @@ def print_all_metadata_for_image(image_path_str):
             # Method 3: Raw EXIF bytes
             try:
                 if 'exif' in img.info:
+                    import exifread
+
                     exif_bytes = img.info['exif']
                     exif_stream = io.BytesIO(exif_bytes)
                     tags = exifread.process_file(exif_stream, details=False)
@@ -459,18 +648,33 @@ def ensure_numeric_type(value, target_type='float'):
         return None
 
 def filter_tags(tags, excluded_tags=None):
-    """Filters out excluded tags (case-insensitive)."""
+    """
+    Filters out excluded tags (case-insensitive).
+
+    A hierarchical tag ("darktable|format|avif") is dropped if the whole tag or any part of
+    its path is excluded.
+
+    Args:
+        tags: List of tags
+        excluded_tags: Set of lowercase tags to drop (default: EXCLUDED_TAGS)
+
+    Returns:
+        The remaining tags, or None if there are none
+    """
     if not tags or not isinstance(tags, list):
         return tags
     
     if excluded_tags is None:
-        excluded_tags = EXCLUDED_TAGS
-    
-    # Convert excluded tags to lowercase for case-insensitive comparison
-    excluded_lower = {tag.lower() for tag in excluded_tags}
+        excluded_tags = EXCLUDED_TAGS_LOWER
     
-    # Filter out excluded tags
-    filtered = [tag for tag in tags if tag.lower() not in excluded_lower]
+    filtered = []
+    for tag in tags:
+        lowered = tag.lower()
+        if lowered in excluded_tags:
+            continue
+        if "|" in lowered and not excluded_tags.isdisjoint(part.strip() for part in lowered.split("|")):
+            continue
+        filtered.append(tag)
     
     # Return None if the list is empty after filtering
     return filtered if filtered else None
@@ -531,126 +735,773 @@ def calculate_crop_factor(focal_length, focal_length_35mm):
     
     return None
 
+def mark_duplicates(records, radius=DEFAULT_DUPLICATE_RADIUS):
+    """
+    Flags near-duplicate photos using their perceptual hashes.
+
+    In each cluster the record with the smallest relativePath (the earliest export folder)
+    is canonical; every other member gets `duplicateOf` set to the canonical slug.
+
+    Args:
+        records: List of manifest records (modified in place)
+        radius: Maximum Hamming distance between perceptual hashes of duplicates
+
+    Returns:
+        Duplicate-cluster report: a list of {"canonical", "members"} dicts
+    """
+    hashes = [
+        int(record["perceptualHash"], 16) if record.get("perceptualHash") else None
+        for record in records
+    ]
+    report = []
+    for cluster in find_duplicate_clusters(hashes, radius):
+        members = sorted(cluster, key=lambda i: records[i]["relativePath"])
+        canonical = records[members[0]]
+        for i in members[1:]:
+            records[i]["duplicateOf"] = canonical["slug"]
+        report.append({
+            "canonical": canonical["slug"],
+            "members": [
+                {
+                    "slug": records[i]["slug"],
+                    "relativePath": records[i]["relativePath"],
+                    "distance": (hashes[i] ^ hashes[members[0]]).bit_count(),
+                }
+                for i in members
+            ],
+        })
+    report.sort(key=lambda cluster: cluster["members"][0]["relativePath"])
+    return report
+
+def extract_photo_metadata(image_path, stages=EXTRACTION_STAGES, reader="pillow"):
+    """
+    Extracts every manifest field that depends only on the file's content.
+
+    Path-derived fields (relativePath, slug, year/month/day) and pixel analysis fields are
+    added by the caller, so the result can be cached per content fingerprint.
+
+    Args:
+        image_path: Path to the image
+        stages: Parsing stages to run (see EXTRACTION_STAGES); fields of skipped stages
+            are left out
+        reader: Metadata reader (see METADATA_READERS)
+
+    Returns:
+        Dict of manifest fields
+    """
+    stages = set(stages)
+    metadata = {}
+    exif_data = {}
+    if "exif" in stages or "xmp" in stages:
+        exif_data = get_exif_data(image_path, exif="exif" in stages, xmp="xmp" in stages, reader=reader)
+    if "dims" in stages:
+        if "ProcessedSize" in exif_data:
+            metadata["width"], metadata["height"] = exif_data["ProcessedSize"]
+        else:
+            temp_img_for_dims = open_image(image_path)
+            metadata["width"], metadata["height"] = temp_img_for_dims.size
+            temp_img_for_dims.close()
+    if "exif" not in stages and "xmp" not in stages:
+        return metadata
+
+    date_taken_str = exif_data.get("DateTimeOriginal") or exif_data.get("DateTime")
+    date_taken_iso = parse_exif_date(date_taken_str)
+
+    title = exif_data.get("ProcessedTitle", None)
+    description = exif_data.get("ProcessedDescription", None)
+    tags = exif_data.get("ProcessedTags", [])
+    if not isinstance(tags, list):
+        tags = []
+
+    # Filter out excluded tags
+    tags = filter_tags(tags)
+    tag_paths = filter_tags(exif_data.get("ProcessedTagPaths"))
+
+    lens_model_processed = clean_exif_string(exif_data.get("LensModel", None))
+    camera_model_processed = clean_exif_string(exif_data.get("Model", None))
+
+    flash_info_raw = exif_data.get("Flash")
+    flash_fired_boolean = None
+    if flash_info_raw is not None:
+        # Handle both integer and string flash values
+        if isinstance(flash_info_raw, (int, float)):
+            flash_fired_boolean = bool(int(flash_info_raw) & 0x1)
+        elif isinstance(flash_info_raw, str):
+            if "fired" in flash_info_raw.lower():
+                flash_fired_boolean = True
+            elif "not fire" in flash_info_raw.lower():
+                flash_fired_boolean = False
+            else:
+                # Try to parse as integer
+                try:
+                    flash_fired_boolean = bool(int(flash_info_raw) & 0x1)
+                except ValueError:
+                    flash_fired_boolean = None
+
+    # Calculate crop factor and focal length classification
+    focal_length_35mm = exif_data.get("FocalLengthIn35mmFilm")
+    focal_length_category = classify_focal_length(focal_length_35mm)
+    crop_factor = calculate_crop_factor(
+        exif_data.get("FocalLength"),
+        focal_length_35mm
+    )
+
+    gps_position = exif_data.get("ProcessedGPS") or {}
+
+    fields = {
+        "dateTaken": date_taken_iso,
+        "title": title, "description": description,
+        "tags": tags,
+        "tagPaths": tag_paths,
+        "cameraModel": camera_model_processed,
+        "lensModel": lens_model_processed,
+        "flash": flash_fired_boolean,
+        "focalLength": ensure_numeric_type(format_ifd_rational_value(exif_data.get("FocalLength")), 'float'),
+        "focalLength35mmEquiv": ensure_numeric_type(focal_length_35mm, 'int'),
+        "focalLengthCategory": focal_length_category,
+        "cropFactor": crop_factor,
+        "apertureValue": ensure_numeric_type(format_ifd_rational_value(exif_data.get("FNumber")), 'float'),
+        "isoSpeedRatings": ensure_numeric_type(exif_data.get("ISOSpeedRatings"), 'int'),
+        "exposureTime": ensure_numeric_type(format_ifd_rational_value(exif_data.get("ExposureTime")), 'float'),
+        "creator": exif_data.get("ProcessedCreator", None),
+        "copyright": exif_data.get("ProcessedCopyright", None),
+        "notes": exif_data.get("ProcessedNotes", None),
+        "latitude": gps_position.get("latitude"),
+        "longitude": gps_position.get("longitude"),
+        "altitude": gps_position.get("altitude"),
+    }
+    metadata.update((name, value) for name, value in fields.items() if stages >= FIELD_STAGES[name])
+    return metadata
+
+def process_photo(image_path, stages, analyzer_names, reader="pillow"):
+    """
+    Does all the work on one image that needs to read its content: metadata extraction and
+    pixel analysis. Runs in the isolated worker process (see FILE_TIMEOUT).
+
+    Args:
+        image_path: Path to the image on disk
+        stages: Metadata extraction stages to run, or None if the metadata is cached
+        analyzer_names: Names of the analyzers whose results are not cached
+        reader: Metadata reader (see METADATA_READERS)
+
+    Returns:
+        Tuple of (extract_photo_metadata() dict or None, {analyzer name: fields})
+    """
+    metadata = extract_photo_metadata(image_path, stages, reader) if stages else None
+    return metadata, run_analyzers(image_path, analyzer_names)
+
+def configure_throttle(args):
+    """
+    Applies the throttling options: scheduling priority and thread limits right away, and
+    returns a Throttle to pace reads with (or None if reads are not limited).
+    """
+    if not (args.throttle or args.max_read_rate or args.max_workers or args.max_load):
+        return None
+    from throttle import Throttle, limit_threads, lower_priority
+
+    read_rate = args.max_read_rate
+    max_workers = args.max_workers
+    max_load = args.max_load
+    if args.throttle:
+        for warning in lower_priority():
+            print(f"Warning: {warning}")
+        read_rate = read_rate or THROTTLE_READ_RATE
+        max_workers = max_workers or THROTTLE_MAX_WORKERS
+        max_load = max_load or THROTTLE_MAX_LOAD
+    if max_workers:
+        limit_threads(max_workers)
+    print(
+        "Throttled: "
+        + ", ".join([
+            f"{read_rate:g} MB/s" if read_rate else "no read rate cap",
+            f"{max_workers} decoder threads" if max_workers else "default decoder threads",
+            f"pausing above load {max_load:g}" if max_load else "no load limit",
+        ])
+    )
+    if not (read_rate or max_load):
+        return None
+    return Throttle(read_rate * 1024 * 1024 if read_rate else None, max_load)
+
+def parse_field_names(value, schema):
+    """
+    Parses a --fields list of manifest property names.
+
+    The fields the schema requires are always included.
+
+    Args:
+        value: Comma-separated property names of the photo manifest schema
+        schema: The photo manifest schema
+
+    Returns:
+        Tuple of field names in manifest order
+
+    Raises:
+        ValueError: If a name is not a property of the schema
+    """
+    item_schema = schema.get("items", {})
+    names = {name.strip() for name in value.split(",") if name.strip()}
+    unknown = names - set(item_schema.get("properties", {}))
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}. Use property names of {PHOTO_SCHEMA_FILE.name}")
+    names.update(item_schema.get("required", ()))
+    return tuple(name for name in RECORD_FIELDS if name in names)
+
+def manifest_signature(file_fingerprints, settings):
+    """
+    Fingerprints everything the outputs depend on: the set of files, their content
+    fingerprints and the settings that change the output.
+
+    Args:
+        file_fingerprints: List of (cache key, content fingerprint) tuples
+        settings: JSON-serializable dict of output-affecting settings
+
+    Returns:
+        Hex digest string
+    """
+    digest = hashlib.blake2b(json.dumps(settings, sort_keys=True).encode(), digest_size=16)
+    for key, fingerprint in sorted(file_fingerprints):
+        digest.update(f"{key}\0{fingerprint}\n".encode())
+    return digest.hexdigest()
+
+def parse_partition(value):
+    """
+    Parses a --partition selector.
+
+    "years:2019-2021" (or "years:2020") selects the YYYY folders in that range.
+    "bucket:K/N" selects the K-th of N buckets (1 <= K <= N), by a stable hash of each
+    file's path, so that N machines or processes each get a similar share of the files.
+
+    Returns:
+        Dict with "name" (used in file names) and either "years" (first, last) or
+        "bucket" (K, N)
+    """
+    kind, _, spec = value.partition(":")
+    try:
+        if kind == "years":
+            first, _, last = spec.partition("-")
+            years = (int(first), int(last or first))
+            if years[0] > years[1]:
+                raise ValueError
+            return {"name": f"years-{years[0]}-{years[1]}", "years": years}
+        if kind == "bucket":
+            index, _, count = spec.partition("/")
+            bucket = (int(index), int(count))
+            if not 1 <= bucket[0] <= bucket[1]:
+                raise ValueError
+            return {"name": f"bucket-{bucket[0]}-of-{bucket[1]}", "bucket": bucket}
+    except ValueError:
+        pass
+    raise ValueError(f"Invalid partition '{value}'. Use years:FIRST-LAST or bucket:K/N")
+
+def path_bucket(cache_key, count):
+    """Returns the 1-based bucket of a collection path; stable across machines and runs."""
+    digest = hashlib.blake2b(cache_key.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % count + 1
+
+def default_photo_collection():
+    """
+    Describes the collection configured by the constants at the top of this file, in the
+    form collection_config.load_config() returns for collections.toml entries.
+    """
+    return {
+        "name": "photos",
+        "type": "photo",
+        "root": PHOTO_ROOT_DIR,
+        "collection_path": COLLECTION_PATH,
+        "output": OUTPUT_JSON_FILE,
+        "geo_index": GEO_INDEX_FILE,
+        "layouts": LAYOUT_FILE,
+        "tag_tree": TAG_TREE_FILE,
+        "search_index": SEARCH_INDEX_DIR,
+        "excluded_tags": set(),  # In addition to EXCLUDED_TAGS
+    }
+
+def folder_date(path_parts):
+    """
+    Reads the date of a photo from its YYYY/MM/DD folders.
+
+    Args:
+        path_parts: Folder names from the collection root down to the photo
+
+    Returns:
+        Tuple of (year, month, day), or (None, None, None) for photos outside such folders
+    """
+    if len(path_parts) >= 3:
+        try:
+            return int(path_parts[0]), int(path_parts[1]), int(path_parts[2])
+        except ValueError:
+            print(f"Warning: Could not parse date from path for {os.sep.join(path_parts)}.")
+    return None, None, None
+
+def iter_photo_files(collection, partition=None):
+    """
+    Walks a photo collection's root directory for supported images.
+
+    Paths are handled as plain strings: pathlib's per-call overhead dominates a run where
+    every file is served from the cache.
+
+    Args:
+        collection: Collection dict (see default_photo_collection)
+        partition: Optional partition from parse_partition(); folders outside a year range
+            are not descended into
+
+    Yields:
+        Tuples of (image path, path relative to web root, filename, year, month, day)
+    """
+    photo_root = os.fspath(collection["root"])
+    years = partition and partition.get("years")
+    bucket = partition and partition.get("bucket")
+    for root, dirs, files in os.walk(photo_root):
+        relative_dir = root[len(photo_root):].strip(os.sep)
+        path_parts = relative_dir.split(os.sep) if relative_dir else []
+        if years and not path_parts:
+            dirs[:] = [d for d in dirs if d.isdigit() and years[0] <= int(d) <= years[1]]
+            continue
+        # Prepend collection path to make paths relative to web root
+        collection_dir = "/".join([*collection["collection_path"].parts, *path_parts])
+
+        year, month, day = folder_date(path_parts)
+
+        for filename in files:
+            if not filename.lower().endswith((".jpg", ".jpeg", ".png", ".webp", ".avif")):
+                continue
+            cache_key = f"{collection_dir}/{filename}"
+            if bucket and path_bucket(cache_key, bucket[1]) != bucket[0]:
+                continue
+            yield os.path.join(root, filename), cache_key, filename, year, month, day
+
+def manifest_sort_key(record):
+    """
+    Sort key for manifest order (use with reverse=True): newest first, ties broken by path
+    so that merged partial manifests come out in the same order as a full run.
+    """
+    return (record.get("dateTaken") or "0000-00-00T00:00:00", record.get("relativePath") or "")
+
+def write_photo_outputs(records, output_path, geo_index_path=None, duplicate_radius=None, duplicate_report_path=None, fields=None, layout_path=None, tag_tree_path=None, search_index_path=None, record_validator=None):
+    """
+    Marks near-duplicates, then writes the manifest and its seek index, the geo index, the
+    grid layouts, the tag tree and the search index.
+
+    Args:
+        records: Records in manifest order (see manifest_sort_key)
+        output_path: Manifest file to write
+        geo_index_path: Geo index file to write, or None to skip it
+        duplicate_radius: Hamming radius for near-duplicates, or None to skip detection
+        duplicate_report_path: Optional path for the duplicate-cluster report
+        fields: Manifest fields to write, or None for all of them
+        layout_path: Justified-grid layout file to write, or None to skip it
+        tag_tree_path: Tag tree file to write, or None to skip it
+        search_index_path: Search index folder to update, or None to skip it
+        record_validator: RecordValidator for the records marked as duplicates, or None
+    """
+    if duplicate_radius is not None:
+        duplicate_report = mark_duplicates(records, duplicate_radius)
+        if duplicate_report:
+            print(f"Found {len(duplicate_report)} near-duplicate clusters.")
+        if record_validator is not None:
+            # duplicateOf is only set here, after the records were validated
+            for record in records:
+                if record["duplicateOf"] is None:
+                    continue
+                errors = record_validator.errors(record.to_dict(fields or RECORD_FIELDS))
+                if errors:
+                    print("\n".join([f"Warning: {record['relativePath']} does not match the schema:", *(f"  {error}" for error in errors)]))
+        if duplicate_report_path:
+            with open(duplicate_report_path, "w") as f:
+                json.dump(duplicate_report, f, indent=2)
+            print(f"Duplicate report created: {Path(duplicate_report_path).resolve()}")
+
+    # Swapped in atomically, so readers such as manifest_server.py never see a partial file
+    temp_path = Path(output_path).with_name(Path(output_path).name + ".tmp")
+    with open(temp_path, "w") as f:
+        seek_entries = write_manifest(f, records, default=record_to_json if fields is None else (lambda record: record.to_dict(fields)))
+    os.replace(temp_path, output_path)
+    write_seek_index(output_path, seek_entries)
+    if geo_index_path:
+        from geo_index import build_geo_index
+
+        geo_index = build_geo_index(records)
+        with open(geo_index_path, "w") as f:
+            json.dump(geo_index, f, separators=(",", ":"))
+        print(f"Geo index created for {geo_index['located']} located photos: {Path(geo_index_path).resolve()}")
+    if layout_path:
+        from justified_layout import build_layouts
+
+        layouts = build_layouts(records, LAYOUT_CONTAINER_WIDTHS, LAYOUT_ROW_HEIGHTS, LAYOUT_GAP)
+        with open(layout_path, "w") as f:
+            json.dump(layouts, f, separators=(",", ":"))
+        print(f"Grid layouts created for {len(layouts['layouts'])} container sizes: {Path(layout_path).resolve()}")
+    if tag_tree_path:
+        from tag_tree import build_tag_tree
+
+        tag_tree = build_tag_tree(records)
+        with open(tag_tree_path, "w") as f:
+            json.dump(tag_tree, f, separators=(",", ":"))
+        print(f"Tag tree created with {len(tag_tree['nodes'])} tags for {tag_tree['tagged']} tagged photos: {Path(tag_tree_path).resolve()}")
+    if search_index_path:
+        from search_index import write_search_index
+
+        written, shards = write_search_index(records, search_index_path)
+        print(f"Search index updated ({written} of {shards} shards changed): {Path(search_index_path).resolve()}")
+
+def load_cache(cache_file, resume):
+    """Loads a metadata cache, then resumes from or discards the checkpoint of an earlier run."""
+    cache = MetadataCache.load(cache_file)
+    if resume:
+        restored = cache.resume()
+        if restored is None:
+            print("No checkpoint to resume from; starting a normal run.")
+        else:
+            print(f"Resuming from checkpoint: {restored} files restored.")
+    elif cache.discard_journal():
+        print("Discarded the checkpoint of an interrupted run (use --resume to continue from it).")
+    return cache
+
 def main(args):
     if args.debug_image:
         print_all_metadata_for_image(args.debug_image)
         return
+    generate_photo_collection(args, default_photo_collection())
+
+def generate_photo_collection(args, collection, cache=None, worker=None, throttle=None, stop=None):
+    """
+    Generates the manifest and companion files of one photo collection.
+
+    Run on its own (cache=None), it loads, checkpoints and saves its own cache and starts
+    its own worker. generate_collections.py instead runs several collections concurrently
+    with a shared cache, worker pool and throttle, which it then saves itself.
+
+    Args:
+        args: Parsed command-line arguments (see build_arg_parser)
+        collection: Collection dict (see default_photo_collection)
+        cache: Shared MetadataCache, or None
+        worker: Shared worker (anything with IsolatedWorker.call), used with a shared cache
+        throttle: Shared Throttle, used with a shared cache
+        stop: threading.Event that stops the run early, used with a shared cache
+
+    Returns:
+        True if the outputs were written or are up to date, False if the run stopped early
+    """
+    # Imported here: extraction imports this module
+    from extraction import build_photo_record
 
+    owns_cache = cache is None
     all_images_data = []
     processed_count = 0
+    extracted_count = 0
     skipped_count = 0
-    print(f"Scanning for images in: {PHOTO_ROOT_DIR.resolve()}")
+    quarantined_count = 0
+    invalid_count = 0
+    file_fingerprints = []
+    record_validator = RecordValidator(PHOTO_SCHEMA_FILE)
+    try:
+        analyzer_names = parse_analyzer_names(args.analyzers)
+        partition = parse_partition(args.partition) if args.partition else None
+        fields = parse_field_names(args.fields, record_validator.schema) if args.fields else None
+    except ValueError as e:
+        print(f"Error: {e}")
+        return False
+    metadata_reader = args.metadata_reader
+    if metadata_reader == "mmap":
+        from mapped_image import UNAVAILABLE
 
-    for root, _, files in os.walk(PHOTO_ROOT_DIR):
-        for filename in files:
-            if not filename.lower().endswith((".jpg", ".jpeg", ".png", ".webp", ".avif")):
-                continue
+        if UNAVAILABLE:
+            print(f"Warning: --metadata-reader mmap is disabled: {UNAVAILABLE}. Reading metadata through Pillow.")
+            metadata_reader = "pillow"
+    stages = EXTRACTION_STAGES
+    if fields:
+        # Only run the parsing stages and analyzers the selected fields come from
+        stages = tuple(stage for stage in EXTRACTION_STAGES if any(stage in FIELD_STAGES.get(name, ()) for name in fields))
+        analyzer_names = [
+            name for name in analyzer_names
+            if set(ANALYZERS[name]["fields"]) & set(fields) or (name == "phash" and "duplicateOf" in fields)
+        ]
+        print(f"Selected fields: {', '.join(fields)} (stages: {', '.join(stages) or 'none'}; analyzers: {', '.join(analyzer_names) or 'none'})")
+    default_output = collection["output"]
+    output_path = Path(args.output) if args.output else default_output
+    cache_file = CACHE_FILE
+    if not args.output and (partition or fields):
+        # Never overwrite the full manifest with a partial one
+        name_parts = [partition["name"]] if partition else []
+        name_parts += ["fields"] if fields else []
+        output_path = default_output.with_name(f"{default_output.stem}.{'.'.join(name_parts)}.json")
+    if partition:
+        # Each partition keeps its own cache, so that partitions can run concurrently
+        cache_file = CACHE_FILE.with_name(f"{CACHE_FILE.stem}.{partition['name']}.json")
+        if args.duplicate_report:
+            print("Warning: --duplicate-report is ignored for partitions; pass it to merge_manifests.py.")
+    if owns_cache:
+        cache = load_cache(cache_file, args.resume)
+    # Paths relative to different web roots can coincide, so collections sharing a cache
+    # keep their files and quarantine apart by name
+    key_prefix = "" if owns_cache else f"{collection['name']}:"
+    started = time.monotonic()
+    deadline = started + args.time_budget if args.time_budget else None
+    next_checkpoint = started + CHECKPOINT_INTERVAL
+    pool = ValuePool()
+    metadata_name = f"metadata@{METADATA_VERSION}"
+    # Metadata from a subset of the stages is cached separately: it must never be taken
+    # for complete metadata
+    partial_metadata_name = f"{metadata_name}:{'+'.join(stages)}" if stages != EXTRACTION_STAGES else None
+    settings = {
+        "metadataVersion": METADATA_VERSION,
+        "analyzers": analyzer_names,
+        "duplicateRadius": args.duplicate_radius,
+        "noGps": args.no_gps,
+        "partition": partition,
+        "fields": fields,
+        "layouts": [LAYOUT_CONTAINER_WIDTHS, LAYOUT_ROW_HEIGHTS, LAYOUT_GAP],
+        "excludedTags": sorted(collection["excluded_tags"]),
+    }
+    # Records are validated when they are produced. Unchanged files were validated by an
+    # earlier run, unless the schema or the settings shaping records changed since then.
+    validation_signature = manifest_signature([], {"schema": record_validator.signature, **settings})
+    # Per output, so that collections sharing a cache don't invalidate each other
+    validation_key = f"{PHOTO_SCHEMA_FILE}:{output_path}"
+    validate_all = args.rebuild or cache.output_signature(validation_key) != validation_signature
+    cpu_workers = args.cpu_workers or args.max_workers or (THROTTLE_MAX_WORKERS if args.throttle else os.cpu_count() or 1)
+    if owns_cache:
+        throttle = configure_throttle(args)
+        # Started on the first image that needs decoding, so runs served from the cache don't pay for it
+        worker = WorkerPool(cpu_workers, args.file_timeout) if args.file_timeout else None
+    print(f"Scanning for images in: {collection['root'].resolve()}" + (f" ({partition['name']})" if partition else ""))
+    # Collections sharing a cache run concurrently: their status lines would overwrite each
+    # other, so they only print periodic lines
+    progress = ProgressReporter(collection["name"], verbose=args.verbose, live=None if owns_cache and not args.pipeline_stats else False)
+    if progress.live and not partition:
+        # Files known from the last run, for the ETA
+        prefix = key_prefix + collection["collection_path"].as_posix() + "/"
+        progress.expected = sum(1 for key in cache.files if key.startswith(prefix))
 
-            image_path = Path(root) / filename
-            try:
-                relative_path = image_path.relative_to(PHOTO_ROOT_DIR)
-                # Prepend collection path to make path relative to web root
-                relative_path_from_web_root = COLLECTION_PATH / relative_path
-                print(f"Processing: {relative_path_from_web_root}")
-                
-                path_parts = relative_path.parts
-                year, month, day = None, None, None
-                if len(path_parts) >= 4:
-                    try:
-                        year = int(path_parts[0])
-                        month = int(path_parts[1])
-                        day = int(path_parts[2])
-                    except ValueError:
-                        print(f"Warning: Could not parse date from path for {relative_path}.")
-
-                temp_img_for_dims = Image.open(image_path)
-                width, height = temp_img_for_dims.size
-                temp_img_for_dims.close()
-
-                exif_data = get_exif_data(image_path)
-
-                date_taken_str = exif_data.get("DateTimeOriginal") or exif_data.get("DateTime")
-                date_taken_iso = parse_exif_date(date_taken_str)
-
-                title = exif_data.get("ProcessedTitle", None)
-                description = exif_data.get("ProcessedDescription", None)
-                tags = exif_data.get("ProcessedTags", [])
-                if not isinstance(tags, list):
-                    tags = []
-                
-                # Filter out excluded tags
-                tags = filter_tags(tags)
-                
-                lens_model_processed = clean_exif_string(exif_data.get("LensModel", None))
-                camera_model_processed = clean_exif_string(exif_data.get("Model", None))
-
-                flash_info_raw = exif_data.get("Flash")
-                flash_fired_boolean = None
-                if flash_info_raw is not None:
-                    # Handle both integer and string flash values
-                    if isinstance(flash_info_raw, (int, float)):
-                        flash_fired_boolean = bool(int(flash_info_raw) & 0x1)
-                    elif isinstance(flash_info_raw, str):
-                        if "fired" in flash_info_raw.lower():
-                            flash_fired_boolean = True
-                        elif "not fire" in flash_info_raw.lower():
-                            flash_fired_boolean = False
-                        else:
-                            # Try to parse as integer
-                            try:
-                                flash_fired_boolean = bool(int(flash_info_raw) & 0x1)
-                            except ValueError:
-                                flash_fired_boolean = None
-
-                # Generate slug from relative_path_from_web_root
-                slug = str(relative_path_from_web_root.with_suffix('')).replace(os.sep, '-')
-
-                # Calculate crop factor and focal length classification
-                focal_length_35mm = exif_data.get("FocalLengthIn35mmFilm")
-                focal_length_category = classify_focal_length(focal_length_35mm)
-                crop_factor = calculate_crop_factor(
-                    exif_data.get("FocalLength"),
-                    focal_length_35mm
+    # Each file goes through three steps, which are the stages of the pipeline: look_up
+    # (quarantine check, fingerprint, cache lookups), extract (only for files the cache
+    # can't serve) and assemble (caching results and building the record). Only assemble
+    # updates the counters and the record list, and it runs on one thread.
+    def look_up(item):
+        image_path, cache_key = item[0], item[1]
+        file_key = key_prefix + cache_key
+        job = {"item": item, "status": "ok", "row": None, "pending": ()}
+        try:
+            if args.rebuild:
+                cache.release(file_key)  # Give quarantined files another chance
+            else:
+                quarantine_error = cache.quarantined(image_path, file_key)
+                if quarantine_error:
+                    progress.problem(f"Skipping quarantined file {cache_key}: {quarantine_error}")
+                    job["status"] = "quarantined"
+                    return job
+            # Unchanged files (same size and mtime) are served from the cache
+            # without opening them
+            fingerprint = cache.fingerprint(image_path, file_key)
+            row = None if args.rebuild else cache.get(fingerprint, metadata_name)
+            if row is None and partial_metadata_name and not args.rebuild:
+                row = cache.get(fingerprint, partial_metadata_name)
+            job["changed"] = validate_all or file_key in cache.changed_keys or row is None
+            job["analysis_fields"], job["pending"] = cached_analysis(fingerprint, cache, analyzer_names, refresh=args.rebuild)
+            job["fingerprint"], job["row"] = fingerprint, row
+        except Exception as e:
+            job["status"], job["error"] = "error", e
+        return job
+
+    def needs_reading(job):
+        return job["status"] == "ok" and (job["row"] is None or bool(job["pending"]))
+
+    def extract(job):
+        image_path, cache_key = job["item"][0], job["item"][1]
+        if job["row"] is None:
+            progress.reading(cache_key)
+        try:
+            if throttle:
+                throttle.before_read(os.path.getsize(image_path), deadline)
+            missing_stages = stages if job["row"] is None else None
+            if worker:
+                job["metadata"], job["computed"] = worker.call(process_photo, image_path, missing_stages, job["pending"], metadata_reader)
+            else:
+                job["metadata"], job["computed"] = process_photo(image_path, missing_stages, job["pending"], metadata_reader)
+        except WorkerFailure as e:
+            job["status"], job["error"] = "failed", e
+        except Exception as e:
+            job["status"], job["error"] = "error", e
+        return job
+
+    def assemble(job):
+        nonlocal processed_count, extracted_count, skipped_count, quarantined_count, invalid_count, next_checkpoint
+        image_path, cache_key, filename, year, month, day = job["item"]
+        now = time.monotonic()
+        if now >= next_checkpoint:
+            cache.checkpoint()
+            next_checkpoint = now + CHECKPOINT_INTERVAL
+        if job["status"] == "quarantined":
+            quarantined_count += 1
+            return
+        if job["status"] == "failed":
+            cache.add_to_quarantine(image_path, key_prefix + cache_key, str(job["error"]))
+            progress.problem(f"Quarantined {cache_key}: {job['error']}")
+            quarantined_count += 1
+            return
+        try:
+            if job["status"] == "error":
+                raise job["error"]
+            fingerprint, row, analysis_fields = job["fingerprint"], job["row"], job["analysis_fields"]
+            if "computed" in job:
+                if job["metadata"] is not None:
+                    row = metadata_row(job["metadata"])
+                    cache.put(fingerprint, partial_metadata_name or metadata_name, row)
+                    extracted_count += 1
+                for name, results in job["computed"].items():
+                    cache.put(fingerprint, analysis_cache_name(name), results)
+                    analysis_fields.update(results)
+            file_fingerprints.append((cache_key, fingerprint))
+            # Shared in place, so the cached row drops its duplicates as well
+            pool.share_row(row)
+            image_data = build_photo_record(
+                (cache_key, filename, year, month, day), row, analysis_fields,
+                collection["excluded_tags"], no_gps=args.no_gps,
+            )
+            if job["changed"]:
+                errors = record_validator.errors(image_data.to_dict(fields or RECORD_FIELDS))
+                if errors:
+                    progress.problem("\n".join([f"Warning: {cache_key} does not match the schema:", *(f"  {error}" for error in errors)]))
+                    invalid_count += 1
+            all_images_data.append(image_data)
+            processed_count += 1
+            progress.file_done("computed" in job)
+        except Exception as e:
+            progress.problem(f"Error processing {image_path}: {e}")
+            skipped_count += 1
+
+    def should_stop():
+        return (deadline is not None and time.monotonic() >= deadline) or (stop is not None and stop.is_set())
+
+    scan = iter_photo_files(collection, partition)
+    stopped = False
+    try:
+        # Files the cache serves are handled inline. The pipeline (and asyncio, which is
+        # slow to import) only starts at the first file that has to be read, and takes
+        # over the rest of the scan from there.
+        for item in scan:
+            if should_stop():
+                stopped = True
+                break
+            job = look_up(item)
+            if needs_reading(job):
+                from pipeline import Stage, run_pipeline
+
+                report = run_pipeline(
+                    chain([item], scan),
+                    [
+                        Stage("look_up", look_up, args.io_workers),
+                        Stage("extract", extract, cpu_workers, when=needs_reading),
+                        Stage("assemble", assemble),
+                    ],
+                    queue_size=args.queue_size,
+                    stop=should_stop,
+                    progress_interval=PIPELINE_PROGRESS_INTERVAL if args.pipeline_stats else None,
                 )
+                stopped = report.stopped
+                if args.pipeline_stats:
+                    print(f"\nPipeline ({report.wall:.1f} s):")
+                    for line in report.lines():
+                        print(f"  {line}")
+                break
+            assemble(job)
+    except KeyboardInterrupt:
+        cache.checkpoint()
+        print(f"\nInterrupted after {processed_count} images. Progress is checkpointed; run again with --resume to continue.")
+        return False
+    finally:
+        progress.finish()
+        if worker and owns_cache:
+            worker.close()
+    if stopped:
+        cache.checkpoint()
+        if stop is not None and stop.is_set():
+            print(f"Stopped {collection['name']} after {processed_count} images.")
+        else:
+            print(f"\nTime budget of {args.time_budget:g} s used up after {processed_count} images ({extracted_count} extracted).")
+            print("Progress is checkpointed; run again with --resume to continue.")
+        return False
 
-                image_data = {
-                    "relativePath": str(relative_path_from_web_root.as_posix()),
-                    "filename": filename, "year": year, "month": month, "day": day,
-                    "slug": slug,
-                    "width": width, "height": height, "dateTaken": date_taken_iso,
-                    "title": title, "description": description,
-                    "tags": tags,
-                    "cameraModel": camera_model_processed,
-                    "lensModel": lens_model_processed,
-                    "flash": flash_fired_boolean,
-                    "focalLength": ensure_numeric_type(format_ifd_rational_value(exif_data.get("FocalLength")), 'float'),
-                    "focalLength35mmEquiv": ensure_numeric_type(focal_length_35mm, 'int'),
-                    "focalLengthCategory": focal_length_category,
-                    "cropFactor": crop_factor,
-                    "apertureValue": ensure_numeric_type(format_ifd_rational_value(exif_data.get("FNumber")), 'float'),
-                    "isoSpeedRatings": ensure_numeric_type(exif_data.get("ISOSpeedRatings"), 'int'),
-                    "exposureTime": ensure_numeric_type(format_ifd_rational_value(exif_data.get("ExposureTime")), 'float'),
-                    "creator": exif_data.get("ProcessedCreator", None),
-                    "copyright": exif_data.get("ProcessedCopyright", None),
-                    "notes": exif_data.get("ProcessedNotes", None),
-                }
-                all_images_data.append(image_data)
-                processed_count += 1
-            except Exception as e:
-                print(f"Error processing {image_path}: {e}")
-                skipped_count += 1
+    # Invalid records are checked again on every run until they are fixed
+    if not invalid_count:
+        cache.set_output_signature(validation_key, validation_signature)
+    signature = manifest_signature(file_fingerprints, settings)
+    # Duplicates and the geo index span the whole collection: a partition run leaves them to
+    # merge_manifests.py. A run for selected fields only writes the manifest.
+    geo_index_path = None if args.no_gps or partition or fields else collection["geo_index"]
+    layout_path = None if partition or fields else collection["layouts"]
+    tag_tree_path = None if partition or fields else collection["tag_tree"]
+    search_index_path = None if partition or fields else collection["search_index"]
+    outputs = [path for path in (output_path, seek_index_path(output_path), geo_index_path, layout_path, tag_tree_path, search_index_path) if path]
+    # Nothing changed since the outputs were last written: leave them untouched
+    if (
+        not extracted_count and not skipped_count and not args.duplicate_report
+        and cache.output_signature(output_path) == signature
+        and all(output.exists() for output in outputs)
+    ):
+        if owns_cache:
+            cache.save(prune=True)
+        print(f"\nNo changes in {processed_count} images. Manifest is up to date: {output_path.resolve()}")
+        return True
 
-    all_images_data.sort(key=lambda x: x.get("dateTaken") or "0000-00-00T00:00:00", reverse=True)
-    with open(OUTPUT_JSON_FILE, "w") as f:
-        json.dump(all_images_data, f, indent=2)
+    all_images_data.sort(key=manifest_sort_key, reverse=True)
+    write_photo_outputs(
+        all_images_data, output_path, geo_index_path,
+        duplicate_radius=args.duplicate_radius if "phash" in analyzer_names and not partition else None,
+        duplicate_report_path=args.duplicate_report,
+        fields=fields,
+        layout_path=layout_path,
+        tag_tree_path=tag_tree_path,
+        search_index_path=search_index_path,
+        record_validator=record_validator,
+    )
+    cache.set_output_signature(output_path, signature)
+    if owns_cache:
+        cache.save(prune=True)
 
-    print(f"\nSuccessfully processed {processed_count} images.")
+    print(f"\nSuccessfully processed {processed_count} images ({extracted_count} extracted, {processed_count - extracted_count} from cache).")
     if skipped_count > 0:
         print(f"Skipped {skipped_count} files due to errors.")
-    print(f"Manifest file created: {OUTPUT_JSON_FILE.resolve()}")
+    if quarantined_count > 0:
+        print(f"Skipped {quarantined_count} quarantined files; they are retried once they change, or with --rebuild.")
+    if throttle and (throttle.rate_pause or throttle.load_pause):
+        print(f"Throttling paused the run for {throttle.rate_pause:.0f} s (read rate) and {throttle.load_pause:.0f} s (system load).")
+    if invalid_count > 0:
+        print(f"{invalid_count} records do not match {PHOTO_SCHEMA_FILE.name}.")
+    if partition:
+        print(f"Partial manifest created: {output_path.resolve()}")
+        print("Combine the partial manifests with merge_manifests.py.")
+    else:
+        print(f"Manifest file created: {output_path.resolve()}")
+    return True
 
-if __name__ == "__main__":
+def build_arg_parser():
+    """Builds the command-line interface of the photo manifest generator."""
     parser = argparse.ArgumentParser(description="Generate a JSON manifest from image metadata.")
-    parser.add_argument("--debug-image", type=str, help="Path to a single image file to print all its metadata for debugging.")
-    cli_args = parser.parse_args()
+    parser.add_argument("--debug-image", type=str, help="Path to a single image file to print all its metadata for debugging (see dump_metadata.py for folders).")
+    parser.add_argument("--analyzers", type=str, default=DEFAULT_ANALYZERS, help=f"Comma-separated pixel analyzers to run, or 'none' to skip pixel decoding (default: {DEFAULT_ANALYZERS}).")
+    parser.add_argument("--duplicate-radius", type=int, default=DEFAULT_DUPLICATE_RADIUS, help=f"Maximum Hamming distance between perceptual hashes of near-duplicates (default: {DEFAULT_DUPLICATE_RADIUS}).")
+    parser.add_argument("--duplicate-report", type=str, help="Write the near-duplicate cluster report (JSON) to this path. Requires the phash analyzer.")
+    parser.add_argument("--no-gps", action="store_true", help="Omit GPS latitude/longitude/altitude from the manifest and skip the geo index (privacy).")
+    parser.add_argument("--rebuild", action="store_true", help="Re-extract metadata and re-run analyzers for every image, ignoring cached results.")
+    parser.add_argument("--file-timeout", type=float, default=FILE_TIMEOUT, help=f"Seconds an image may take before it is quarantined; 0 processes images in the main process without a timeout (default: {FILE_TIMEOUT}).")
+    parser.add_argument("--throttle", action="store_true", help=f"Background mode: lower CPU/IO priority and apply the THROTTLE_* limits ({THROTTLE_READ_RATE} MB/s, {THROTTLE_MAX_WORKERS} decoder threads, pause above load {THROTTLE_MAX_LOAD}).")
+    parser.add_argument("--max-read-rate", type=float, help="Cap file reads at this many MB/s (overrides the --throttle default).")
+    parser.add_argument("--max-workers", type=int, help="Cap the threads used for decoding and pixel analysis (overrides the --throttle default).")
+    parser.add_argument("--max-load", type=float, help="Pause while the 1-minute load average is above this (overrides the --throttle default).")
+    parser.add_argument("--metadata-reader", choices=METADATA_READERS, default="pillow", help="How image metadata is read: through Pillow, or parsed in place in memory-mapped files ('mmap', faster on local disks; don't use it for network shares). Both give the same records.")
+    parser.add_argument("--io-workers", type=int, default=IO_WORKERS, help=f"Threads looking files up in the cache and fingerprinting changed ones (default: {IO_WORKERS}).")
+    parser.add_argument("--cpu-workers", type=int, help="Worker processes extracting metadata and analyzing pixels (default: --max-workers, or the number of CPUs).")
+    parser.add_argument("--queue-size", type=int, default=PIPELINE_QUEUE_SIZE, help=f"Files queued between pipeline stages (default: {PIPELINE_QUEUE_SIZE}).")
+    parser.add_argument("--verbose", action="store_true", help="Log every file read instead of a progress line.")
+    parser.add_argument("--pipeline-stats", action="store_true", help=f"Print pipeline queue depths every {PIPELINE_PROGRESS_INTERVAL} s and a per-stage summary, to find the bottleneck.")
+    parser.add_argument("--resume", action="store_true", help="Continue from the checkpoint of an interrupted or time-limited run.")
+    parser.add_argument("--time-budget", type=float, help="Stop after this many seconds, checkpointing progress for --resume, without writing the manifest.")
+    parser.add_argument("--partition", type=str, help="Only process one partition and write a partial manifest: years:FIRST-LAST or bucket:K/N. Combine partials with merge_manifests.py.")
+    parser.add_argument("--fields", type=str, help="Comma-separated manifest fields to produce (schema property names; required fields are always included). Only the parsing stages and analyzers they need are run, and the manifest is written to photo_manifest.fields.json unless --output is given.")
+    parser.add_argument("--output", type=str, help="Manifest file to write (default: the configured manifest, or photo_manifest.<partition>.json next to it).")
+    return parser
+
+if __name__ == "__main__":
+    cli_args = build_arg_parser().parse_args()
     main(cli_args)
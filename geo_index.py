@@ -0,0 +1,122 @@
+"""
+Precomputed geohash cluster index for map views.
+
+Photos with a GPS position are grouped by geohash prefix at several precisions, one
+level per range of map zoom levels. A map view loads the level matching its zoom and
+plots one marker per cluster (count, centroid, bounds, cover photo) instead of
+aggregating every manifest record client-side.
+"""
+
+import numpy as np
+
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+# Geohash precisions to build clusters for. Approximate cell sizes and matching zoom levels:
+# 2 ~ 1250 km (zoom 2-4), 3 ~ 156 km (5-7), 4 ~ 39 km (8-9), 5 ~ 4.9 km (10-12), 6 ~ 1.2 km (13+)
+GEO_INDEX_PRECISIONS = (2, 3, 4, 5, 6)
+
+
+def _quantize(values, low, high, bits):
+    """Maps values in [low, high] to integer cells of a 2**bits grid."""
+    cells = np.floor((values - low) / (high - low) * (1 << bits)).astype(np.int64)
+    return np.clip(cells, 0, (1 << bits) - 1).astype(np.uint64)
+
+
+def encode_geohashes(latitudes, longitudes, precision):
+    """
+    Encodes coordinates as geohash strings, vectorized over all points.
+
+    Quantizing to a 2**k grid yields the same bits as the usual interval bisection, so the
+    longitude and latitude bits only need to be interleaved.
+
+    Args:
+        latitudes, longitudes: Arrays of decimal degrees
+        precision: Number of geohash characters (at most 12)
+
+    Returns:
+        List of geohash strings
+    """
+    total_bits = precision * 5
+    lon_bits, lat_bits = (total_bits + 1) // 2, total_bits // 2
+    lon_cells = _quantize(np.asarray(longitudes, dtype=np.float64), -180.0, 180.0, lon_bits)
+    lat_cells = _quantize(np.asarray(latitudes, dtype=np.float64), -90.0, 90.0, lat_bits)
+
+    # Even bits (counting from the most significant) come from longitude, odd from latitude
+    codes = np.zeros(len(lon_cells), dtype=np.uint64)
+    for i in range(total_bits):
+        if i % 2 == 0:
+            bit = (lon_cells >> np.uint64(lon_bits - 1 - i // 2)) & np.uint64(1)
+        else:
+            bit = (lat_cells >> np.uint64(lat_bits - 1 - i // 2)) & np.uint64(1)
+        codes = (codes << np.uint64(1)) | bit
+
+    alphabet = np.array(list(GEOHASH_ALPHABET))
+    shifts = np.uint64(5) * np.arange(precision - 1, -1, -1, dtype=np.uint64)
+    characters = alphabet[((codes[:, None] >> shifts[None, :]) & np.uint64(31)).astype(np.intp)]
+    return ["".join(row) for row in characters]
+
+
+def build_geo_index(records, precisions=GEO_INDEX_PRECISIONS):
+    """
+    Builds geohash clusters for all records that have a position.
+
+    Args:
+        records: Manifest records, in manifest order (the first record of a cluster is its cover)
+        precisions: Geohash precisions to build levels for
+
+    Returns:
+        Dict with "precisions", "located" (number of records with a position) and "levels"
+        mapping each precision (as a string) to a list of clusters. Clusters at the finest
+        precision also list the slugs of all their photos.
+    """
+    located = [
+        record for record in records
+        if record.get("latitude") is not None and record.get("longitude") is not None
+    ]
+    index = {"precisions": list(precisions), "located": len(located), "levels": {}}
+    if not located:
+        for precision in precisions:
+            index["levels"][str(precision)] = []
+        return index
+
+    latitudes = np.array([record["latitude"] for record in located], dtype=np.float64)
+    longitudes = np.array([record["longitude"] for record in located], dtype=np.float64)
+    finest = max(precisions)
+    geohashes = np.array(encode_geohashes(latitudes, longitudes, finest))
+
+    for precision in precisions:
+        prefixes = geohashes.astype(f"<U{precision}")  # Truncates to the prefix
+        keys, first, inverse, counts = np.unique(
+            prefixes, return_index=True, return_inverse=True, return_counts=True
+        )
+        clusters = []
+        centroid_lat = np.bincount(inverse, weights=latitudes) / counts
+        centroid_lon = np.bincount(inverse, weights=longitudes) / counts
+        south = np.full(len(keys), np.inf)
+        north = np.full(len(keys), -np.inf)
+        west = np.full(len(keys), np.inf)
+        east = np.full(len(keys), -np.inf)
+        np.minimum.at(south, inverse, latitudes)
+        np.maximum.at(north, inverse, latitudes)
+        np.minimum.at(west, inverse, longitudes)
+        np.maximum.at(east, inverse, longitudes)
+
+        if precision == finest:
+            members = [[] for _ in keys]
+            for position, cluster in enumerate(inverse.tolist()):
+                members[cluster].append(located[position]["slug"])
+
+        for i, key in enumerate(keys.tolist()):
+            cluster = {
+                "geohash": key,
+                "count": int(counts[i]),
+                "latitude": round(float(centroid_lat[i]), 6),
+                "longitude": round(float(centroid_lon[i]), 6),
+                "bounds": [round(float(v), 6) for v in (south[i], west[i], north[i], east[i])],
+                "cover": located[first[i]]["slug"],
+            }
+            if precision == finest:
+                cluster["slugs"] = members[i]
+            clusters.append(cluster)
+        index["levels"][str(precision)] = clusters
+    return index
@@ -0,0 +1,49 @@
+"""
+Lazy image opening shared by the manifest generators.
+
+Pillow and the AVIF plugin are only imported when a file is actually opened, and
+Image.open() is told which plugin to use from the file extension instead of probing
+every registered format, so runs that find nothing to do never pay for them.
+"""
+
+import os
+from pathlib import Path
+
+# Pillow format(s) to try for each supported extension
+IMAGE_FORMATS = {
+    ".jpg": ("JPEG",),
+    ".jpeg": ("JPEG",),
+    ".png": ("PNG",),
+    ".webp": ("WEBP",),
+    ".avif": ("AVIF",),
+    ".gif": ("GIF",),
+}
+# Environment variable with the number of threads the AVIF decoder may use per image
+# (unset: one per core). Set by throttle.limit_threads; worker processes inherit it.
+DECODER_THREADS_VARIABLE = "PHOTODRAFT_DECODER_THREADS"
+
+
+def open_image(image_path):
+    """
+    Opens an image with Pillow, importing only the decoder its extension needs.
+
+    Falls back to probing every format if the file does not match its extension.
+
+    Returns:
+        PIL.Image.Image (caller must close it)
+    """
+    from PIL import Image, UnidentifiedImageError
+
+    suffix = Path(image_path).suffix.lower()
+    if suffix == ".avif":
+        import pillow_avif  # Registers AVIF support in PIL
+        threads = os.environ.get(DECODER_THREADS_VARIABLE)
+        if threads:
+            pillow_avif.AvifImagePlugin.DEFAULT_MAX_THREADS = int(threads)
+    formats = IMAGE_FORMATS.get(suffix)
+    if formats is None:
+        return Image.open(image_path)
+    try:
+        return Image.open(image_path, formats=formats)
+    except UnidentifiedImageError:
+        return Image.open(image_path)
@@ -0,0 +1,179 @@
+"""
+Run per-file work in a separate process under a watchdog.
+
+A truncated or malicious image can hang a decoder or crash the interpreter (libavif and
+libjpeg are C code). IsolatedWorker runs such work in a child process, one call at a time,
+and waits for each result with a timeout: a call that hangs gets the child killed, a call
+that crashes it is detected from the closed pipe, and either way a fresh child is started
+for the next call. The child is only started when the first call is made, so runs that
+decode nothing never pay for it.
+
+Functions and arguments are pickled, so they must be importable module-level functions
+and plain values.
+
+WorkerPool shares a fixed number of such workers between threads, for generating several
+collections at once.
+"""
+
+import os
+import signal
+import sys
+
+
+class WorkerFailure(Exception):
+    """The worker process hung or died while processing a call."""
+
+
+class WorkerTimeout(WorkerFailure):
+    """The call did not finish within the timeout."""
+
+
+class WorkerCrash(WorkerFailure):
+    """The worker process died during the call."""
+
+
+class WorkerError(Exception):
+    """The called function raised an exception in the worker (the worker survives)."""
+
+
+def _serve(conn, environment):
+    """Child process loop: runs (function, args) requests until it receives None."""
+    # Ctrl-C is handled by the parent, which checkpoints and then stops the worker
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    os.environ.clear()
+    os.environ.update(environment)
+    while True:
+        request = conn.recv()
+        if request is None:
+            return
+        func, args = request
+        try:
+            reply = ("ok", func(*args))
+        except Exception as e:
+            reply = ("error", f"{type(e).__name__}: {e}")
+        sys.stdout.flush()  # Keep warnings printed by func in order with the parent's output
+        conn.send(reply)
+
+
+class IsolatedWorker:
+    """A restartable child process that runs one call at a time with a timeout."""
+
+    def __init__(self, timeout, start_method=None):
+        """
+        Args:
+            timeout: Seconds to wait for each call before killing the worker
+            start_method: multiprocessing start method, or None for the platform default
+        """
+        self.timeout = timeout
+        self.start_method = start_method
+        self._process = None
+        self._conn = None
+        self._busy = False  # A call was sent and its reply not yet received
+
+    def _start(self):
+        import multiprocessing  # Only needed once there is something to decode
+
+        # A forked child inherits unflushed output and would print it a second time
+        sys.stdout.flush()
+        context = multiprocessing.get_context(self.start_method)
+        parent_conn, child_conn = context.Pipe()
+        # The parent's current environment: a forkserver child inherits the fork server's,
+        # which may predate settings such as throttle.limit_threads' thread caps
+        self._process = context.Process(target=_serve, args=(child_conn, dict(os.environ)), daemon=True)
+        self._process.start()
+        child_conn.close()
+        self._conn = parent_conn
+
+    def _kill(self):
+        self._process.kill()
+        self._process.join()
+        self._conn.close()
+        self._process = self._conn = None
+        self._busy = False
+
+    def call(self, func, *args):
+        """
+        Runs func(*args) in the worker process.
+
+        Raises:
+            WorkerTimeout: The call took longer than the timeout (the worker was killed)
+            WorkerCrash: The worker process died during the call
+            WorkerError: func raised an exception
+        """
+        if self._process is None:
+            self._start()
+        try:
+            self._busy = True
+            self._conn.send((func, args))
+            if not self._conn.poll(self.timeout):
+                self._kill()
+                raise WorkerTimeout(f"Timed out after {self.timeout:g} s")
+            status, value = self._conn.recv()
+            self._busy = False
+        except (EOFError, OSError):
+            self._process.join(1)
+            exit_code = self._process.exitcode
+            self._kill()
+            raise WorkerCrash(f"Worker process died (exit code {exit_code})") from None
+        if status == "error":
+            raise WorkerError(value)
+        return value
+
+    def close(self):
+        """Stops the worker process, if it was started. A call still in flight is abandoned."""
+        if self._process is None:
+            return
+        if not self._busy:
+            try:
+                self._conn.send(None)
+                self._process.join(5)
+            except OSError:
+                pass
+        self._kill()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class WorkerPool:
+    """
+    IsolatedWorkers shared between threads: each call runs on the next idle worker.
+
+    Workers are started on first use, with the forkserver start method: forking a process
+    that is running other threads can deadlock the child on a lock one of them held.
+    """
+
+    def __init__(self, size, timeout):
+        """
+        Args:
+            size: Number of worker processes
+            timeout: Seconds to wait for each call before killing its worker
+        """
+        import queue
+
+        self._workers = [IsolatedWorker(timeout, start_method="forkserver") for _ in range(size)]
+        self._idle = queue.SimpleQueue()
+        for worker in self._workers:
+            self._idle.put(worker)
+
+    def call(self, func, *args):
+        """Runs func(*args) on an idle worker, waiting for one if all are busy (see IsolatedWorker.call)."""
+        worker = self._idle.get()
+        try:
+            return worker.call(func, *args)
+        finally:
+            self._idle.put(worker)
+
+    def close(self):
+        """Stops all worker processes."""
+        for worker in self._workers:
+            worker.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,111 @@
+"""
+Precomputed justified-grid layouts for gallery views.
+
+A justified grid fills each row edge to edge with photos at a common height close to a
+target height. Instead of the gallery computing rows from every record's width and height
+on each page load and resize, the generator precomputes the row breaks for a set of
+container widths and target row heights. The client picks the layout closest to its
+container and scales the row heights by the width ratio.
+
+Rows are found greedily, vectorized over the aspect-ratio array: a single searchsorted
+over cumulative row widths gives, for every photo, where a row starting at it would
+overflow the container. Each row then takes whichever of the two candidate breaks (with
+or without the overflowing photo) brings its height closer to the target.
+"""
+
+import numpy as np
+
+# Aspect ratio used for records without usable dimensions
+DEFAULT_ASPECT_RATIO = 1.5
+
+
+def aspect_ratios(records):
+    """Returns the width/height ratio of each record as an array."""
+    return np.array(
+        [
+            record["width"] / record["height"]
+            if record.get("width") and record.get("height") else DEFAULT_ASPECT_RATIO
+            for record in records
+        ],
+        dtype=np.float64,
+    )
+
+
+def justify_rows(ratios, container_width, row_height, gap=0):
+    """
+    Partitions photos into justified rows.
+
+    Args:
+        ratios: Array of width/height aspect ratios, in display order
+        container_width: Width of the container in pixels
+        row_height: Target row height in pixels
+        gap: Horizontal gap between photos in a row, in pixels
+
+    Returns:
+        Tuple of (row start indices, row heights) arrays. Every row except the last fills
+        the container width exactly; the last row keeps the target height.
+    """
+    count = len(ratios)
+    if not count:
+        return np.zeros(0, dtype=np.int64), np.zeros(0)
+    ratio_sums = np.concatenate(([0.0], np.cumsum(ratios)))
+    # Width of photos start..end-1 at the target height, gaps included: widths[end] - widths[start] - gap
+    widths = ratio_sums * row_height + gap * np.arange(count + 1)
+
+    starts = np.arange(count)
+    # First end at which a row starting at each photo reaches the container width
+    overflow = np.searchsorted(widths, widths[:-1] + container_width + gap, side="left")
+
+    def height(start, end):
+        return (container_width - gap * (end - start - 1)) / (ratio_sums[end] - ratio_sums[start])
+
+    fits = overflow <= count
+    with_last = np.minimum(overflow, count)
+    without_last = np.maximum(with_last - 1, starts + 1)
+    closer = np.abs(height(starts, without_last) - row_height) < np.abs(height(starts, with_last) - row_height)
+    ends = np.where(fits & ~closer, with_last, without_last)
+    ends = np.where(fits, ends, count)
+
+    # Follow the chain of row ends from the first photo
+    row_starts = []
+    start = 0
+    ends_list = ends.tolist()
+    while start < count:
+        row_starts.append(start)
+        start = ends_list[start]
+    row_starts = np.array(row_starts, dtype=np.int64)
+    row_ends = ends[row_starts]
+    heights = height(row_starts, row_ends)
+    if not fits[row_starts[-1]]:
+        heights[-1] = row_height  # Incomplete last row: don't stretch it to the full width
+    return row_starts, heights
+
+
+def build_layouts(records, container_widths, row_heights, gap=0):
+    """
+    Builds justified-grid layouts for every combination of container width and row height.
+
+    Args:
+        records: Manifest records, in manifest order
+        container_widths: Container widths in pixels
+        row_heights: Target row heights in pixels
+        gap: Horizontal gap between photos, in pixels
+
+    Returns:
+        Dict with "photos" (number of records laid out), "gap" and "layouts": a list of
+        {"containerWidth", "rowHeight", "rowLengths", "rowHeights"} dicts. rowLengths are
+        the numbers of consecutive manifest records in each row (smaller in JSON than
+        start indices); row heights are rounded to 0.1 px.
+    """
+    ratios = aspect_ratios(records)
+    layouts = []
+    for container_width in container_widths:
+        for row_height in row_heights:
+            row_starts, heights = justify_rows(ratios, container_width, row_height, gap)
+            layouts.append({
+                "containerWidth": container_width,
+                "rowHeight": row_height,
+                "rowLengths": np.diff(row_starts, append=len(records)).tolist(),
+                "rowHeights": np.round(heights, 1).tolist(),
+            })
+    return {"photos": len(records), "gap": gap, "layouts": layouts}
@@ -0,0 +1,270 @@
+"""
+Persistent cache shared between manifest generator runs.
+
+Derived data that is expensive to compute (anything that needs a pixel decode) is stored
+under a content fingerprint of the source file, so it survives renames and touch-only
+changes, and only new or re-exported photos pay the decode cost. A second table maps each
+file to its last known size/mtime and fingerprint, so unchanged files are not re-read, and
+a third records a signature of the inputs each output was last written from. Files that
+hung or crashed the extractor are quarantined with their size/mtime, so they are skipped
+until they change instead of stalling every run.
+
+The cache file is only rewritten at the end of a run. During long runs, checkpoint()
+appends the values computed since the previous checkpoint to a journal next to it, which
+resume() replays after an interruption, so the work done before it is not lost.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+# Bump when the layout of the cache file or of any cached value changes
+CACHE_VERSION = 3
+# Number of bytes hashed from the start and the end of a file for its fingerprint
+FINGERPRINT_SAMPLE_BYTES = 64 * 1024
+
+
+def file_fingerprint(path, stat_result=None):
+    """
+    Computes a content fingerprint for a file.
+
+    Small files are hashed completely. For larger files only the size and the first and
+    last FINGERPRINT_SAMPLE_BYTES are hashed, which covers the metadata boxes/segments and
+    the tail of the compressed image data without reading the whole file.
+
+    Args:
+        path: Path to the file
+        stat_result: Optional os.stat() result, to avoid a second stat call
+
+    Returns:
+        Hex digest string
+    """
+    stat_result = stat_result or os.stat(path)
+    size = stat_result.st_size
+    digest = hashlib.blake2b(size.to_bytes(8, "little"), digest_size=16)
+    with open(path, "rb") as f:
+        if size <= 2 * FINGERPRINT_SAMPLE_BYTES:
+            digest.update(f.read())
+        else:
+            digest.update(f.read(FINGERPRINT_SAMPLE_BYTES))
+            f.seek(-FINGERPRINT_SAMPLE_BYTES, os.SEEK_END)
+            digest.update(f.read(FINGERPRINT_SAMPLE_BYTES))
+    return digest.hexdigest()
+
+
+class MetadataCache:
+    """JSON-backed cache of file fingerprints and fingerprint-keyed derived values."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.files = {}  # cache key -> [size, mtime_ns, fingerprint]
+        self.entries = {}  # fingerprint -> {value name -> value}
+        self.outputs = {}  # output path -> signature of the inputs it was written from
+        self.quarantine = {}  # cache key -> [size, mtime_ns, error] of files that hung or crashed
+        self.changed_keys = set()  # files that were new or modified during this run
+        self.journal_path = self.path.with_name(self.path.name + ".journal")
+        self._journal = []  # changes since the last checkpoint
+        # Guards _journal, which look_up threads extend while another thread checkpoints;
+        # the journal file has its own lock, so appends don't wait for its fsync
+        self._journal_lock = threading.Lock()
+        self._journal_file_lock = threading.Lock()
+        self._seen_keys = set()
+        self._dirty = False
+
+    @classmethod
+    def load(cls, path):
+        """Loads a cache file, starting empty if it is missing, unreadable or outdated."""
+        cache = cls(path)
+        try:
+            with open(cache.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cache
+        if isinstance(data, dict) and data.get("version") == CACHE_VERSION:
+            cache.files = data.get("files", {})
+            cache.entries = data.get("entries", {})
+            cache.outputs = data.get("outputs", {})
+            cache.quarantine = data.get("quarantine", {})
+        return cache
+
+    def fingerprint(self, image_path, key):
+        """
+        Returns the content fingerprint of a file, reusing the cached one if the file's
+        size and mtime are unchanged.
+
+        Args:
+            image_path: Path to the file on disk
+            key: Stable identifier of the file in the collection (its relative path)
+        """
+        stat_result = os.stat(image_path)
+        self._seen_keys.add(key)
+        known = self.files.get(key)
+        if known and known[0] == stat_result.st_size and known[1] == stat_result.st_mtime_ns:
+            return known[2]
+        fingerprint = file_fingerprint(image_path, stat_result)
+        self.changed_keys.add(key)
+        self.files[key] = [stat_result.st_size, stat_result.st_mtime_ns, fingerprint]
+        self._log({"file": key, "known": self.files[key]})
+        self._dirty = True
+        return fingerprint
+
+    def get(self, fingerprint, name):
+        """Returns a cached value for a fingerprint, or None."""
+        return self.entries.get(fingerprint, {}).get(name)
+
+    def put(self, fingerprint, name, value):
+        """Stores a value for a fingerprint."""
+        self.entries.setdefault(fingerprint, {})[name] = value
+        self._log({"entry": fingerprint, "name": name, "value": value})
+        self._dirty = True
+
+    def quarantined(self, image_path, key):
+        """
+        Checks whether a file is quarantined. Quarantined files whose size or mtime changed
+        since are released.
+
+        Returns:
+            The error the file was quarantined for, or None
+        """
+        known = self.quarantine.get(key)
+        if known is None:
+            return None
+        stat_result = os.stat(image_path)
+        self._seen_keys.add(key)
+        if known[0] == stat_result.st_size and known[1] == stat_result.st_mtime_ns:
+            return known[2]
+        self.release(key)
+        return None
+
+    def add_to_quarantine(self, image_path, key, error):
+        """Quarantines a file in its current state (size and mtime) with the error it caused."""
+        stat_result = os.stat(image_path)
+        self._seen_keys.add(key)
+        self.quarantine[key] = [stat_result.st_size, stat_result.st_mtime_ns, error]
+        self._log({"quarantine": key, "known": self.quarantine[key]})
+        self._dirty = True
+
+    def release(self, key):
+        """Removes a file from the quarantine, if it is there."""
+        if self.quarantine.pop(key, None) is not None:
+            self._log({"quarantine": key, "known": None})
+            self._dirty = True
+
+    def output_signature(self, output_path):
+        """Returns the input signature an output was last written from, or None."""
+        return self.outputs.get(str(output_path))
+
+    def set_output_signature(self, output_path, signature):
+        """Records the input signature an output has just been written from."""
+        if self.outputs.get(str(output_path)) != signature:
+            self.outputs[str(output_path)] = signature
+            self._dirty = True
+
+    def _log(self, change):
+        with self._journal_lock:
+            self._journal.append(change)
+
+    def checkpoint(self):
+        """Appends the changes since the last checkpoint to the journal, durably."""
+        # Swapped out first, so that changes made by other threads meanwhile go to the next checkpoint
+        with self._journal_lock:
+            journal, self._journal = self._journal, []
+        if not journal:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._journal_file_lock, open(self.journal_path, "a") as f:
+            f.writelines(json.dumps(change, separators=(",", ":")) + "\n" for change in journal)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def resume(self):
+        """
+        Replays the journal left by an interrupted run.
+
+        Replayed files count as changed, since their records were never written out.
+
+        Returns:
+            Number of files restored, or None if there is no journal
+        """
+        try:
+            with open(self.journal_path, "rb") as f:
+                lines = f.readlines()
+        except OSError:
+            return None
+        restored = 0
+        good_size = 0
+        for line in lines:
+            try:
+                if not line.endswith(b"\n"):
+                    raise ValueError("unterminated line")
+                change = json.loads(line)
+            except ValueError:
+                # Torn last line from a crash during a checkpoint: cut it off, or the next
+                # checkpoint would append to it and its changes would be lost as well
+                with self._journal_file_lock, open(self.journal_path, "r+b") as f:
+                    f.truncate(good_size)
+                break
+            good_size += len(line)
+            if "file" in change:
+                self.files[change["file"]] = change["known"]
+                self.changed_keys.add(change["file"])
+                restored += 1
+            elif "quarantine" in change:
+                if change["known"] is None:
+                    self.quarantine.pop(change["quarantine"], None)
+                else:
+                    self.quarantine[change["quarantine"]] = change["known"]
+            else:
+                self.entries.setdefault(change["entry"], {})[change["name"]] = change["value"]
+        self._dirty = self._dirty or bool(lines)
+        return restored
+
+    def discard_journal(self):
+        """Deletes the journal of an earlier interrupted run. Returns True if there was one."""
+        try:
+            self.journal_path.unlink()
+        except FileNotFoundError:
+            return False
+        return True
+
+    def save(self, prune=False):
+        """
+        Writes the cache back to disk if anything changed.
+
+        Args:
+            prune: Drop files not seen during this run and entries no longer referenced
+                by any file. Only pass True after a scan of the whole collection.
+        """
+        if prune:
+            stale = self.files.keys() - self._seen_keys
+            for key in stale:
+                del self.files[key]
+            released = self.quarantine.keys() - self._seen_keys
+            for key in released:
+                del self.quarantine[key]
+            referenced = {known[2] for known in self.files.values()}
+            orphaned = self.entries.keys() - referenced
+            for fingerprint in orphaned:
+                del self.entries[fingerprint]
+            self._dirty = self._dirty or bool(stale or released or orphaned)
+        if not self._dirty:
+            return
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(temp_path, "w") as f:
+            json.dump({
+                "version": CACHE_VERSION,
+                "files": self.files,
+                "entries": self.entries,
+                "outputs": self.outputs,
+                "quarantine": self.quarantine,
+            }, f)
+        os.replace(temp_path, self.path)  # Atomic, so an interrupted run never corrupts the cache
+        self._dirty = False
+        # Everything journaled is in the cache file now
+        with self._journal_lock:
+            self._journal = []
+        self.discard_journal()
@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+Serve the manifests from memory, for local tools and the frontend behind a reverse proxy.
+
+Each manifest is loaded once, with its gzipped body precomputed and indexes built, and
+reloaded when the generator swaps in a new file. Routes, for a manifest named NAME
+("photos" and "images" by default, or the collection names of a collections.toml):
+
+    GET /                        Names, record counts and ETags of the served manifests
+    GET /NAME (or /FILE.json)    The manifest file, byte for byte
+    GET /NAME?limit=N&cursor=C   A page of records: {"items", "nextCursor", "total"}
+    GET /NAME/SLUG               The record with that slug
+
+Pages follow manifest order (newest first for photos) and cursors point at the last
+record of the previous page by its (dateTaken, relativePath), so pages stay consistent
+when photos are added between requests. Every response has a strong ETag and is answered
+with 304 Not Modified when it matches If-None-Match.
+
+Usage:
+    python manifest_server.py [--port 8765] [--config collections.toml]
+"""
+
+import argparse
+import base64
+import gzip
+import hashlib
+import json
+import os
+import sys
+import threading
+from bisect import bisect_left, bisect_right
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import generate_image_manifest
+import generate_manifest
+from generate_manifest import manifest_sort_key
+
+# --- Configuration ---
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+# Seconds between checks for a new manifest file
+RELOAD_CHECK_INTERVAL = 1.0
+# Smaller responses are not worth compressing
+GZIP_MIN_SIZE = 1024
+# --- End Configuration ---
+
+
+def strong_etag(body):
+    """Returns a strong ETag for a response body."""
+    return '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+
+def accepts_gzip(accept_encoding):
+    """
+    Checks whether an Accept-Encoding header allows gzip: listed, or covered by "*", with
+    a q-value above 0.
+    """
+    weights = {}
+    for coding in accept_encoding.split(","):
+        name, *params = [part.strip() for part in coding.split(";")]
+        weight = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[name.lower()] = weight
+    for name in ("gzip", "x-gzip", "*"):
+        if name in weights:
+            return weights[name] > 0
+    return False
+
+
+def encode_cursor(key):
+    return base64.urlsafe_b64encode(json.dumps(key, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Returns the sort key a cursor points at; raises ValueError for malformed cursors."""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor") from None
+    if not (isinstance(key, list) and len(key) == 2 and all(isinstance(part, str) for part in key)):
+        raise ValueError("Invalid cursor")
+    return tuple(key)
+
+
+class ManifestIndex:
+    """An immutable, loaded manifest: its body, gzipped body, ETags and lookup indexes."""
+
+    def __init__(self, body):
+        """
+        Args:
+            body: Contents of the manifest file
+
+        Raises:
+            ValueError: If the body is not a JSON array of records
+        """
+        records = json.loads(body)
+        if not isinstance(records, list) or not all(isinstance(record, dict) for record in records):
+            raise ValueError("not a manifest (expected a JSON array of records)")
+        self.body = body
+        self.etag = strong_etag(body)
+        self.gzip_body = gzip.compress(body, compresslevel=9, mtime=0)
+        self.gzip_etag = self.etag[:-1] + '-gzip"'  # A different representation, so a different strong ETag
+        self.slugs = {record.get("slug"): record for record in records}
+
+        # Pages follow manifest order if it is sorted either way (photos newest first,
+        # images by path), otherwise newest first
+        keys = [manifest_sort_key(record) for record in records]
+        if all(a >= b for a, b in zip(keys, keys[1:])):
+            self.descending = True
+        elif all(a <= b for a, b in zip(keys, keys[1:])):
+            self.descending = False
+        else:
+            order = sorted(range(len(records)), key=keys.__getitem__, reverse=True)
+            records = [records[i] for i in order]
+            keys = [keys[i] for i in order]
+            self.descending = True
+        self.records = records
+        self._keys = keys
+        self._ascending_keys = keys[::-1] if self.descending else keys
+
+    def page(self, cursor_key, limit):
+        """
+        Returns (records, next cursor or None): the limit records after the one with
+        cursor_key (or from the start), in page order.
+        """
+        if cursor_key is None:
+            start = 0
+        elif self.descending:
+            start = len(self.records) - bisect_left(self._ascending_keys, cursor_key)
+        else:
+            start = bisect_right(self._ascending_keys, cursor_key)
+        end = start + limit
+        next_cursor = encode_cursor(self._keys[end - 1]) if end < len(self.records) else None
+        return self.records[start:end], next_cursor
+
+
+class ManifestSource:
+    """A manifest file and its current index, reloaded when the file is replaced."""
+
+    def __init__(self, name, path):
+        self.name = name
+        self.path = path
+        self.index = None  # Swapped as a whole, so request threads need no lock
+        self._signature = None
+
+    def refresh(self):
+        """Reloads the manifest if the file changed since it was last loaded. Returns True if it did."""
+        try:
+            stat_result = os.stat(self.path)
+        except OSError:
+            return False  # Keep serving the last version until a new one appears
+        signature = (stat_result.st_ino, stat_result.st_size, stat_result.st_mtime_ns)
+        if signature == self._signature:
+            return False
+        self._signature = signature
+        try:
+            with open(self.path, "rb") as f:
+                index = ManifestIndex(f.read())
+        except (OSError, ValueError) as e:
+            print(f"Warning: Could not load {self.path}: {e}")
+            return False
+        self.index = index
+        print(f"Loaded {self.name}: {len(index.records)} records from {self.path}")
+        return True
+
+
+def watch(sources, stop, interval=RELOAD_CHECK_INTERVAL):
+    """Reloads manifests as they change, until stop is set."""
+    while not stop.wait(interval):
+        for source in sources:
+            source.refresh()
+
+
+class ManifestRequestHandler(BaseHTTPRequestHandler):
+    server_version = "photodraft"
+    sources = {}  # route name -> ManifestSource; set by make_server
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        parts = [unquote(part) for part in url.path.strip("/").split("/") if part]
+        if not parts:
+            self.send_json({
+                name: {"records": len(source.index.records), "etag": source.index.etag} if source.index else None
+                for name, source in self.sources.items()
+                if name == source.name
+            })
+            return
+        source = self.sources.get(parts[0])
+        if source is None or len(parts) > 2:
+            self.send_error_json(HTTPStatus.NOT_FOUND, "Not found")
+            return
+        index = source.index
+        if index is None:
+            self.send_error_json(HTTPStatus.SERVICE_UNAVAILABLE, f"{source.path} is not available yet")
+            return
+
+        if len(parts) == 2:
+            record = index.slugs.get(parts[1])
+            if record is None:
+                self.send_error_json(HTTPStatus.NOT_FOUND, f"No record with slug '{parts[1]}'")
+            else:
+                self.send_json(record)
+            return
+        query = parse_qs(url.query)
+        if "limit" not in query and "cursor" not in query:
+            self.send_body(index.body, index.etag, index.gzip_body, index.gzip_etag)
+            return
+        try:
+            limit = int(query.get("limit", [DEFAULT_PAGE_SIZE])[0])
+            if not 1 <= limit <= MAX_PAGE_SIZE:
+                raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+            cursor = query.get("cursor", [None])[0]
+            records, next_cursor = index.page(decode_cursor(cursor) if cursor else None, limit)
+        except ValueError as e:
+            self.send_error_json(HTTPStatus.BAD_REQUEST, str(e))
+            return
+        self.send_json({"items": records, "nextCursor": next_cursor, "total": len(index.records)})
+
+    def send_json(self, value):
+        body = json.dumps(value, separators=(",", ":")).encode()
+        etag = strong_etag(body)
+        gzip_body = gzip.compress(body, mtime=0) if len(body) >= GZIP_MIN_SIZE else None
+        self.send_body(body, etag, gzip_body, etag[:-1] + '-gzip"')
+
+    def send_body(self, body, etag, gzip_body=None, gzip_etag=None):
+        """Sends a JSON body, gzipped if the client accepts it, or 304 if the client has it."""
+        if gzip_body is not None and accepts_gzip(self.headers.get("Accept-Encoding", "")):
+            body, etag, encoding = gzip_body, gzip_etag, "gzip"
+        else:
+            encoding = None
+        if self.etag_matches(etag):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "no-cache")  # Cache, but revalidate with the ETag
+        self.send_header("Vary", "Accept-Encoding")
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def etag_matches(self, etag):
+        """Checks If-None-Match, with the weak comparison RFC 9110 specifies for it."""
+        header = self.headers.get("If-None-Match")
+        if not header:
+            return False
+        if header.strip() == "*":
+            return True
+        # A reverse proxy that compresses responses itself may weaken our ETags
+        return any(
+            tag.strip().removeprefix("W/") in (etag, etag.replace('-gzip"', '"'))
+            for tag in header.split(",")
+        )
+
+    def send_error_json(self, status, message):
+        body = json.dumps({"error": message}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+def make_server(sources, host=DEFAULT_HOST, port=DEFAULT_PORT, verbose=False):
+    """
+    Creates the HTTP server for a list of ManifestSources, loading them first. Each is
+    routed by its name and, unless another collection claims it too, by its file name.
+    """
+    routes = {}
+    for source in sources:
+        source.refresh()
+        routes[source.name] = source
+    file_names = [os.path.basename(source.path) for source in sources]
+    for source, file_name in zip(sources, file_names):
+        if routes.get(file_name) is source:
+            continue
+        if file_name in routes or file_names.count(file_name) > 1:
+            print(f"Warning: {source.name} is not routed as {file_name}, which another collection also uses")
+        else:
+            routes[file_name] = source
+    handler = type("Handler", (ManifestRequestHandler,), {"sources": routes})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.verbose = verbose
+    return server
+
+
+def default_sources(config_path=None):
+    """Returns the ManifestSources of the configured collections, or of the script defaults."""
+    if config_path:
+        from collection_config import load_config
+
+        return [
+            ManifestSource(collection["name"], collection["output"])
+            for collection in load_config(config_path)["collections"]
+        ]
+    return [
+        ManifestSource("photos", generate_manifest.OUTPUT_JSON_FILE),
+        ManifestSource("images", generate_image_manifest.OUTPUT_JSON_FILE),
+    ]
+
+
+def main(args):
+    try:
+        sources = default_sources(args.config)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        return 1
+    server = make_server(sources, args.host, args.port, args.verbose)
+    stop = threading.Event()
+    threading.Thread(target=watch, args=(sources, stop), daemon=True).start()
+    print(f"Serving {', '.join(source.name for source in sources)} on http://{args.host}:{server.server_port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the manifests from memory with ETags, pagination and slug lookups.")
+    parser.add_argument("--host", type=str, default=DEFAULT_HOST, help=f"Address to listen on (default: {DEFAULT_HOST}).")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"Port to listen on (default: {DEFAULT_PORT}).")
+    parser.add_argument("--config", type=str, help="Serve the collections of this config (see collection_config.py) instead of the default manifests.")
+    parser.add_argument("--verbose", action="store_true", help="Log every request.")
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,249 @@
+"""
+Streaming access to manifests, one record at a time.
+
+iter_records() reads the records of photo_manifest.json or image_manifest.json without
+loading the whole file: it decodes one record at a time from a buffer of READ_CHUNK_SIZE
+characters, so memory stays bounded by the largest record however long the manifest is.
+Records can be filtered by date range and slug prefix.
+
+Photo manifests are sorted newest first, so a date range ends the scan at the first
+older record. The generators also write a seek index next to the photo manifest
+(photo_manifest.json.seek): the position of every SEEK_INDEX_STRIDE-th record, so a date
+range starts reading near its first record instead of at the top of the file. Partial
+manifests (written with --partition) are shards of one manifest: iter_shards() merges them
+in manifest order and skips year partitions outside the date range without opening them.
+
+    from manifest_stream import iter_records
+
+    for record in iter_records("/mnt/Web/photo_manifest.json", since="2025-05", until="2025-06"):
+        print(record["slug"])
+"""
+
+import heapq
+import json
+import os
+import re
+from pathlib import Path
+
+SEEK_INDEX_VERSION = 1
+# Records between two seek index entries
+SEEK_INDEX_STRIDE = 256
+# Characters read from the manifest at a time
+READ_CHUNK_SIZE = 1 << 16
+
+_DECODER = json.JSONDecoder()
+_SPACE = re.compile(r"\s*")
+# Partial manifests of year partitions: photo_manifest.years-2019-2021.json
+_YEARS_SHARD = re.compile(r"\.years-(\d{4})-(\d{4})\.json$")
+
+
+def seek_index_path(manifest_path):
+    """Returns the path of a manifest's seek index."""
+    manifest_path = Path(manifest_path)
+    return manifest_path.with_name(manifest_path.name + ".seek")
+
+
+def write_manifest(f, records, default=None, stride=SEEK_INDEX_STRIDE):
+    """
+    Writes records as a manifest, formatted like json.dump(records, f, indent=2).
+
+    Args:
+        f: Text file open for writing, at its start
+        records: Manifest records (dicts or PhotoRecords), in manifest order
+        default: json `default` hook for records that are not dicts (e.g. record_to_json)
+        stride: Records between two seek index entries
+
+    Returns:
+        Seek index entries: [dateTaken, slug, position] of every stride-th record
+    """
+    encoder = json.JSONEncoder(indent=2, default=default)
+    entries = []
+    f.write("[")
+    for index, record in enumerate(records):
+        f.write(",\n  " if index else "\n  ")
+        if index % stride == 0:
+            entries.append([record.get("dateTaken"), record.get("slug"), f.tell()])
+        f.write(encoder.encode(record).replace("\n", "\n  "))
+    f.write("\n]" if entries else "]")
+    return entries
+
+
+def write_seek_index(manifest_path, entries):
+    """Writes the seek index of a manifest written by write_manifest()."""
+    index = {
+        "version": SEEK_INDEX_VERSION,
+        "size": os.path.getsize(manifest_path),
+        "entries": entries,
+    }
+    with open(seek_index_path(manifest_path), "w") as f:
+        json.dump(index, f, separators=(",", ":"))
+
+
+def _date_prefix(record, length):
+    return (record.get("dateTaken") or "")[:length]
+
+
+def _seek_position(manifest_path, until):
+    """
+    Finds where records dated until or earlier start, from the seek index.
+
+    Returns:
+        Tuple of (position of a record at or before the first match, its slug), or None
+        to read from the top (no usable seek index, or no record to skip)
+    """
+    try:
+        with open(seek_index_path(manifest_path)) as f:
+            index = json.load(f)
+        if index.get("version") != SEEK_INDEX_VERSION or index.get("size") != os.path.getsize(manifest_path):
+            return None
+        entries = index["entries"]
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    start = None
+    for date_taken, slug, position in entries:
+        if (date_taken or "")[:len(until)] <= until:
+            break
+        start = (position, slug)
+    return start
+
+
+def _iter_array(f, inside=False):
+    """
+    Decodes the elements of a JSON array one at a time.
+
+    Args:
+        f: Text file, at the array's "[" (or, with inside=True, at one of its elements)
+        inside: Whether f is positioned inside the array
+
+    Raises:
+        ValueError: If the file is not a JSON array of objects
+    """
+    buffer, pos, eof = "", 0, False
+    state = "element" if inside else "start"
+    while True:
+        pos = _SPACE.match(buffer, pos).end()
+        if pos == len(buffer):
+            if eof:
+                raise ValueError("Manifest ends before its closing ]")
+            buffer, pos = f.read(READ_CHUNK_SIZE), 0
+            eof = not buffer
+            continue
+        char = buffer[pos]
+        if state == "start":
+            if char != "[":
+                raise ValueError("Manifest is not a JSON array")
+            pos += 1
+            state = "first"
+            continue
+        if state == "next" or (state == "first" and char == "]"):
+            if char == "]":
+                return
+            if char != ",":
+                raise ValueError(f"Expected , or ] between manifest records, got {char!r}")
+            pos += 1
+            state = "element"
+            continue
+
+        # A record: read more until it is complete
+        while True:
+            try:
+                record, pos = _DECODER.raw_decode(buffer, pos)
+                break
+            except json.JSONDecodeError:
+                chunk = f.read(READ_CHUNK_SIZE) if not eof else ""
+                if not chunk:
+                    raise
+                buffer, pos = buffer[pos:] + chunk, 0
+        if not isinstance(record, dict):
+            raise ValueError(f"Manifest record is not an object: {record!r}")
+        yield record
+        state = "next"
+
+
+def iter_records(manifest_path, since=None, until=None, slug_prefix=None):
+    """
+    Streams the records of a manifest.
+
+    Args:
+        manifest_path: Photo or image manifest file
+        since, until: Optional date range (inclusive) as ISO dates or prefixes of them
+            ("2025", "2025-05", "2025-05-17"); records without a dateTaken (every image
+            manifest record) are left out when a range is given. The range assumes the
+            manifest is newest first, as the photo generator writes it.
+        slug_prefix: Optional prefix the records' slugs must start with
+
+    Yields:
+        Record dicts, in file order
+
+    Raises:
+        OSError: If the file can't be read
+        ValueError: If it is not a JSON array of records
+    """
+    with open(manifest_path) as f:
+        inside = False
+        expected_slug = None
+        if until:
+            start = _seek_position(manifest_path, until)
+            if start is not None:
+                f.seek(start[0])
+                inside, expected_slug = True, start[1]
+        records = _iter_array(f, inside)
+        if expected_slug is not None:
+            # The index is checked against the record it points at: a manifest replaced
+            # by one of the same size is read from the top instead
+            try:
+                first = next(records)
+            except (StopIteration, ValueError):
+                first = None
+            if first is None or first.get("slug") != expected_slug:
+                f.seek(0)
+                records = _iter_array(f)
+            else:
+                records = _chain_first(first, records)
+
+        for record in records:
+            if until and _date_prefix(record, len(until)) > until:
+                continue
+            if since and _date_prefix(record, len(since)) < since:
+                return  # Everything after it is older (records without a date come last)
+            if (since or until) and not record.get("dateTaken"):
+                continue
+            if slug_prefix and not (record.get("slug") or "").startswith(slug_prefix):
+                continue
+            yield record
+
+
+def _chain_first(first, records):
+    yield first
+    yield from records
+
+
+def _shard_in_range(path, since, until):
+    match = _YEARS_SHARD.search(os.fspath(path))
+    if not match:
+        return True
+    first, last = match.group(1), match.group(2)
+    return not (since and last < since[:4]) and not (until and first > until[:4])
+
+
+def iter_shards(manifest_paths, since=None, until=None, slug_prefix=None):
+    """
+    Streams the records of several partial photo manifests, merged in manifest order.
+
+    Year partitions (photo_manifest.years-FIRST-LAST.json) outside the date range are
+    skipped without being opened. Each open shard holds one record in memory.
+
+    Args:
+        manifest_paths: Partial manifest files, each newest first
+        since, until, slug_prefix: Filters, as for iter_records()
+
+    Yields:
+        Record dicts, newest first
+    """
+    from generate_manifest import manifest_sort_key
+
+    streams = [
+        iter_records(path, since, until, slug_prefix)
+        for path in manifest_paths if _shard_in_range(path, since, until)
+    ]
+    yield from heapq.merge(*streams, key=manifest_sort_key, reverse=True)
@@ -0,0 +1,90 @@
+"""
+JSON Schema validation of manifest records.
+
+The generators validate each record as it is produced, against a validator built once per
+run for the schema's `items` subschema, so a broken record is reported with its file name
+instead of surfacing later in the web app. Records served unchanged from the cache were
+already validated when they were first produced and are skipped.
+
+validate_manifest() is the batch mode used by validate_manifest.py: it checks a whole
+manifest and collects every error instead of stopping at the first one.
+
+jsonschema is imported on first use: it takes longer to import than a whole no-op run.
+"""
+
+import hashlib
+import json
+from collections.abc import Iterator
+from pathlib import Path
+
+# Schemas ship next to the generators
+SCHEMA_DIR = Path(__file__).parent
+PHOTO_SCHEMA_FILE = SCHEMA_DIR / "photo_manifest.schema.json"
+IMAGE_SCHEMA_FILE = SCHEMA_DIR / "image_manifest.schema.json"
+
+
+def format_error(error, prefix=()):
+    """Formats a jsonschema error as "path.to.field: message"."""
+    path = ".".join(str(part) for part in (*prefix, *error.absolute_path))
+    return f"{path or '<root>'}: {error.message}"
+
+
+class RecordValidator:
+    """Validates manifest records against the item schema of a manifest schema file."""
+
+    def __init__(self, schema_path):
+        with open(schema_path, "rb") as f:
+            raw = f.read()
+        self.schema_path = Path(schema_path)
+        self.schema = json.loads(raw)
+        # Changes whenever the schema file does, so cached validation results can be dropped
+        self.signature = hashlib.blake2b(raw, digest_size=16).hexdigest()
+        self._validator = None
+
+    @property
+    def validator(self):
+        """The compiled validator for one record, built on first use."""
+        if self._validator is None:
+            from jsonschema.validators import validator_for
+
+            validator_class = validator_for(self.schema)
+            validator_class.check_schema(self.schema)
+            item_schema = dict(self.schema.get("items", {}))
+            # Keep the draft and any shared definitions visible from the item subschema
+            for key in ("$schema", "definitions", "$defs"):
+                if key in self.schema:
+                    item_schema.setdefault(key, self.schema[key])
+            self._validator = validator_class(item_schema)
+        return self._validator
+
+    def errors(self, record):
+        """
+        Validates one record.
+
+        Returns:
+            List of "field: message" strings, empty if the record is valid
+        """
+        errors = sorted(self.validator.iter_errors(record), key=lambda e: [str(p) for p in e.absolute_path])
+        return [format_error(error) for error in errors]
+
+
+def validate_manifest(manifest, schema_path):
+    """
+    Validates a whole manifest, collecting every error.
+
+    Args:
+        manifest: Parsed manifest (list of records), or an iterator of records such as
+            manifest_stream.iter_records()
+        schema_path: Path to the manifest's JSON schema
+
+    Returns:
+        List of "index.field: message" strings, empty if the manifest is valid
+    """
+    record_validator = RecordValidator(schema_path)
+    if not isinstance(manifest, (list, Iterator)):
+        return [f"<root>: manifest must be an array, got {type(manifest).__name__}"]
+    problems = []
+    for index, record in enumerate(manifest):
+        for error in record_validator.validator.iter_errors(record):
+            problems.append(format_error(error, prefix=(index,)))
+    return problems
@@ -0,0 +1,483 @@
+"""
+Zero-copy metadata reading through memory-mapped files, for local disks.
+
+Pillow reads the EXIF and XMP segments of a JPEG into bytes objects while opening it,
+get_exif_data() copies the EXIF bytes again into a BytesIO for exifread, and the AVIF
+plugin reads the whole file into memory before libavif parses its header. A MappedImage
+instead maps the file and only locates the metadata: the JPEG marker segments up to the
+first scan, or the boxes of an AVIF file's meta box. EXIF and XMP are handed to the
+parsers as memoryview slices of the mapping, so only the pages holding the header and
+the metadata are read, and only the values the parsers decode are copied.
+
+A MappedImage has the parts of the Pillow image interface that get_exif_data() uses
+(format, size, info, getexif(), _getexif(), getxmp(), close()), with the same results.
+open_mapped() raises ValueError for anything it doesn't handle exactly like Pillow
+(other formats, broken or unusual files, rotated AVIF images), and the caller reads those
+through Pillow instead.
+
+Mapped files must not be truncated while they are read, which can't be ruled out on
+network shares: use this reader for local disks only.
+"""
+
+import mmap
+import os
+import re
+
+try:
+    # Internal tables of Pillow's JPEG plugin, so that segments are walked exactly like
+    # Pillow walks them. They are not part of Pillow's API: without them, nothing is mapped.
+    from PIL.JpegImagePlugin import DQT, MARKER, SOF
+    UNAVAILABLE = None
+except ImportError as e:
+    DQT = MARKER = SOF = None
+    UNAVAILABLE = f"Pillow's JPEG marker tables are missing ({e})"
+
+# Pillow formats by file extension, for the formats read here
+MAPPED_FORMATS = {".jpg": "JPEG", ".jpeg": "JPEG", ".avif": "AVIF"}
+JPEG_EXIF_PREFIX = b"Exif\x00\x00"
+JPEG_XMP_PREFIX = b"http://ns.adobe.com/xap/1.0/\x00"
+XMP_CONTENT_TYPE = b"application/rdf+xml"
+TIFF_HEADERS = (b"MM\x00*", b"II*\x00")
+# Major brands the AVIF plugin accepts (the file must also be compatible with a coding brand)
+AVIF_MAJOR_BRANDS = (b"avif", b"avis", b"mif1", b"msf1")
+AVIF_CODING_BRANDS = {b"avif", b"avis"}
+# Versions libavif requires of the image property boxes it parses
+AVIF_PROPERTY_VERSIONS = {b"ispe": 0, b"pixi": 0}
+# libavif's default limits on the image size
+AVIF_DIMENSION_LIMIT = 32768
+AVIF_SIZE_LIMIT = 16384 * 16384
+# Exceptions Pillow tolerates when it reads the EXIF resolution while opening a JPEG
+JPEG_EXIF_ERRORS = (KeyError, SyntaxError, TypeError, ValueError, ZeroDivisionError)
+# Namespace of an XML tag, which Image.getxmp() drops from the keys
+XMP_NAMESPACE = re.compile("^{[^}]+}")
+
+
+class BufferFile:
+    """Read-only file object over a memoryview; read() copies only the bytes asked for."""
+
+    def __init__(self, view):
+        self.view = view
+        self.position = 0
+
+    def read(self, size=-1):
+        start = self.position
+        if size is None or size < 0:
+            data = self.view[start:].tobytes()
+        else:
+            data = self.view[start:start + size].tobytes()
+        self.position = start + len(data)
+        return data
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        if whence == os.SEEK_CUR:
+            offset += self.position
+        elif whence == os.SEEK_END:
+            offset += len(self.view)
+        if offset < 0:
+            raise ValueError("negative seek position")
+        self.position = offset
+        return offset
+
+    def tell(self):
+        return self.position
+
+
+def _uint(view, offset, size):
+    field = view[offset:offset + size]
+    if len(field) != size:
+        raise ValueError("truncated field")
+    return int.from_bytes(field, "big")
+
+
+def _jpeg_layout(view):
+    """
+    Walks the marker segments of a JPEG up to the first scan, like Pillow's JPEG plugin,
+    with the same checks.
+
+    Returns:
+        Tuple of (size, EXIF span or None, XMP span or None), spans as (start, end)
+    """
+    if view[:3] != b"\xff\xd8\xff":
+        raise ValueError("not a JPEG file")
+    size = exif = xmp = None
+    position = 2
+    while True:
+        if position + 2 > len(view) or view[position] != 0xFF:
+            raise ValueError("unexpected data between segments")
+        marker = 0xFF00 | view[position + 1]
+        if marker == 0xFFFF:
+            position += 1  # Fill byte
+            continue
+        if marker not in MARKER:
+            raise ValueError("no marker found")
+        handler = MARKER[marker][2]
+        if handler is None:  # No length field
+            position += 2
+            continue
+        start = position + 4
+        end = position + 2 + _uint(view, position + 2, 2)
+        if end < start or end > len(view):
+            raise ValueError("truncated segment")
+        if marker == 0xFFDA:  # Start of scan: the metadata comes before it
+            break
+        if marker == 0xFFE1 and view[start:start + 6] == JPEG_EXIF_PREFIX:
+            if exif is not None:
+                raise ValueError("EXIF split over several segments")  # Pillow joins them
+            exif = (start, end)
+        elif marker == 0xFFE1 and view[start:start + 29] == JPEG_XMP_PREFIX:
+            xmp = (start + 29, end)
+        elif handler is SOF:
+            if end - start < 6 or view[start] != 8 or view[start + 5] not in (1, 3, 4):
+                raise ValueError("unsupported frame")
+            size = (_uint(view, start + 3, 2), _uint(view, start + 1, 2))
+        elif handler is DQT:
+            table = start
+            while table < end:
+                table += 1 + (64 if view[table] < 16 else 128)
+                if table > end:
+                    raise ValueError("bad quantization table marker")
+        position = end
+    if size is None:
+        raise ValueError("no frame header")
+    return size, exif, xmp
+
+
+def _boxes(view, start, end):
+    """Yields (type, payload start, box end) for the ISOBMFF boxes between start and end."""
+    position = start
+    while position < end:
+        size = _uint(view, position, 4)
+        box_type = bytes(view[position + 4:position + 8])
+        header = 8
+        if size == 1:
+            size = _uint(view, position + 8, 8)
+            header = 16
+        elif size == 0:
+            size = end - position
+        if size < header or position + size > end:
+            raise ValueError(f"truncated {box_type!r} box")
+        yield box_type, position + header, position + size
+        position += size
+
+
+def _avif_items(view, start, end):
+    """
+    Reads the item boxes of an AVIF meta box.
+
+    Returns:
+        Tuple of (primary item ID, {item ID: (type, content type)}, {item ID: [(offset,
+        length)] or None}, {item ID: [property boxes as (type, start, end)]}, {item ID: [IDs of
+        the items it describes]})
+    """
+    primary = handler = None
+    infos, locations, properties, references = {}, {}, {}, {}
+    for box_type, payload, box_end in _boxes(view, start, end):
+        version = view[payload]
+        if box_type == b"hdlr":
+            # Pre-defined field, handler type and a null-terminated name
+            handler = bytes(view[payload + 4:payload + 12])
+            if version != 0 or handler != b"\x00\x00\x00\x00pict" or 0 not in view[payload + 24:box_end]:
+                raise ValueError("not an image")
+        elif box_type == b"pitm":
+            primary = _uint(view, payload + 4, 2 if version == 0 else 4)
+        elif box_type == b"iinf":
+            count_size = 2 if version == 0 else 4
+            entries = list(_boxes(view, payload + 4 + count_size, box_end))
+            if len(entries) != _uint(view, payload + 4, count_size):
+                raise ValueError("item info count mismatch")
+            for entry_type, entry, entry_end in entries:
+                if entry_type != b"infe" or view[entry] not in (2, 3):
+                    raise ValueError("unsupported item info")
+                id_size = 2 if view[entry] == 2 else 4
+                item_id = _uint(view, entry + 4, id_size)
+                item_type = bytes(view[entry + 6 + id_size:entry + 10 + id_size])
+                # Item name, then the content type of mime items, null-terminated
+                names = bytes(view[entry + 10 + id_size:entry_end]).split(b"\x00")
+                if len(names) < (3 if item_type == b"mime" else 2):
+                    raise ValueError("unterminated item name")
+                content_type = names[1] if item_type == b"mime" else None
+                infos[item_id] = (item_type, content_type)
+        elif box_type == b"iloc":
+            sizes = view[payload + 4], view[payload + 5]
+            offset_size, length_size = sizes[0] >> 4, sizes[0] & 15
+            base_offset_size, index_size = sizes[1] >> 4, (sizes[1] & 15 if version in (1, 2) else 0)
+            id_size = 2 if version < 2 else 4
+            count = _uint(view, payload + 6, id_size)
+            position = payload + 6 + id_size
+            for _ in range(count):
+                item_id = _uint(view, position, id_size)
+                position += id_size
+                method = 0
+                if version in (1, 2):
+                    method = _uint(view, position, 2) & 15
+                    position += 2
+                position += 2  # Data reference index
+                base_offset = _uint(view, position, base_offset_size)
+                position += base_offset_size
+                extents = []
+                extent_count = _uint(view, position, 2)
+                position += 2
+                for _ in range(extent_count):
+                    position += index_size
+                    offset = base_offset + _uint(view, position, offset_size)
+                    length = _uint(view, position + offset_size, length_size)
+                    position += offset_size + length_size
+                    extents.append((offset, length or len(view) - offset))
+                # Data in the idat box or built from other items isn't read in place
+                locations[item_id] = None if method else extents
+            if position > box_end:
+                raise ValueError("truncated item locations")
+        elif box_type == b"iref":
+            id_size = 2 if version == 0 else 4
+            for reference_type, entry, entry_end in _boxes(view, payload + 4, box_end):
+                count = _uint(view, entry + id_size, 2)
+                if entry + id_size + 2 + count * id_size > entry_end:
+                    raise ValueError("truncated item reference")
+                if reference_type == b"cdsc":
+                    item_id = _uint(view, entry, id_size)
+                    described = [_uint(view, entry + id_size + 2 + i * id_size, id_size) for i in range(count)]
+                    references[item_id] = described
+        elif box_type == b"iprp":
+            boxes = {box_type: (payload, box_end) for box_type, payload, box_end in _boxes(view, payload, box_end)}
+            if b"ipco" not in boxes or b"ipma" not in boxes:
+                raise ValueError("no item properties")
+            container = list(_boxes(view, *boxes[b"ipco"]))
+            position = boxes[b"ipma"][0]
+            id_size = 2 if view[position] < 1 else 4
+            index_size = 2 if _uint(view, position + 1, 3) & 1 else 1
+            count = _uint(view, position + 4, 4)
+            position += 8
+            for _ in range(count):
+                item_id = _uint(view, position, id_size)
+                associations = view[position + id_size]
+                position += id_size + 1
+                associated = []
+                for _ in range(associations):
+                    index = _uint(view, position, index_size) & (0x7FFF if index_size == 2 else 0x7F)
+                    position += index_size
+                    if index > len(container):
+                        raise ValueError("missing item property")
+                    if index:
+                        associated.append(container[index - 1])
+                properties[item_id] = associated
+            if position > boxes[b"ipma"][1]:
+                raise ValueError("truncated item properties")
+    if primary is None or handler is None:
+        raise ValueError("no primary item")
+    return primary, infos, locations, properties, references
+
+
+def _avif_layout(view):
+    """
+    Finds the size of an AVIF file's primary image and the items holding its metadata.
+
+    Returns:
+        Tuple of (size, EXIF span or None, XMP span or None), spans as (start, end)
+    """
+    if bytes(view[4:8]) != b"ftyp" or bytes(view[8:12]) not in AVIF_MAJOR_BRANDS:
+        raise ValueError("not an AVIF file")
+    top = {}
+    for box_type, payload, box_end in _boxes(view, 0, len(view)):
+        top.setdefault(box_type, (payload, box_end))
+    if b"meta" not in top:
+        raise ValueError("not an AVIF file")
+    payload, box_end = top[b"ftyp"]
+    brands = {bytes(view[i:i + 4]) for i in range(payload, box_end - 3, 4)}
+    if not brands & AVIF_CODING_BRANDS:
+        raise ValueError("not an AVIF file")
+    payload, box_end = top[b"meta"]
+    if view[payload] != 0:
+        raise ValueError("unsupported meta version")
+    primary, infos, locations, properties, references = _avif_items(view, payload + 4, box_end)
+
+    if infos.get(primary, (None,))[0] != b"av01" or locations.get(primary) is None:
+        raise ValueError("unsupported primary item")  # Grids, for instance
+    for offset, length in locations[primary]:
+        if offset + length > len(view):
+            raise ValueError("truncated image data")
+    property_types = {box_type for box_type, _, _ in properties.get(primary, ())}
+    if not {b"av1C", b"ispe", b"pixi"} <= property_types:
+        raise ValueError("missing image properties")
+    for box_type, payload, box_end in properties[primary]:
+        if box_type in AVIF_PROPERTY_VERSIONS and view[payload] != AVIF_PROPERTY_VERSIONS[box_type]:
+            raise ValueError(f"unsupported {box_type!r} version")
+        if box_type == b"av1C" and view[payload] != 0x81:
+            raise ValueError("invalid av1C")
+        if box_type == b"colr" and bytes(view[payload:payload + 4]) == b"nclx" and view[payload + 10] & 0x7F:
+            raise ValueError("invalid colr")
+    # The pixel information must match the AV1 configuration
+    _, av1c, _ = next(box for box in properties[primary] if box[0] == b"av1C")
+    _, pixi, pixi_end = next(box for box in properties[primary] if box[0] == b"pixi")
+    flags = view[av1c + 2]
+    depth = 12 if flags & 0x20 else 10 if flags & 0x40 else 8
+    channels = 1 if flags & 0x10 else 3
+    if view[pixi + 4] != channels or pixi + 5 + channels > pixi_end or any(view[pixi + 5 + i] != depth for i in range(channels)):
+        raise ValueError("pixel information doesn't match the AV1 configuration")
+    if property_types & {b"irot", b"imir"}:
+        raise ValueError("transformed image")  # The AVIF plugin rewrites the EXIF orientation
+    _, ispe, _ = next(box for box in properties[primary] if box[0] == b"ispe")
+    size = (_uint(view, ispe + 4, 4), _uint(view, ispe + 8, 4))
+    if not 0 < size[0] <= AVIF_DIMENSION_LIMIT or not 0 < size[1] <= AVIF_DIMENSION_LIMIT or size[0] * size[1] > AVIF_SIZE_LIMIT:
+        raise ValueError("image too large")
+
+    spans = {}
+    for item_id, (item_type, content_type) in infos.items():
+        if primary not in references.get(item_id, ()):
+            continue
+        kind = "exif" if item_type == b"Exif" else "xmp" if content_type == XMP_CONTENT_TYPE else None
+        if kind is None or kind in spans:
+            continue
+        extents = locations.get(item_id) or ()
+        if len(extents) != 1:
+            raise ValueError(f"{kind} item in {len(extents)} extents")
+        offset, length = extents[0]
+        if offset + length > len(view):
+            raise ValueError(f"truncated {kind} item")
+        if kind == "exif":
+            # The payload starts with the offset of its TIFF header, which libavif checks
+            # against the first header in the data and then skips
+            header = _uint(view, offset, 4)
+            data = offset + 4
+            if header + 4 >= length - 4 or bytes(view[data + header:data + header + 4]) not in TIFF_HEADERS:
+                raise ValueError("invalid Exif payload")
+            before = bytes(view[data:data + header + 3])
+            if any(tiff in before for tiff in TIFF_HEADERS):
+                raise ValueError("invalid Exif payload")
+            spans[kind] = (data, offset + length)
+        else:
+            spans[kind] = (offset, offset + length)
+    return size, spans.get("exif"), spans.get("xmp")
+
+
+def _xmp_name(tag):
+    return XMP_NAMESPACE.sub("", tag)
+
+
+def _xmp_value(element):
+    """Converts an XMP element to dicts, lists and strings, like Image.getxmp()."""
+    value = {_xmp_name(k): v for k, v in element.attrib.items()}
+    children = list(element)
+    if children:
+        for child in children:
+            name = _xmp_name(child.tag)
+            child_value = _xmp_value(child)
+            if name in value:
+                if not isinstance(value[name], list):
+                    value[name] = [value[name]]
+                value[name].append(child_value)
+            else:
+                value[name] = child_value
+    elif value:
+        if element.text:
+            value["text"] = element.text
+    else:
+        return element.text
+    return value
+
+
+class MappedImage:
+    """The metadata of a memory-mapped JPEG or AVIF file, read like a Pillow image."""
+
+    def __init__(self, image_path):
+        """
+        Raises:
+            ValueError: If the file isn't a JPEG or AVIF file read exactly like Pillow
+            OSError: If the file can't be mapped
+        """
+        if UNAVAILABLE:
+            raise ValueError(UNAVAILABLE)
+        self.format = MAPPED_FORMATS.get(os.path.splitext(os.fspath(image_path))[1].lower())
+        if self.format is None:
+            raise ValueError("unsupported format")
+        with open(image_path, "rb") as f:
+            self._mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._views = [memoryview(self._mapping)]
+        self._exif = None
+        self.info = {}
+        try:
+            layout = _jpeg_layout if self.format == "JPEG" else _avif_layout
+            self.size, exif, xmp = layout(self._views[0])
+            if min(self.size) <= 0:
+                raise ValueError("empty image")
+            if exif:
+                self._exif_span = exif
+                self.info["exif"] = self._slice(*exif)
+            if xmp:
+                start, end = xmp
+                # Pillow strips trailing padding before parsing
+                while end > start and self._views[0][end - 1] in b"\x00 ":
+                    end -= 1
+                self.info["xmp"] = self._slice(start, end)
+            # Pillow parses the EXIF while opening: a broken one fails the same way here
+            if self.format == "AVIF" and exif:
+                self.getexif()
+            elif exif:
+                try:
+                    self.getexif()
+                except JPEG_EXIF_ERRORS:
+                    pass
+        except BaseException:
+            self.close()
+            raise
+
+    def _slice(self, start, end):
+        view = self._views[0][start:end]
+        self._views.append(view)
+        return view
+
+    def getexif(self):
+        """Returns the EXIF as a PIL.Image.Exif, parsed in place (see Image.getexif)."""
+        from PIL import Image
+
+        if self._exif is not None:
+            return self._exif
+        self._exif = Image.Exif()
+        if "exif" in self.info:
+            start, end = self._exif_span
+            while self._views[0][start:start + 6] == JPEG_EXIF_PREFIX:
+                start += 6
+            if start < end:
+                # The TIFF header must be at the start of the file object
+                self._exif.load_from_fp(BufferFile(self._slice(start, end)))
+        return self._exif
+
+    def _getexif(self):
+        """Returns the EXIF tags with the EXIF and GPS IFDs merged in, like a JPEG's _getexif()."""
+        if "exif" not in self.info:
+            return None
+        return self.getexif()._get_merged_dict()
+
+    def exif_file(self):
+        """Returns a file object over the EXIF payload, for exifread."""
+        return BufferFile(self.info["exif"])
+
+    def getxmp(self):
+        """Returns the XMP as nested dicts, like Image.getxmp()."""
+        if "xmp" not in self.info:
+            return {}
+        from defusedxml import ElementTree
+
+        root = ElementTree.fromstring(self.info["xmp"])
+        return {_xmp_name(root.tag): _xmp_value(root)}
+
+    def close(self):
+        """Releases the views and unmaps the file."""
+        if self._exif is not None:
+            self._exif.fp = None
+        while self._views:
+            self._views.pop().release()
+        self._mapping.close()
+
+
+def open_mapped(image_path):
+    """
+    Maps an image for reading its metadata.
+
+    Returns:
+        MappedImage (caller must close it)
+
+    Raises:
+        ValueError: If the file should be read through Pillow instead
+        OSError: If the file can't be mapped
+    """
+    return MappedImage(image_path)
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Merge partial photo manifests into the final photo_manifest.json.
+
+Partial manifests are written by `generate_manifest.py --partition ...`, each already in
+manifest order (newest first). They are combined with a k-way merge, checked for slug
+collisions (two photos that would get the same URL), and then the steps that need the
+whole collection are run: near-duplicate marking, the geo index, the grid layouts, the
+tag tree and the search index.
+
+Usage:
+    python merge_manifests.py photo_manifest.years-*.json [--output FILE] [--no-gps]
+"""
+
+import argparse
+import heapq
+import sys
+from pathlib import Path
+
+import generate_manifest
+from duplicates import DEFAULT_DUPLICATE_RADIUS
+from generate_manifest import manifest_sort_key, write_photo_outputs
+from manifest_stream import iter_records
+from manifest_validation import PHOTO_SCHEMA_FILE, RecordValidator
+from photo_record import PhotoRecord
+
+
+def read_partial(path):
+    """
+    Reads a partial manifest and checks that it is in manifest order.
+
+    Records are streamed and converted one at a time, so the file's dicts are never all in
+    memory next to the records.
+
+    Returns:
+        List of PhotoRecord
+
+    Raises:
+        ValueError: If the file is not a sorted manifest
+    """
+    records = []
+    previous_key = None
+    for record in iter_records(path):
+        key = manifest_sort_key(record)
+        if previous_key is not None and key > previous_key:
+            raise ValueError(f"{path} is not sorted newest first; regenerate it with --partition")
+        previous_key = key
+        records.append(PhotoRecord(**record))
+    return records
+
+
+def find_slug_collisions(records):
+    """
+    Finds slugs shared by more than one record.
+
+    Returns:
+        Dict mapping each colliding slug to the relative paths of its records
+    """
+    paths_by_slug = {}
+    for record in records:
+        paths_by_slug.setdefault(record["slug"], []).append(record["relativePath"])
+    return {slug: paths for slug, paths in paths_by_slug.items() if len(paths) > 1}
+
+
+def main(args):
+    partials = []
+    for path in args.partials:
+        try:
+            partials.append(read_partial(path))
+        except (OSError, ValueError, TypeError) as e:
+            print(f"Error reading {path}: {e}")
+            return 1
+        print(f"Read {len(partials[-1])} records from {path}")
+
+    records = list(heapq.merge(*partials, key=manifest_sort_key, reverse=True))
+    collisions = find_slug_collisions(records)
+    if collisions:
+        print(f"Error: {len(collisions)} slugs are used by more than one photo:")
+        for slug, paths in sorted(collisions.items()):
+            print(f"  {slug}: {', '.join(paths)}")
+        print("Overlapping partitions produce the same photo twice; check the partition selectors.")
+        return 1
+
+    has_hashes = any(record["perceptualHash"] for record in records)
+    output_path = Path(args.output) if args.output else generate_manifest.OUTPUT_JSON_FILE
+    write_photo_outputs(
+        records, output_path,
+        geo_index_path=None if args.no_gps else generate_manifest.GEO_INDEX_FILE,
+        duplicate_radius=args.duplicate_radius if has_hashes else None,
+        duplicate_report_path=args.duplicate_report,
+        layout_path=generate_manifest.LAYOUT_FILE,
+        tag_tree_path=generate_manifest.TAG_TREE_FILE,
+        search_index_path=generate_manifest.SEARCH_INDEX_DIR,
+        record_validator=RecordValidator(PHOTO_SCHEMA_FILE),
+    )
+    print(f"\nMerged {len(records)} records from {len(partials)} partial manifests.")
+    print(f"Manifest file created: {output_path.resolve()}")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Merge partial photo manifests written with --partition.")
+    parser.add_argument("partials", nargs="+", type=str, help="Partial manifest files.")
+    parser.add_argument("--output", type=str, help="Manifest file to write (default: the configured photo manifest).")
+    parser.add_argument("--duplicate-radius", type=int, default=DEFAULT_DUPLICATE_RADIUS, help=f"Maximum Hamming distance between perceptual hashes of near-duplicates (default: {DEFAULT_DUPLICATE_RADIUS}).")
+    parser.add_argument("--duplicate-report", type=str, help="Write the near-duplicate cluster report (JSON) to this path.")
+    parser.add_argument("--no-gps", action="store_true", help="Do not write the geo index.")
+    sys.exit(main(parser.parse_args()))
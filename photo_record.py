@@ -0,0 +1,138 @@
+"""
+Compact in-memory representation of photo manifest records.
+
+A manifest record as a plain dict costs about a kilobyte of hash table per photo, on top of
+its values, and the metadata loaded from the cache repeats the same camera, lens, author and
+exposure values for every photo. PhotoRecord stores the fields in __slots__ instead, cached
+metadata is kept as a row (a list in METADATA_FIELDS order) rather than a dict, and
+ValuePool keeps one shared instance of each repeated value. Records are converted to dicts
+one at a time, only when they are written out or validated.
+
+PhotoRecord supports the subset of the dict interface the generator's post-processing
+uses (record["field"], record["field"] = value, record.get("field")).
+"""
+
+from itertools import chain
+
+from pixel_analysis import ANALYZERS
+
+# Fields derived from the file's location in the collection
+PATH_FIELDS = ("relativePath", "filename", "year", "month", "day", "slug")
+# Fields extracted from the file's EXIF/XMP metadata (see extract_photo_metadata), in the
+# order they are stored in cached rows. Changing it requires bumping METADATA_VERSION.
+METADATA_FIELDS = (
+    "width", "height", "dateTaken", "title", "description", "tags", "tagPaths",
+    "cameraModel", "lensModel", "flash", "focalLength", "focalLength35mmEquiv",
+    "focalLengthCategory", "cropFactor", "apertureValue", "isoSpeedRatings", "exposureTime",
+    "creator", "copyright", "notes", "latitude", "longitude", "altitude",
+)
+# Fields produced by the registered pixel analyzers
+ANALYSIS_FIELDS = tuple(field for analyzer in ANALYZERS.values() for field in analyzer["fields"])
+# Every field, in manifest order
+RECORD_FIELDS = PATH_FIELDS + METADATA_FIELDS + ANALYSIS_FIELDS + ("duplicateOf",)
+
+# Metadata fields whose values repeat across many photos of an archive
+SHARED_FIELDS = (
+    "width", "height", "tags", "tagPaths", "cameraModel", "lensModel", "focalLength",
+    "focalLength35mmEquiv", "focalLengthCategory", "cropFactor", "apertureValue",
+    "isoSpeedRatings", "exposureTime", "creator", "copyright",
+)
+SHARED_POSITIONS = tuple(METADATA_FIELDS.index(name) for name in SHARED_FIELDS)
+
+
+class ValuePool:
+    """Hands out one shared instance of each distinct value, like sys.intern for any type."""
+
+    def __init__(self):
+        self._values = {}
+
+    def share(self, value):
+        """Returns the shared instance equal to value (lists are shared by content)."""
+        if value is None or isinstance(value, bool):
+            return value
+        # Keyed by type too, so that 1, 1.0 and True stay distinct in the JSON output
+        key = (list, tuple(value)) if isinstance(value, list) else (type(value), value)
+        return self._values.setdefault(key, value)
+
+    def share_row(self, row):
+        """
+        Replaces the repeated values of a metadata row by shared instances, in place.
+
+        Shared lists must not be modified afterwards.
+
+        Returns:
+            The same row
+        """
+        values = self._values
+        for position in SHARED_POSITIONS:
+            value = row[position]
+            # Inlined share(): this runs for every field of every photo
+            if value is None or value.__class__ is bool:
+                continue
+            key = (list, tuple(value)) if value.__class__ is list else (value.__class__, value)
+            row[position] = values.setdefault(key, value)
+        return row
+
+
+def metadata_row(metadata):
+    """Packs a dict of metadata fields into a row, the form cached between runs."""
+    return [metadata.get(name) for name in METADATA_FIELDS]
+
+
+class PhotoRecord:
+    """One photo manifest record, with a slot per manifest field."""
+
+    __slots__ = RECORD_FIELDS
+
+    @classmethod
+    def from_row(cls, path_values, row, analysis_fields):
+        """
+        Builds a record from its parts, positionally, which is several times faster than
+        keyword arguments.
+
+        Args:
+            path_values: Values of PATH_FIELDS, in order
+            row: Metadata row (values of METADATA_FIELDS, in order)
+            analysis_fields: Dict of pixel analysis fields; missing ones are set to None
+        """
+        record = cls.__new__(cls)
+        values = chain(path_values, row, map(analysis_fields.get, ANALYSIS_FIELDS), (None,))
+        for set_slot, value in zip(_SLOT_SETTERS, values):
+            set_slot(record, value)
+        return record
+
+    def __init__(self, **fields):
+        for name in RECORD_FIELDS:
+            setattr(self, name, fields.pop(name, None))
+        if fields:
+            raise TypeError(f"Unknown manifest fields: {', '.join(sorted(fields))}")
+
+    def __getitem__(self, name):
+        try:
+            return getattr(self, name)
+        except AttributeError:
+            raise KeyError(name) from None
+
+    def __setitem__(self, name, value):
+        try:
+            setattr(self, name, value)
+        except AttributeError:
+            raise KeyError(name) from None
+
+    def get(self, name, default=None):
+        return getattr(self, name, default)
+
+    def to_dict(self, fields=RECORD_FIELDS):
+        """Returns the record (or the given fields of it) as a dict in manifest field order."""
+        return {name: getattr(self, name) for name in fields}
+
+
+# Slot descriptors' setters in RECORD_FIELDS order, for from_row()
+_SLOT_SETTERS = tuple(getattr(PhotoRecord, name).__set__ for name in RECORD_FIELDS)
+
+
+def record_to_json(obj):
+    """json.dump `default` hook serializing PhotoRecords one at a time."""
+    if isinstance(obj, PhotoRecord):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
@@ -0,0 +1,165 @@
+"""
+Staged asyncio pipeline with bounded queues between the stages.
+
+A source iterator (the scanner) feeds a chain of stages. Each stage runs its function on
+a pool of threads of its own size, so a slow stage gets more workers without affecting
+the others, and blocking work (file reads, waiting on decoder processes) never blocks
+the event loop. Stages are connected by bounded queues: when a stage falls behind, the
+queue in front of it fills up and the stages before it wait, instead of buffering the
+whole collection in memory.
+
+Queue depths are sampled while the pipeline runs and summarized per stage at the end: a
+stage with a full queue in front of it and busy workers is the bottleneck, a stage with
+an empty queue is starved by the stages before it.
+
+Items flow through the stages out of order; consumers that need an order must sort.
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Items the scanner reads from the source per call into its thread
+SCAN_BATCH_SIZE = 32
+# Seconds between queue depth samples
+SAMPLE_INTERVAL = 0.1
+
+_DONE = object()
+
+
+class Stage:
+    """One pipeline stage: a function run on each item by a pool of threads."""
+
+    def __init__(self, name, func, workers=1, when=None):
+        """
+        Args:
+            name: Name shown in reports
+            func: Called with each item; returns the item for the next stage, or None
+                to drop it
+            workers: Number of threads running func concurrently
+            when: Optional predicate; items it rejects skip func and go straight on
+        """
+        if workers < 1:
+            raise ValueError(f"Stage {name} needs at least one worker")
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.when = when
+        self.items = 0  # Items func ran on
+        self.busy = 0.0  # Total seconds spent in func, over all workers
+        self.depth_total = 0  # Sum of sampled depths of the queue in front of the stage
+        self.depth_max = 0
+
+
+class PipelineReport:
+    """Queue depths and stage utilization of a finished (or stopped) pipeline run."""
+
+    def __init__(self, stages, queue_size, wall, samples, stopped):
+        self.stages = stages
+        self.queue_size = queue_size
+        self.wall = wall
+        self.samples = samples
+        self.stopped = stopped
+
+    def lines(self):
+        """Returns a table of the stages, one line each, for printing."""
+        lines = [f"{'stage':<10} {'workers':>7} {'items':>7} {'busy':>6} {'queue avg':>9} {'max':>5}"]
+        for stage in self.stages:
+            utilization = stage.busy / (self.wall * stage.workers) if self.wall else 0.0
+            average = stage.depth_total / self.samples if self.samples else 0.0
+            lines.append(
+                f"{stage.name:<10} {stage.workers:>7} {stage.items:>7} {utilization:>6.0%} "
+                f"{average:>9.1f} {stage.depth_max:>5}"
+            )
+        lines.append(f"(queues hold {self.queue_size} items; busy is the share of the stage's worker time spent working)")
+        return lines
+
+
+def run_pipeline(source, stages, queue_size=64, stop=None, progress_interval=None):
+    """
+    Runs items from source through the stages.
+
+    Args:
+        source: Iterator of items, read in a thread of its own
+        stages: List of Stage; the last one is the sink (its return value is ignored)
+        queue_size: Capacity of each queue between stages
+        stop: Optional callable; once it returns True, the scanner stops reading the
+            source and the items already in the pipeline are finished
+        progress_interval: Seconds between printed queue depth lines, or None
+
+    Returns:
+        PipelineReport
+    """
+    return asyncio.run(_run(source, stages, queue_size, stop, progress_interval))
+
+
+async def _run(source, stages, queue_size, stop, progress_interval):
+    loop = asyncio.get_running_loop()
+    queues = [asyncio.Queue(queue_size) for _ in stages]
+    executors = [ThreadPoolExecutor(stage.workers, thread_name_prefix=stage.name) for stage in stages]
+    scan_executor = ThreadPoolExecutor(1, thread_name_prefix="scan")
+    stopped = False
+    started = time.perf_counter()
+
+    def read_batch():
+        return [item for _, item in zip(range(SCAN_BATCH_SIZE), source)]
+
+    async def scan():
+        nonlocal stopped
+        while True:
+            if stop is not None and stop():
+                stopped = True
+                break
+            batch = await loop.run_in_executor(scan_executor, read_batch)
+            for item in batch:
+                await queues[0].put(item)
+            if len(batch) < SCAN_BATCH_SIZE:
+                break
+        for _ in range(stages[0].workers):
+            await queues[0].put(_DONE)
+
+    async def work(index):
+        stage = stages[index]
+        output = queues[index + 1] if index + 1 < len(stages) else None
+        while True:
+            item = await queues[index].get()
+            if item is _DONE:
+                return
+            if stage.when is None or stage.when(item):
+                began = time.perf_counter()
+                item = await loop.run_in_executor(executors[index], stage.func, item)
+                stage.busy += time.perf_counter() - began
+                stage.items += 1
+            if output is not None and item is not None:
+                await output.put(item)
+
+    async def run_stage(index):
+        await asyncio.gather(*(work(index) for _ in range(stages[index].workers)))
+        if index + 1 < len(stages):
+            for _ in range(stages[index + 1].workers):
+                await queues[index + 1].put(_DONE)
+
+    samples = 0
+
+    async def sample():
+        nonlocal samples
+        next_progress = time.perf_counter() + progress_interval if progress_interval else None
+        while True:
+            await asyncio.sleep(SAMPLE_INTERVAL)
+            samples += 1
+            for stage, queue in zip(stages, queues):
+                stage.depth_total += queue.qsize()
+                stage.depth_max = max(stage.depth_max, queue.qsize())
+            if next_progress and time.perf_counter() >= next_progress:
+                next_progress += progress_interval
+                depths = " | ".join(f"{stage.name} {queue.qsize()}/{queue_size}" for stage, queue in zip(stages, queues))
+                print(f"Queues: {depths}")
+
+    sampler = asyncio.create_task(sample())
+    try:
+        await asyncio.gather(scan(), *(run_stage(index) for index in range(len(stages))))
+    finally:
+        sampler.cancel()
+        for executor in (scan_executor, *executors):
+            executor.shutdown(wait=False, cancel_futures=True)
+    return PipelineReport(stages, queue_size, time.perf_counter() - started, samples, stopped)
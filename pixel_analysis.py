@@ -0,0 +1,243 @@
+"""
+Single-decode pixel analysis stage for the photo manifest generator.
+
+Every pixel-derived field (placeholders, colors, hashes, ...) is produced by an analyzer
+registered with @register_analyzer. For each image the stage decodes pixels at most once,
+at a bounded resolution, into a shared NumPy array and hands that array to every analyzer
+whose result is not cached yet. Results are cached per content fingerprint and analyzer
+version, so unchanged photos are never decoded, and runs without analyzers never touch
+pixels at all.
+
+NumPy and Pillow are imported inside the functions that need them: registering and
+looking up analyzers must stay cheap for runs where every result comes from the cache.
+"""
+
+from image_io import open_image
+
+# Longest side of the shared decode. Analyzers that need less downsample it further.
+ANALYSIS_MAX_SIZE = 256
+
+# Number of colors in the extracted palette and the longest side of the buffer it is computed on
+PALETTE_SIZE = 5
+PALETTE_SAMPLE_SIZE = 64
+# Maximum number of k-means refinement steps
+PALETTE_ITERATIONS = 12
+
+# pHash: side of the grayscale buffer the DCT is taken over, and of the low-frequency block kept
+PHASH_SIZE = 32
+PHASH_BLOCK = 8
+
+# Registered analyzers: name -> {"func": callable, "fields": tuple, "version": int}
+ANALYZERS = {}
+
+
+def register_analyzer(name, fields, version=1):
+    """
+    Decorator registering a pixel analyzer.
+
+    The decorated function receives the shared uint8 RGBA array (height x width x 4, longest
+    side at most ANALYSIS_MAX_SIZE) and returns a dict mapping manifest field names to
+    JSON-serializable values. The array must not be modified in place.
+
+    Args:
+        name: Analyzer name, as used with --analyzers
+        fields: Manifest fields the analyzer produces (set to None when it is disabled or fails)
+        version: Bump when the output changes, to invalidate cached results
+    """
+    def decorator(func):
+        ANALYZERS[name] = {"func": func, "fields": tuple(fields), "version": version}
+        return func
+    return decorator
+
+
+def decode_for_analysis(image_path, max_size=ANALYSIS_MAX_SIZE):
+    """
+    Decodes an image once at a bounded resolution.
+
+    Returns:
+        uint8 RGBA array of shape (height, width, 4)
+    """
+    import numpy as np
+
+    img = open_image(image_path)
+    try:
+        # thumbnail() first asks the decoder for a draft (JPEG DCT scaling) and then
+        # uses reduce() before resampling, so the full-size buffer is rarely resampled.
+        img.thumbnail((max_size, max_size), reducing_gap=2.0)
+        return np.asarray(img.convert("RGBA"))
+    finally:
+        img.close()
+
+
+def downsample(pixels, max_size):
+    """Downsamples a shared RGBA array so that its longest side is at most max_size."""
+    import numpy as np
+    from PIL import Image
+
+    h, w = pixels.shape[:2]
+    if max(w, h) <= max_size:
+        return pixels
+    img = Image.fromarray(pixels, "RGBA")
+    img.thumbnail((max_size, max_size))
+    return np.asarray(img)
+
+
+def parse_analyzer_names(value):
+    """
+    Parses a comma-separated --analyzers value.
+
+    Returns:
+        List of analyzer names; empty for "" or "none"
+    """
+    names = [name.strip() for name in value.split(",") if name.strip()]
+    if names == ["none"]:
+        return []
+    unknown = [name for name in names if name not in ANALYZERS]
+    if unknown:
+        raise ValueError(
+            f"Unknown analyzer(s): {', '.join(unknown)}. Available: {', '.join(sorted(ANALYZERS))}"
+        )
+    return names
+
+
+def analysis_cache_name(name):
+    """Name under which an analyzer's results are cached (changes with its version)."""
+    return f"{name}@{ANALYZERS[name]['version']}"
+
+
+def cached_analysis(fingerprint, cache, analyzer_names, refresh=False):
+    """
+    Looks up cached analyzer results for an image.
+
+    Returns:
+        Tuple of (dict of cached manifest fields, names of analyzers still to run)
+    """
+    results = {}
+    pending = []
+    for name in analyzer_names:
+        cached = None if refresh else cache.get(fingerprint, analysis_cache_name(name))
+        if cached is None:
+            pending.append(name)
+        else:
+            results.update(cached)
+    return results, pending
+
+
+def run_analyzers(image_path, analyzer_names):
+    """
+    Decodes an image once and runs analyzers on it. Failures are reported as warnings.
+
+    Returns:
+        Dict mapping the name of each analyzer that succeeded to its manifest fields
+    """
+    if not analyzer_names:
+        return {}
+    try:
+        pixels = decode_for_analysis(image_path)
+    except Exception as e:
+        print(f"Warning: Could not decode pixels for {image_path}: {e}")
+        return {}
+    pixels.flags.writeable = False  # Shared between analyzers
+
+    computed = {}
+    for name in analyzer_names:
+        try:
+            computed[name] = ANALYZERS[name]["func"](pixels)
+        except Exception as e:
+            print(f"Warning: Analyzer '{name}' failed for {image_path}: {e}")
+    return computed
+
+
+@register_analyzer("thumbhash", fields=("thumbhash",))
+def analyze_thumbhash(pixels):
+    """ThumbHash placeholder for blurred previews while the image loads."""
+    from thumbhash import MAX_THUMBHASH_SIZE, rgba_to_thumbhash, thumbhash_to_base64
+
+    thumbhash = rgba_to_thumbhash(downsample(pixels, MAX_THUMBHASH_SIZE))
+    return {"thumbhash": thumbhash_to_base64(thumbhash)}
+
+
+def kmeans_colors(colors, k, iterations=PALETTE_ITERATIONS):
+    """
+    Clusters colors with k-means, vectorized over all pixels and centers.
+
+    Centers are initialized at evenly spaced luminance quantiles, so results are
+    deterministic and cache-stable.
+
+    Args:
+        colors: float array of shape (n, 3)
+        k: Number of clusters
+
+    Returns:
+        Tuple of (centers, counts), sorted by descending cluster size, empty clusters dropped
+    """
+    import numpy as np
+
+    luminance = colors @ np.array([0.299, 0.587, 0.114])
+    order = np.argsort(luminance, kind="stable")
+    centers = colors[order[np.linspace(0, len(colors) - 1, k).astype(int)]]
+
+    for _ in range(iterations):
+        distances = ((colors[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2)
+        labels = distances.argmin(axis=1)
+        counts = np.bincount(labels, minlength=k)
+        sums = np.stack(
+            [np.bincount(labels, weights=colors[:, channel], minlength=k) for channel in range(3)],
+            axis=1,
+        )
+        updated = centers.copy()
+        filled = counts > 0
+        updated[filled] = sums[filled] / counts[filled, None]
+        converged = np.allclose(updated, centers, atol=0.5)
+        centers = updated
+        if converged:
+            break
+
+    labels = ((colors[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2).argmin(axis=1)
+    counts = np.bincount(labels, minlength=k)
+    order = np.argsort(-counts, kind="stable")
+    order = order[counts[order] > 0]
+    return centers[order], counts[order]
+
+
+def to_hex_color(rgb):
+    """Formats an RGB triple as a #rrggbb string."""
+    r, g, b = (min(255, max(0, int(channel + 0.5))) for channel in rgb)
+    return f"#{r:02x}{g:02x}{b:02x}"
+
+
+@register_analyzer("palette", fields=("dominantColor", "palette"))
+def analyze_palette(pixels):
+    """Dominant color and a small palette, ordered by the share of the image they cover."""
+    import numpy as np
+
+    sample = downsample(pixels, PALETTE_SAMPLE_SIZE).reshape(-1, 4)
+    opaque = sample[sample[:, 3] >= 128, :3]  # Ignore transparent areas
+    if not len(opaque):
+        return {"dominantColor": None, "palette": None}
+    centers, _ = kmeans_colors(opaque.astype(np.float64), min(PALETTE_SIZE, len(opaque)))
+    palette = [to_hex_color(center) for center in centers]
+    return {"dominantColor": palette[0], "palette": palette}
+
+
+@register_analyzer("phash", fields=("perceptualHash",))
+def analyze_phash(pixels):
+    """
+    64-bit DCT perceptual hash, robust to re-encoding, resizing and mild edits.
+
+    The image is reduced to a PHASH_SIZE x PHASH_SIZE grayscale buffer, and each bit of the
+    hash tells whether one of the 8x8 lowest-frequency DCT coefficients is above their median.
+    """
+    import numpy as np
+    from PIL import Image
+
+    gray = Image.fromarray(pixels, "RGBA").convert("L").resize(
+        (PHASH_SIZE, PHASH_SIZE), Image.Resampling.BOX
+    )
+    basis = np.cos(
+        np.pi / PHASH_SIZE * np.arange(PHASH_BLOCK)[:, None] * (np.arange(PHASH_SIZE) + 0.5)
+    )
+    coefficients = (basis @ np.asarray(gray, dtype=np.float64) @ basis.T).ravel()
+    bits = coefficients > np.median(coefficients)
+    value = int.from_bytes(np.packbits(bits).tobytes(), "big")
+    return {"perceptualHash": f"{value:016x}"}
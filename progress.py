@@ -0,0 +1,115 @@
+"""
+Progress reporting for generator runs.
+
+A line per file costs a synchronous write per photo and fills cron logs with lines
+nobody reads. ProgressReporter keeps counters instead. On a terminal it redraws a single
+status line (files/s, cache hits, ETA) at most every LIVE_INTERVAL seconds; otherwise
+(cron, pipes, log files) it prints a compact line at most every LOG_INTERVAL seconds and a
+summary at the end. With verbose=True every file read is logged, as before.
+
+Problems with a file (errors, quarantines, schema mismatches) are always printed
+individually, with the file's path.
+"""
+
+import sys
+import threading
+import time
+
+# Seconds between redraws of the status line on a terminal
+LIVE_INTERVAL = 0.2
+# Seconds between progress lines when the output is not a terminal
+LOG_INTERVAL = 60
+
+
+def format_duration(seconds):
+    """Formats a duration as 45s, 12m05s or 3h20m."""
+    seconds = int(seconds)
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+
+
+class ProgressReporter:
+    """Counts the files of a run and reports progress without a line per file."""
+
+    def __init__(self, name, verbose=False, live=None, expected=None, stream=None):
+        """
+        Args:
+            name: Collection name, shown in progress lines
+            verbose: Whether to log every file read
+            live: Whether to redraw a status line (default: if the output is a terminal)
+            expected: Estimated number of files, for the ETA, or None
+            stream: Output stream (default: sys.stdout)
+        """
+        self.name = name
+        self.verbose = verbose
+        self.stream = stream or sys.stdout
+        self.live = (not verbose and self.stream.isatty()) if live is None else live
+        self.expected = expected
+        self.done = 0
+        self.extracted = 0
+        self.problems = 0
+        self.started = time.monotonic()
+        self._next_update = self.started + (LIVE_INTERVAL if self.live else LOG_INTERVAL)
+        self._status_shown = False
+        self._lock = threading.Lock()
+
+    def reading(self, path):
+        """Reports that a file is about to be read (logged in verbose mode only)."""
+        if self.verbose:
+            self.message(f"Processing: {path}")
+
+    def file_done(self, extracted):
+        """Counts a finished file; extracted is False for files served from the cache."""
+        self.done += 1
+        self.extracted += extracted
+        now = time.monotonic()
+        if now >= self._next_update:
+            self._next_update = now + (LIVE_INTERVAL if self.live else LOG_INTERVAL)
+            self._show(self.status(now))
+
+    def problem(self, text):
+        """Prints a message about one file (an error or a warning), always."""
+        self.problems += 1
+        self.message(text)
+
+    def message(self, text):
+        """Prints a line, keeping the status line below it."""
+        with self._lock:
+            if self._status_shown:
+                self.stream.write("\r\x1b[K")
+                self._status_shown = False
+            self.stream.write(text + "\n")
+
+    def status(self, now=None):
+        """Returns the progress line: counts, rate and, if the total is known, the ETA."""
+        elapsed = (now or time.monotonic()) - self.started
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        line = f"{self.name}: {self.done} files ({self.extracted} read, {self.done - self.extracted} from cache), {rate:.0f} files/s"
+        if self.problems:
+            line += f", {self.problems} problems"
+        if self.expected and rate > 0 and self.done < self.expected:
+            line += f", ETA {format_duration((self.expected - self.done) / rate)}"
+        return line
+
+    def _show(self, line):
+        with self._lock:
+            if self.live:
+                self.stream.write("\r\x1b[K" + line)
+                self._status_shown = True
+            else:
+                self.stream.write(line + "\n")
+            self.stream.flush()
+
+    def finish(self):
+        """Clears the status line and prints the summary of the run."""
+        elapsed = time.monotonic() - self.started
+        with self._lock:
+            if self._status_shown:
+                self.stream.write("\r\x1b[K")
+                self._status_shown = False
+        if self.done:
+            rate = self.done / elapsed if elapsed > 0 else 0.0
+            self.message(f"{self.name}: {self.done} files in {elapsed:.1f} s ({rate:.0f} files/s, {self.extracted} read, {self.done - self.extracted} from cache)")
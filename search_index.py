@@ -0,0 +1,182 @@
+"""
+Prebuilt full-text search index, sharded by term prefix.
+
+Terms are the words of each photo's title, description, notes and tags, case- and
+diacritic-folded ("Crème" is "creme"). The index is a folder: index.json lists the
+photos (postings refer to them by their position in "docs") and the shards, and each
+shard file holds the sorted terms starting with one prefix and the photos containing
+them. A client folds the query the same way, loads the shard of each query word's prefix
+and binary-searches it, so prefix queries ("pari" for "paris") are a range of terms of
+one shard. Words shorter than the shard prefix match every shard starting with them.
+
+The index is updated in place: photos keep their position in "docs" between runs (removed
+photos leave a null until the list is compacted), so a changed photo only changes the
+shards of its own terms, and shards whose content did not change are not rewritten.
+Shard files are named by their content hash and never change. A client (or an HTTP
+cache) holding an older index.json keeps getting the shards that index refers to, with
+its own doc numbers, until they are deleted after the next index.json is in place.
+"""
+
+import hashlib
+import json
+import os
+import re
+import unicodedata
+from pathlib import Path
+
+SEARCH_INDEX_VERSION = 1
+# Record fields searched; tags are split into their path parts
+SEARCH_FIELDS = ("title", "description", "notes", "tags")
+# Characters of a term that select its shard
+SHARD_PREFIX_LENGTH = 2
+# Shorter words are not indexed
+MIN_TERM_LENGTH = 2
+# Removed photos are dropped from "docs" (renumbering the others) once they are this
+# share of it
+COMPACT_THRESHOLD = 0.25
+INDEX_FILE_NAME = "index.json"
+
+_WORD = re.compile(r"\w+")
+
+
+def fold(text):
+    """Lowercases text and strips diacritics ("Ça Crème" is "ca creme")."""
+    if text.isascii():
+        return text.lower()
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+
+
+def tokenize(text):
+    """Returns the folded words of text that are long enough to be indexed."""
+    return [word for word in _WORD.findall(fold(text)) if len(word) >= MIN_TERM_LENGTH]
+
+
+def record_terms(record, known=None):
+    """
+    Returns the set of terms of a record's searchable fields.
+
+    Args:
+        record: Manifest record
+        known: Optional dict of already tokenized texts, filled as texts are tokenized
+            (tags and titles repeat across photos)
+    """
+    terms = set()
+    for field in SEARCH_FIELDS:
+        value = record.get(field)
+        if not value:
+            continue
+        for text in value if isinstance(value, list) else [value]:
+            if known is None:
+                terms.update(tokenize(text))
+                continue
+            words = known.get(text)
+            if words is None:
+                words = known[text] = tokenize(text)
+            terms.update(words)
+    return terms
+
+
+def shard_key(term):
+    return term[:SHARD_PREFIX_LENGTH]
+
+
+def build_search_index(records, previous_docs=None):
+    """
+    Builds the search index of the records.
+
+    Args:
+        records: Manifest records
+        previous_docs: "docs" of the index being updated, or None to number the records
+            from scratch in manifest order
+
+    Returns:
+        Tuple of (docs, shards): docs is the list of slugs postings refer to (None for
+        removed photos), shards maps each shard key to a dict of {term: sorted doc numbers},
+        sorted by term
+    """
+    slugs = [record["slug"] for record in records]
+    docs = list(previous_docs or [])
+    current = set(slugs)
+    docs = [slug if slug in current else None for slug in docs]
+    if docs and docs.count(None) >= COMPACT_THRESHOLD * len(docs):
+        docs = []
+    numbers = {slug: number for number, slug in enumerate(docs) if slug is not None}
+    for slug in slugs:
+        if slug not in numbers:
+            numbers[slug] = len(docs)
+            docs.append(slug)
+    while docs and docs[-1] is None:
+        docs.pop()
+
+    postings = {}
+    known = {}
+    for record in records:
+        number = numbers[record["slug"]]
+        for term in record_terms(record, known):
+            postings.setdefault(term, []).append(number)
+
+    shards = {}
+    for term in sorted(postings):
+        shards.setdefault(shard_key(term), {})[term] = sorted(postings[term])
+    return docs, shards
+
+
+def _write_atomically(path, data):
+    temp_path = path.with_name(path.name + ".tmp")
+    temp_path.write_bytes(data)
+    os.replace(temp_path, path)
+
+
+def write_search_index(records, index_dir):
+    """
+    Updates the search index folder: writes the shards that changed under new names,
+    replaces index.json, then removes the shard files it no longer refers to.
+
+    Args:
+        records: Manifest records
+        index_dir: Folder of the index (created if needed)
+
+    Returns:
+        Tuple of (number of shards written, total number of shards)
+    """
+    index_dir = Path(index_dir)
+    index_dir.mkdir(parents=True, exist_ok=True)
+    try:
+        with open(index_dir / INDEX_FILE_NAME) as f:
+            previous = json.load(f)
+        if previous.get("version") != SEARCH_INDEX_VERSION:
+            previous = {}
+    except (OSError, ValueError):
+        previous = {}
+    previous_shards = previous.get("shards", {})
+
+    # Shards are compared by content, so renumbering after a compaction rewrites them all
+    docs, shards = build_search_index(records, previous.get("docs"))
+
+    shard_index = {}
+    written = 0
+    for key, terms in shards.items():
+        data = json.dumps(terms, ensure_ascii=False, separators=(",", ":")).encode()
+        digest = hashlib.sha256(data).hexdigest()[:16]
+        file_name = f"{key}.{digest}.json"
+        shard_index[key] = {"file": file_name, "terms": len(terms), "hash": digest}
+        if not (index_dir / file_name).exists():
+            _write_atomically(index_dir / file_name, data)
+            written += 1
+
+    index = {
+        "version": SEARCH_INDEX_VERSION,
+        "fields": list(SEARCH_FIELDS),
+        "prefixLength": SHARD_PREFIX_LENGTH,
+        "minTermLength": MIN_TERM_LENGTH,
+        "docs": docs,
+        "shards": shard_index,
+    }
+    _write_atomically(index_dir / INDEX_FILE_NAME, json.dumps(index, ensure_ascii=False, separators=(",", ":")).encode())
+    # Only now: until index.json was replaced, clients could still be reading these
+    referenced = {shard["file"] for shard in shard_index.values()}
+    for shard in previous_shards.values():
+        if shard["file"] not in referenced:
+            (index_dir / shard["file"]).unlink(missing_ok=True)
+    return written, len(shard_index)
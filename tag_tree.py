@@ -0,0 +1,60 @@
+"""
+Precomputed tree of hierarchical tags for tag browsing.
+
+Darktable and Lightroom write hierarchical keywords as paths such as
+"places|France|Paris". The tree has a node for every path and every ancestor of one
+("places", "places|France"), listing the photos tagged with the path or anything below
+it. Browsing "France" then loads one node and shows the Paris and Lyon photos, instead of
+splitting the tags of every manifest record client-side.
+"""
+
+TAG_SEPARATOR = "|"
+
+
+def tag_path(tag):
+    """Splits a tag into its path components, dropping empty ones ("a||b|" is "a|b")."""
+    return [part.strip() for part in tag.split(TAG_SEPARATOR) if part.strip()]
+
+
+def build_tag_tree(records):
+    """
+    Builds the tag tree of the records' tag paths, or their tags if they have no paths.
+
+    Args:
+        records: Manifest records, in manifest order (the first photo of a node is its cover)
+
+    Returns:
+        Dict with "tagged" (number of records with tags), "roots" (paths of the top-level
+        nodes) and "nodes" mapping each tag path to a node: its "name" (last component),
+        "parent" path (None for roots), child paths ("children"), the "count" of photos
+        tagged with it or a descendant, their "slugs" in manifest order, and a "cover"
+        slug. Flat tags are roots without children.
+    """
+    nodes = {}
+    tagged = 0
+    for record in records:
+        tags = record.get("tagPaths") or record.get("tags")
+        if not tags:
+            continue
+        tagged += 1
+        slug = record["slug"]
+        for tag in tags:
+            parent = None
+            path = ""
+            for name in tag_path(tag):
+                path = f"{path}{TAG_SEPARATOR}{name}" if path else name
+                node = nodes.get(path)
+                if node is None:
+                    node = nodes[path] = {"name": name, "parent": parent, "children": [], "count": 0, "cover": slug, "slugs": []}
+                    if parent is not None:
+                        nodes[parent]["children"].append(path)
+                # A photo tagged "places|France|Paris" and "places|France|Lyon" is listed once under France
+                if not node["slugs"] or node["slugs"][-1] != slug:
+                    node["slugs"].append(slug)
+                    node["count"] += 1
+                parent = path
+
+    for node in nodes.values():
+        node["children"].sort()
+    roots = sorted(path for path, node in nodes.items() if node["parent"] is None)
+    return {"tagged": tagged, "roots": roots, "nodes": dict(sorted(nodes.items()))}
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Test the collections config and concurrent generation of several collections
+"""
+
+import json
+import sys
+import tempfile
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent))
+
+from PIL import Image
+
+import generate_collections
+import generate_manifest
+from collection_config import load_config
+
+CONFIG = """
+web_root = "web"
+cache = "cache.json"
+
+[[collection]]
+name = "photos"
+type = "photo"
+root = "web/photos"
+output = "web/photo_manifest.json"
+layouts = "web/photo_layouts.json"
+
+[[collection]]
+name = "blog"
+type = "photo"
+web_root = "blog"
+root = "blog/photos"
+output = "blog/photo_manifest.json"
+excluded_tags = ["Private"]
+
+[[collection]]
+name = "images"
+type = "image"
+root = "web/images"
+output = "web/image_manifest.json"
+"""
+
+XMP = b"""<x:xmpmeta xmlns:x="adobe:ns:meta/"><rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#">
+<rdf:Description xmlns:dc="http://purl.org/dc/elements/1.1/">
+<dc:subject><rdf:Bag><rdf:li>private</rdf:li><rdf:li>harbour</rdf:li></rdf:Bag></dc:subject>
+</rdf:Description></rdf:RDF></x:xmpmeta>"""
+
+def write_config(tmp, text):
+    path = Path(tmp) / "collections.toml"
+    path.write_text(text)
+    return path
+
+def test_load_config():
+    """Test that paths are resolved against the config file and mistakes are reported"""
+    with tempfile.TemporaryDirectory() as tmp:
+        config = load_config(write_config(tmp, CONFIG))
+        photos, blog, images = config["collections"]
+        assert config["cache"] == Path(tmp) / "cache.json" and config["workers"] is None
+        assert photos["root"] == Path(tmp) / "web/photos" and photos["collection_path"] == Path("photos")
+        assert photos["geo_index"] is None and photos["layouts"] == Path(tmp) / "web/photo_layouts.json"
+        assert blog["collection_path"] == Path("photos") and blog["excluded_tags"] == {"private"}
+        assert images["type"] == "image" and "excluded_tags" not in images
+
+        for broken, message in (
+            (CONFIG.replace('type = "image"', 'type = "video"'), "type must be one of"),
+            (CONFIG.replace('root = "web/images"', 'root = "images"'), "is not under the web root"),
+            (CONFIG.replace('name = "blog"', 'name = "photos"'), "used twice"),
+            (CONFIG.replace('"web/image_manifest.json"', '"web/photo_manifest.json"'), "written by another collection"),
+            (CONFIG + 'excluded_tags = ["x"]\n', "only apply to photo collections"),
+            ("workers = 0\n", "workers must be a positive integer"),
+        ):
+            try:
+                load_config(write_config(tmp, broken))
+                assert False, f"Expected an error containing {message!r}"
+            except ValueError as e:
+                assert message in str(e), e
+
+    print("✓ Collections config")
+
+def test_collections_share_cache():
+    """Test that collections are generated together from one cache, each with its own settings"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        for site, name in (("web", "DSC_0001.jpg"), ("web", "DSC_0002.jpg"), ("blog", "IMG_0001.jpg")):
+            folder = tmp / site / "photos/2024/05/17"
+            folder.mkdir(parents=True, exist_ok=True)
+            Image.new("RGB", (60, 40)).save(folder / name, xmp=XMP)
+        (tmp / "web/images").mkdir()
+        Image.new("RGB", (32, 16)).save(tmp / "web/images/diagram.png")
+        config_path = write_config(tmp, CONFIG)
+
+        args = generate_manifest.build_arg_parser().parse_args(["--analyzers", "none", "--file-timeout", "0"])
+        args.config = str(config_path)
+        assert generate_collections.main(args) == 0
+        photos = json.loads((tmp / "web/photo_manifest.json").read_text())
+        blog = json.loads((tmp / "blog/photo_manifest.json").read_text())
+        images = json.loads((tmp / "web/image_manifest.json").read_text())
+        assert [record["filename"] for record in photos] == ["DSC_0002.jpg", "DSC_0001.jpg"]
+        assert photos[0]["tags"] == ["private", "harbour"] and blog[0]["tags"] == ["harbour"]
+        assert (images[0]["width"], images[0]["height"]) == (32, 16)
+        assert (tmp / "web/photo_layouts.json").exists() and not (tmp / "blog/photo_layouts.json").exists()
+
+        cache = json.loads((tmp / "cache.json").read_text())
+        assert len(cache["files"]) == 4  # Both sites and the images in one cache
+
+        # Nothing changed: a second run is served entirely from the shared cache
+        manifest_mtime = (tmp / "web/photo_manifest.json").stat().st_mtime_ns
+        assert generate_collections.main(args) == 0
+        assert (tmp / "web/photo_manifest.json").stat().st_mtime_ns == manifest_mtime
+
+    print("✓ Three collections generated concurrently from one cache")
+
+def test_same_paths_in_two_web_roots():
+    """Test that files with the same path relative to different web roots keep their own cache entries"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        for site, color in (("web", (200, 0, 0)), ("blog", (0, 0, 200))):
+            folder = tmp / site / "photos/2024/05/17"
+            folder.mkdir(parents=True)
+            Image.new("RGB", (60, 40), color).save(folder / "DSC_0001.jpg", xmp=XMP)
+        Image.new("RGB", (30, 20)).save(tmp / "blog/photos/2024/05/17/DSC_0002.jpg")
+        (tmp / "web/images").mkdir()
+        config_path = write_config(tmp, CONFIG)
+
+        args = generate_manifest.build_arg_parser().parse_args(["--analyzers", "none", "--file-timeout", "0"])
+        args.config = str(config_path)
+        assert generate_collections.main(args) == 0
+        cache = json.loads((tmp / "cache.json").read_text())
+        assert sorted(cache["files"]) == [
+            "blog:photos/2024/05/17/DSC_0001.jpg", "blog:photos/2024/05/17/DSC_0002.jpg",
+            "photos:photos/2024/05/17/DSC_0001.jpg",
+        ]
+
+        # Neither collection sees the other's file as a change of its own
+        mtimes = [(tmp / site / "photo_manifest.json").stat().st_mtime_ns for site in ("web", "blog")]
+        assert generate_collections.main(args) == 0
+        assert [(tmp / site / "photo_manifest.json").stat().st_mtime_ns for site in ("web", "blog")] == mtimes
+        assert json.loads((tmp / "cache.json").read_text())["files"] == cache["files"]
+
+    print("✓ Collections with overlapping relative paths share a cache")
+
+if __name__ == "__main__":
+    test_load_config()
+    test_collections_share_cache()
+    test_same_paths_in_two_web_roots()
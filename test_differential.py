@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Test the differential check of metadata extractors
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent))
+sys.path.append(str(Path(__file__).parent / "benchmarks"))
+
+from corpus import make_photo_corpus
+from differential import check, extract_by_stage, make_variants
+from generate_manifest import extract_photo_metadata
+
+def extract_without_lens(image_path):
+    """A candidate that loses the lens model, and gives up on files missing their last bytes."""
+    if ".truncated-16" in image_path.name:
+        raise ValueError("No EOI marker")
+    metadata = extract_photo_metadata(image_path)
+    if metadata.get("lensModel"):
+        metadata["lensModel"] = None
+    return metadata
+
+def extract_stages_with_wrong_date(image_path):
+    """A candidate whose EXIF-only extraction gets the date wrong, while exif+xmp gets it right."""
+    results = extract_by_stage(image_path)
+    for label, metadata in results:
+        if label == "stages exif" and metadata.get("dateTaken"):
+            metadata["dateTaken"] = "1999-12-31T23:59:59"
+    return results
+
+def test_differences_are_reported_per_field():
+    """Test that a candidate's wrong fields are reported and a faithful candidate passes"""
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = make_photo_corpus(Path(tmp) / "corpus", count=6, avif_share=0)
+        variants = make_variants(paths, Path(tmp) / "variants", count=2)
+        assert len(variants) == 14 and all(v.suffix == ".jpg" for v in variants)
+
+        results = check(paths + variants, ["split-stages", f"{__name__}:extract_without_lens"])
+        assert results["split-stages"] == {}
+        broken = results[f"{__name__}:extract_without_lens"]
+        assert set(map(str, paths)) <= set(broken)
+        for path, differences in broken.items():
+            if ".truncated-16" in path:
+                assert differences == [("<outcome>", "record", "WorkerError: ValueError: No EOI marker")]
+            else:
+                assert [(field, actual) for field, _, actual in differences] == [("lensModel", None)]
+
+        print(f"✓ {len(broken)} differing files reported")
+
+def test_stage_subsets_are_compared_on_their_own():
+    """Test that a wrong single-stage result is not masked by the other stage subsets"""
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = make_photo_corpus(Path(tmp) / "corpus", count=3, avif_share=0)
+        broken = check(paths, [f"{__name__}:extract_stages_with_wrong_date"])[f"{__name__}:extract_stages_with_wrong_date"]
+        assert set(broken) == set(map(str, paths))
+        for differences in broken.values():
+            assert [(field, actual) for field, _, actual in differences] == [("dateTaken (stages exif)", "1999-12-31T23:59:59")]
+
+    print("✓ Stage subsets are checked one by one")
+
+if __name__ == "__main__":
+    test_differences_are_reported_per_field()
+    test_stage_subsets_are_compared_on_their_own()
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Test the bulk metadata dump
+"""
+
+import json
+import sys
+import tempfile
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent))
+
+from PIL import Image
+
+from dump_metadata import dump_many, expand_paths
+
+XMP = b"""<x:xmpmeta xmlns:x="adobe:ns:meta/"><rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#">
+<rdf:Description xmlns:dc="http://purl.org/dc/elements/1.1/">
+<dc:subject><rdf:Bag><rdf:li>street</rdf:li></rdf:Bag></dc:subject>
+</rdf:Description></rdf:RDF></x:xmpmeta>"""
+
+def test_dump_folder():
+    """Test that every file of a folder gets one JSON line, in order, with broken files as errors"""
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = Path(tmp) / "2025" / "05"
+        folder.mkdir(parents=True)
+        for index in range(4):
+            exif = Image.Exif()
+            exif[0x0110] = f"GR {index}"  # Model
+            exif.get_ifd(0x8769)[0x829A] = (1, 250)  # ExposureTime
+            Image.new("RGB", (32, 24)).save(folder / f"GR{index}.jpg", exif=exif, xmp=XMP)
+        (folder / "GR9.jpg").write_bytes(b"\xff\xd8 truncated")
+        (folder / "notes.txt").write_text("not an image")
+
+        paths = expand_paths([tmp])
+        assert [Path(path).name for path in paths] == ["GR0.jpg", "GR1.jpg", "GR2.jpg", "GR3.jpg", "GR9.jpg"]
+        assert expand_paths([f"{tmp}/**/GR[12].jpg"]) == paths[1:3]
+
+        dumps = [json.loads(json.dumps(dump)) for dump in dump_many(paths, workers=2)]
+        assert [dump["path"] for dump in dumps] == paths
+        first = dumps[0]
+        assert first["format"] == "JPEG" and first["size"] == [32, 24]
+        assert first["exif"]["Model"] == "GR 0"
+        assert first["ifds"]["Exif"]["ExposureTime"] == [1, 250]
+        assert first["exifread"]["Image Model"] == "GR 0"
+        assert "<rdf:li>street</rdf:li>" in first["xmp"] and first["xmpParsed"]
+        assert "error" in dumps[-1] and "format" not in dumps[-1]
+
+        print(f"✓ Dumped {len(dumps)} files, one error")
+
+if __name__ == "__main__":
+    test_dump_folder()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Test perceptual hashing and multi-index near-duplicate detection
+"""
+
+import random
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent))
+
+import numpy as np
+from PIL import Image, ImageEnhance
+
+from duplicates import find_duplicate_clusters, find_near_duplicate_pairs
+from generate_manifest import mark_duplicates
+from pixel_analysis import analyze_phash
+
+def phash_of(img):
+    return int(analyze_phash(np.asarray(img.convert("RGBA")))["perceptualHash"], 16)
+
+def test_pairs_match_brute_force():
+    """Test that the multi-index search finds exactly the brute-force pairs"""
+    rng = random.Random(42)
+    hashes = [rng.getrandbits(64) for _ in range(1000)]
+    for i in range(0, 400, 2):  # Plant near-duplicates at distances 0..8
+        hashes[i + 1] = hashes[i]
+        for bit in rng.sample(range(64), (i // 2) % 9):
+            hashes[i + 1] ^= 1 << bit
+
+    for radius in (3, 6, 8):
+        first, second, distance = find_near_duplicate_pairs(hashes, radius)
+        expected = {
+            (i, j)
+            for i in range(len(hashes))
+            for j in range(i + 1, len(hashes))
+            if (hashes[i] ^ hashes[j]).bit_count() <= radius
+        }
+        assert set(zip(first.tolist(), second.tolist())) == expected
+        assert all(d <= radius for d in distance.tolist())
+
+    assert find_duplicate_clusters([None, 5, None, 7, (1 << 64) - 1]) == [[1, 3]]
+
+def test_phash_duplicates():
+    """Test that an edited re-export is flagged and an unrelated photo is not"""
+    rng = np.random.default_rng(7)
+    base = Image.fromarray(rng.integers(0, 256, (24, 32, 3), dtype=np.uint8)).resize((640, 480))
+    edited = ImageEnhance.Brightness(base.resize((500, 375))).enhance(1.15)
+    other = Image.fromarray(rng.integers(0, 256, (24, 32, 3), dtype=np.uint8)).resize((640, 480))
+
+    records = [
+        {"slug": slug, "relativePath": path, "perceptualHash": f"{phash_of(img):016x}", "duplicateOf": None}
+        for slug, path, img in [
+            ("photos-2025-06-01-edit", "photos/2025/06/01/edit.jpg", edited),
+            ("photos-2025-05-17-orig", "photos/2025/05/17/orig.jpg", base),
+            ("photos-2025-05-17-other", "photos/2025/05/17/other.jpg", other),
+        ]
+    ]
+    report = mark_duplicates(records)
+    assert records[0]["duplicateOf"] == "photos-2025-05-17-orig"
+    assert records[1]["duplicateOf"] is None
+    assert records[2]["duplicateOf"] is None
+    assert report[0]["canonical"] == "photos-2025-05-17-orig"
+
+    print(f"✓ Duplicate report: {report}")
+
+if __name__ == "__main__":
+    test_pairs_match_brute_force()
+    test_phash_duplicates()
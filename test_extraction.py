@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Test the extraction API: single records, batches, the cache and errors
+"""
+
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent))
+
+from PIL import Image
+
+from extraction import extract, extract_many
+from generate_manifest import default_photo_collection
+from manifest_cache import MetadataCache
+from photo_record import PhotoRecord
+
+class CountingExecutor(ThreadPoolExecutor):
+    submitted = 0
+
+    def submit(self, *args, **kwargs):
+        self.submitted += 1
+        return super().submit(*args, **kwargs)
+
+def make_collection(tmp, count):
+    root = Path(tmp) / "photos"
+    folder = root / "2025" / "05" / "17"
+    folder.mkdir(parents=True)
+    paths = []
+    for index in range(count):
+        exif = Image.Exif()
+        exif[0x0110] = "GR III"  # Model
+        exif.get_ifd(0x8769)[0x9003] = f"2025:05:17 10:00:{index:02d}"  # DateTimeOriginal
+        path = folder / f"GR{index:04d}.jpg"
+        Image.new("RGB", (40, 30), (index * 20, 80, 120)).save(path, exif=exif)
+        paths.append(path)
+    return {**default_photo_collection(), "root": root}, paths
+
+def test_extract():
+    """Test that one photo becomes a full manifest record"""
+    with tempfile.TemporaryDirectory() as tmp:
+        collection, paths = make_collection(tmp, 1)
+        record = extract(paths[0], collection, analyzers="thumbhash")
+        assert isinstance(record, PhotoRecord)
+        assert record.relativePath == "photos/2025/05/17/GR0000.jpg" and record.slug == "photos-2025-05-17-GR0000"
+        assert (record.year, record.month, record.day) == (2025, 5, 17)
+        assert record.dateTaken == "2025-05-17T10:00:00" and record.cameraModel == "GR III"
+        assert (record.width, record.height) == (40, 30) and record.thumbhash
+
+        try:
+            extract(Path(tmp) / "elsewhere.jpg", collection)
+            raise AssertionError("Files outside the collection have no manifest path")
+        except ValueError:
+            pass
+
+    print(f"✓ Extracted {record.slug}")
+
+def test_extract_many():
+    """Test input order, errors in place, and that cached files are not decoded again"""
+    with tempfile.TemporaryDirectory() as tmp:
+        collection, paths = make_collection(tmp, 6)
+        broken = paths[0].with_name("GR9999.jpg")
+        broken.write_bytes(b"not an image")
+        cache = MetadataCache.load(Path(tmp) / "cache.json")
+
+        with CountingExecutor(2) as executor:
+            results = list(extract_many(paths + [broken], collection, executor=executor, cache=cache, batch_size=3))
+        assert [path for path, _ in results] == paths + [broken]
+        assert [record.slug for _, record in results[:-1]] == [f"photos-2025-05-17-GR{i:04d}" for i in range(6)]
+        assert isinstance(results[-1][1], Exception) and executor.submitted == 7
+
+        with CountingExecutor(2) as executor:
+            again = list(extract_many(paths, collection, executor=executor, cache=cache))
+        assert executor.submitted == 0
+        assert [record.to_dict() for _, record in again] == [record.to_dict() for _, record in results[:-1]]
+        assert again[0][1].to_dict() == extract(paths[0], collection).to_dict()
+
+    print(f"✓ Extracted {len(results)} files in order; the second pass came from the cache")
+
+if __name__ == "__main__":
+    test_extract()
+    test_extract_many()
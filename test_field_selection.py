@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Test --fields parsing and stage-selective metadata extraction
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent))
+
+from PIL import Image
+
+from generate_manifest import EXTRACTION_STAGES, extract_photo_metadata, parse_field_names
+from manifest_validation import PHOTO_SCHEMA_FILE, RecordValidator
+
+XMP = b"""<x:xmpmeta xmlns:x="adobe:ns:meta/"><rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#">
+<rdf:Description xmlns:dc="http://purl.org/dc/elements/1.1/" xmlns:xmp="http://ns.adobe.com/xap/1.0/" xmp:notes="Shot from the bridge">
+<dc:subject><rdf:Bag><rdf:li>street</rdf:li><rdf:li>paris</rdf:li></rdf:Bag></dc:subject>
+</rdf:Description></rdf:RDF></x:xmpmeta>"""
+
+def test_parse_field_names():
+    """Test that fields are checked against the schema and required fields are added"""
+    schema = RecordValidator(PHOTO_SCHEMA_FILE).schema
+    assert parse_field_names("dateTaken, width", schema) == (
+        "relativePath", "filename", "slug", "width", "height", "dateTaken",
+    )
+    try:
+        parse_field_names("dateTaken,shutterCount", schema)
+        assert False, "Unknown fields must be rejected"
+    except ValueError as e:
+        assert "shutterCount" in str(e)
+
+    print("✓ Field names follow the schema")
+
+def test_stage_selective_extraction():
+    """Test that skipped stages leave their fields out instead of guessing them"""
+    with tempfile.TemporaryDirectory() as tmp:
+        image_path = Path(tmp) / "photo.jpg"
+        exif = Image.Exif()
+        exif[0x0110] = "GR III"  # Model
+        exif[0x0132] = "2025:05:17 10:30:00"  # DateTime
+        Image.new("RGB", (64, 48)).save(image_path, exif=exif, xmp=XMP)
+
+        full = extract_photo_metadata(image_path)
+        assert extract_photo_metadata(image_path, EXTRACTION_STAGES) == full
+        assert (full["width"], full["cameraModel"], full["tags"], full["notes"]) == (64, "GR III", ["street", "paris"], "Shot from the bridge")
+
+        assert extract_photo_metadata(image_path, ("dims",)) == {"width": 64, "height": 48}
+        exif_only = extract_photo_metadata(image_path, ("dims", "exif"))
+        assert exif_only["dateTaken"] == "2025-05-17T10:30:00" and exif_only["cameraModel"] == "GR III"
+        assert "tags" not in exif_only and "notes" not in exif_only  # Need XMP
+        xmp_only = extract_photo_metadata(image_path, ("xmp",))
+        assert xmp_only == {"notes": "Shot from the bridge", "tagPaths": None}  # Tags need the EXIF fallback too
+
+        print(f"✓ Stage-selective extraction: {sorted(exif_only)}")
+
+if __name__ == "__main__":
+    test_parse_field_names()
+    test_stage_selective_extraction()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Test GPS extraction and the geohash cluster index
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent))
+
+from PIL import Image
+from PIL.TiffImagePlugin import IFDRational
+
+from generate_manifest import get_exif_data
+from geo_index import build_geo_index, encode_geohashes
+
+def test_gps_extraction():
+    """Test that the GPS IFD is converted to signed decimal degrees"""
+    with tempfile.TemporaryDirectory() as tmp:
+        image_path = Path(tmp) / "gps.jpg"
+        exif = Image.Exif()
+        exif[0x8825] = {
+            1: "S", 2: (IFDRational(33), IFDRational(51), IFDRational(3540, 100)),
+            3: "W", 4: (70.0, 39.0, 0.0),
+            5: b"\x01", 6: IFDRational(125, 10),
+        }
+        Image.new("RGB", (32, 32)).save(image_path, exif=exif)
+
+        gps = get_exif_data(image_path)["ProcessedGPS"]
+        assert gps == {"latitude": -33.859833, "longitude": -70.65, "altitude": -12.5}
+
+        print(f"✓ GPS position: {gps}")
+
+def test_geohash_index():
+    """Test geohash encoding and per-precision clustering"""
+    assert encode_geohashes([57.64911], [10.40744], 11) == ["u4pruydqqvj"]
+    assert encode_geohashes([-25.38262], [-49.26561], 8) == ["6gkzwgjz"]
+
+    records = [
+        {"slug": "eiffel", "latitude": 48.858370, "longitude": 2.294481},
+        {"slug": "louvre", "latitude": 48.860611, "longitude": 2.337644},
+        {"slug": "no-gps", "latitude": None, "longitude": None},
+        {"slug": "lyon", "latitude": 45.764043, "longitude": 4.835659},
+    ]
+    index = build_geo_index(records, precisions=(2, 4, 6))
+    assert index["located"] == 3
+    assert [(c["geohash"], c["count"]) for c in index["levels"]["2"]] == [("u0", 3)]
+    paris = [c for c in index["levels"]["4"] if c["count"] == 2][0]
+    assert paris["cover"] == "eiffel"
+    assert paris["bounds"] == [48.85837, 2.294481, 48.860611, 2.337644]
+    assert sorted(slug for c in index["levels"]["6"] for slug in c["slugs"]) == ["eiffel", "louvre", "lyon"]
+
+    print(f"✓ Geo index levels: { {p: len(c) for p, c in index['levels'].items()} }")
+
+if __name__ == "__main__":
+    test_gps_extraction()
+    test_geohash_index()
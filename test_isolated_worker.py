@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Test the per-file watchdog and the quarantine of files that hang or crash it
+"""
+
+import os
+import signal
+import sys
+import tempfile
+import time
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent))
+
+from concurrent.futures import ThreadPoolExecutor
+
+from isolated_worker import IsolatedWorker, WorkerCrash, WorkerError, WorkerPool, WorkerTimeout
+from manifest_cache import MetadataCache
+
+def hang(seconds):
+    time.sleep(seconds)
+
+def crash():
+    os.kill(os.getpid(), signal.SIGKILL)  # Like a segfault in a decoder, without a core dump
+
+def fail():
+    raise ValueError("broken header")
+
+def test_worker_survives_hangs_and_crashes():
+    """Test that a hanging or crashing call is reported and the next call still works"""
+    with IsolatedWorker(timeout=1) as worker:
+        assert worker.call(pow, 2, 10) == 1024
+        for func, args, expected in ((hang, (30,), WorkerTimeout), (crash, (), WorkerCrash), (fail, (), WorkerError)):
+            started = time.monotonic()
+            try:
+                worker.call(func, *args)
+                assert False, f"{func.__name__} should raise {expected.__name__}"
+            except expected as e:
+                print(f"✓ {func.__name__}: {e}")
+            assert time.monotonic() - started < 5
+            assert worker.call(pow, 3, 3) == 27
+
+def test_pool_shared_between_threads():
+    """Test that threads share a fixed number of workers, and a crash only fails its own call"""
+    def call(n):
+        try:
+            return pool.call(crash) if n == 3 else pool.call(pow, n, 2)
+        except WorkerCrash:
+            return "crashed"
+
+    with WorkerPool(size=2, timeout=10) as pool, ThreadPoolExecutor(max_workers=4) as threads:
+        results = list(threads.map(call, range(8)))
+    assert results == [0, 1, 4, "crashed", 16, 25, 36, 49]
+
+    print("✓ 8 calls from 4 threads on 2 workers")
+
+def test_quarantine_until_file_changes():
+    """Test that a quarantined file is skipped until its size or mtime changes"""
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_path = Path(tmp) / "cache.json"
+        photo = Path(tmp) / "photo.avif"
+        photo.write_bytes(b"truncated")
+
+        cache = MetadataCache.load(cache_path)
+        assert cache.quarantined(photo, "photos/photo.avif") is None
+        cache.add_to_quarantine(photo, "photos/photo.avif", "Timed out after 120 s")
+        cache.save(prune=True)
+
+        reloaded = MetadataCache.load(cache_path)
+        assert reloaded.quarantined(photo, "photos/photo.avif") == "Timed out after 120 s"
+
+        photo.write_bytes(b"re-exported")
+        assert reloaded.quarantined(photo, "photos/photo.avif") is None
+        assert "photos/photo.avif" not in reloaded.quarantine
+
+        print("✓ Quarantine is lifted when the file changes")
+
+if __name__ == "__main__":
+    test_worker_survives_hangs_and_crashes()
+    test_pool_shared_between_threads()
+    test_quarantine_until_file_changes()
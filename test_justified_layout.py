@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Test the precomputed justified-grid layouts
+"""
+
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent))
+
+import numpy as np
+
+from justified_layout import build_layouts, justify_rows
+
+def test_rows_fill_the_container():
+    """Test that every row but the last is exactly as wide as the container"""
+    rng = np.random.default_rng(0)
+    ratios = rng.choice([0.667, 0.75, 1.0, 1.333, 1.5, 3.0], size=2000)
+    for width, height, gap in ((360, 200, 0), (1280, 240, 4), (1920, 300, 8)):
+        starts, heights = justify_rows(ratios, width, height, gap)
+        ends = np.append(starts[1:], len(ratios))
+        sums = np.concatenate(([0.0], np.cumsum(ratios)))
+        row_widths = (sums[ends] - sums[starts]) * heights + gap * (ends - starts - 1)
+        assert starts[0] == 0 and np.all(ends > starts)
+        assert np.allclose(row_widths[:-1], width)
+        assert heights[-1] <= height or np.isclose(row_widths[-1], width)
+        # Close to the target height (narrow containers fit only one or two photos per row)
+        assert abs(np.median(heights) / height - 1) < 0.25
+
+    print(f"✓ {len(starts)} rows, heights {heights.min():.0f}-{heights.max():.0f} px")
+
+def test_panoramas_and_last_row():
+    """Test that a panorama wider than the container gets its own row, and the last row is not stretched"""
+    starts, heights = justify_rows(np.array([1.5, 1.5, 5.0, 1.0]), 600, 200)
+    assert starts.tolist() == [0, 2, 3]
+    assert heights.tolist() == [200.0, 120.0, 200.0]
+
+    records = [{"width": 300, "height": 200}, {"width": 300, "height": 200}, {"width": None, "height": None}]
+    layouts = build_layouts(records, container_widths=(600,), row_heights=(200,))
+    assert layouts["photos"] == 3
+    assert layouts["layouts"][0]["rowLengths"] == [2, 1]
+    assert layouts["layouts"][0]["rowHeights"] == [200.0, 200.0]
+
+    print("✓ Panoramas and the last row")
+
+if __name__ == "__main__":
+    test_rows_fill_the_container()
+    test_panoramas_and_last_row()
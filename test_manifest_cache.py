@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Test checkpointing and resuming of the metadata cache
+"""
+
+import sys
+import tempfile
+import threading
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent))
+
+from manifest_cache import MetadataCache
+
+def test_checkpoint_and_resume():
+    """Test that checkpointed results survive a run that never saves the cache"""
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_path = Path(tmp) / "cache.json"
+        photo = Path(tmp) / "photo.jpg"
+        photo.write_bytes(b"not really a jpeg")
+
+        # Interrupted run: results are only checkpointed
+        cache = MetadataCache.load(cache_path)
+        fingerprint = cache.fingerprint(photo, "photos/photo.jpg")
+        cache.put(fingerprint, "metadata@1", [1, 2, 3])
+        cache.checkpoint()
+        cache.put(fingerprint, "phash@1", {"perceptualHash": "0" * 16})  # Lost: after the checkpoint
+        with open(cache.journal_path, "a") as f:
+            f.write('{"entry": "torn')  # Crash in the middle of a checkpoint
+        assert not cache_path.exists()
+
+        resumed = MetadataCache.load(cache_path)
+        assert resumed.resume() == 1
+        assert resumed.get(fingerprint, "metadata@1") == [1, 2, 3]
+        assert resumed.get(fingerprint, "phash@1") is None
+        assert resumed.changed_keys == {"photos/photo.jpg"}
+        assert resumed.fingerprint(photo, "photos/photo.jpg") == fingerprint
+
+        # A completed run folds the journal into the cache file
+        resumed.save(prune=True)
+        assert cache_path.exists() and not resumed.journal_path.exists()
+        assert MetadataCache.load(cache_path).get(fingerprint, "metadata@1") == [1, 2, 3]
+        assert MetadataCache.load(cache_path).resume() is None
+
+        print("✓ Checkpoint survives an interrupted run")
+
+def test_resume_after_torn_checkpoint():
+    """Test that checkpoints made after resuming from a torn journal survive the next resume"""
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_path = Path(tmp) / "cache.json"
+        photo = Path(tmp) / "photo.jpg"
+        photo.write_bytes(b"not really a jpeg")
+
+        cache = MetadataCache.load(cache_path)
+        fingerprint = cache.fingerprint(photo, "photos/photo.jpg")
+        cache.put(fingerprint, "metadata@1", [1, 2, 3])
+        cache.checkpoint()
+        with open(cache.journal_path, "a") as f:
+            f.write('{"entry": "torn')
+
+        # Resumed run, interrupted again after another checkpoint
+        resumed = MetadataCache.load(cache_path)
+        assert resumed.resume() == 1
+        resumed.put(fingerprint, "phash@1", {"perceptualHash": "0" * 16})
+        resumed.checkpoint()
+
+        again = MetadataCache.load(cache_path)
+        assert again.resume() == 1
+        assert again.get(fingerprint, "metadata@1") == [1, 2, 3]
+        assert again.get(fingerprint, "phash@1") == {"perceptualHash": "0" * 16}
+
+        print("✓ Torn lines are cut off on resume")
+
+def test_concurrent_checkpoints():
+    """Test that changes made by other threads during checkpoints all reach the journal"""
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = MetadataCache.load(Path(tmp) / "cache.json")
+
+        def put_many(thread):
+            for index in range(2000):
+                cache.put(f"{thread}-{index}", "metadata@1", index)
+
+        threads = [threading.Thread(target=put_many, args=(thread,)) for thread in range(4)]
+        for thread in threads:
+            thread.start()
+        while any(thread.is_alive() for thread in threads):
+            cache.checkpoint()
+        for thread in threads:
+            thread.join()
+        cache.checkpoint()
+
+        resumed = MetadataCache.load(Path(tmp) / "cache.json")
+        resumed.resume()
+        assert len(resumed.entries) == 8000
+
+        print("✓ No change is lost between checkpoints")
+
+if __name__ == "__main__":
+    test_checkpoint_and_resume()
+    test_resume_after_torn_checkpoint()
+    test_concurrent_checkpoints()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Test the in-memory manifest server: ETags, gzip, pagination, slug lookups and reloading
+"""
+
+import gzip
+import json
+import os
+import sys
+import tempfile
+import threading
+import urllib.error
+import urllib.request
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent))
+
+from generate_manifest import manifest_sort_key
+from manifest_server import ManifestSource, make_server
+
+def make_records(count, day):
+    # Some photos share a dateTaken; sorted newest first, like the generator writes them
+    records = [
+        {"relativePath": f"photos/2025/05/{day:02d}/DSC_{i:04d}.jpg", "slug": f"photos-2025-05-{day:02d}-DSC_{i:04d}",
+         "dateTaken": f"2025-05-{day:02d}T12:{i // 2:02d}:00"}
+        for i in range(count)
+    ]
+    return sorted(records, key=manifest_sort_key, reverse=True)
+
+def write_manifest(path, records):
+    temp_path = path.with_name(path.name + ".tmp")
+    temp_path.write_text(json.dumps(records, indent=2))
+    os.replace(temp_path, path)
+
+def get(url, **headers):
+    """Returns (status, headers, body) of a GET request."""
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, headers=headers)) as response:
+            return response.status, response.headers, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers, e.read()
+
+def test_manifest_server():
+    """Test conditional GETs, compression, cursor pagination, slug lookups and hot reload"""
+    with tempfile.TemporaryDirectory() as tmp:
+        manifest = Path(tmp) / "photo_manifest.json"
+        records = make_records(25, day=17)
+        write_manifest(manifest, records)
+        source = ManifestSource("photos", manifest)
+        server = make_server([source], port=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{server.server_port}"
+        try:
+            # The file, byte for byte, then 304 with its ETag
+            status, headers, body = get(f"{base}/photos")
+            assert status == 200 and body == manifest.read_bytes()
+            assert get(f"{base}/photo_manifest.json")[2] == body
+            assert get(f"{base}/photos", **{"If-None-Match": headers["ETag"]})[0] == 304
+            assert get(f"{base}/photos", **{"If-None-Match": "W/" + headers["ETag"]})[0] == 304
+
+            # Precompressed, with its own ETag
+            status, gzip_headers, gzip_body = get(f"{base}/photos", **{"Accept-Encoding": "gzip"})
+            assert gzip_headers["Content-Encoding"] == "gzip" and gzip.decompress(gzip_body) == body
+            assert gzip_headers["ETag"] != headers["ETag"]
+            for accept_encoding, gzipped in [
+                ("deflate, gzip;q=0.5", True), ("br, *", True), ("GZIP", True),
+                ("gzip;q=0", False), ("gzip; q=0.0, *", False), ("*;q=0", False), ("identity", False),
+            ]:
+                _, negotiated_headers, negotiated_body = get(f"{base}/photos", **{"Accept-Encoding": accept_encoding})
+                assert (negotiated_headers["Content-Encoding"] == "gzip") is gzipped, accept_encoding
+                assert negotiated_body == (gzip_body if gzipped else body)
+
+            # Pages of 10 cover every record once, in manifest order
+            paged, cursor = [], None
+            while True:
+                page = json.loads(get(f"{base}/photos?limit=10" + (f"&cursor={cursor}" if cursor else ""))[2])
+                paged += page["items"]
+                cursor = page["nextCursor"]
+                if cursor is None:
+                    break
+            assert paged == records and page["total"] == 25
+            assert get(f"{base}/photos?limit=10&cursor=garbage")[0] == 400
+
+            status, _, body = get(f"{base}/photos/{records[3]['slug']}")
+            assert status == 200 and json.loads(body) == records[3]
+            assert get(f"{base}/photos/no-such-slug")[0] == 404
+
+            # New photos appear after a replace; an old cursor still continues where it was
+            first_page = json.loads(get(f"{base}/photos?limit=5")[2])
+            write_manifest(manifest, make_records(5, day=18) + records)
+            assert source.refresh()
+            assert get(f"{base}/photos", **{"If-None-Match": headers["ETag"]})[0] == 200
+            next_page = json.loads(get(f"{base}/photos?limit=5&cursor={first_page['nextCursor']}")[2])
+            assert next_page["items"] == records[5:10] and next_page["total"] == 30
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    print("✓ ETags, gzip, pagination, slug lookups and reloading")
+
+def test_shared_file_names():
+    """Test that collections whose manifests share a file name keep their own routes"""
+    with tempfile.TemporaryDirectory() as tmp:
+        sources = []
+        # Two manifest.json files, and a file named like the first collection
+        for day, (name, file_name) in enumerate(
+            [("travel", "manifest.json"), ("family", "manifest.json"), ("archive", "travel")], start=17
+        ):
+            manifest = Path(tmp) / name / file_name
+            manifest.parent.mkdir()
+            write_manifest(manifest, make_records(3, day=day))
+            sources.append(ManifestSource(name, manifest))
+        server = make_server(sources, port=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{server.server_port}"
+        try:
+            for source in sources:
+                assert get(f"{base}/{source.name}")[2] == source.path.read_bytes()
+            assert get(f"{base}/manifest.json")[0] == 404
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    print("✓ Shared file names don't shadow other collections")
+
+if __name__ == "__main__":
+    test_manifest_server()
+    test_shared_file_names()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Test streaming manifest reads: filters, the seek index and partial manifest shards
+"""
+
+import json
+import sys
+import tempfile
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent))
+
+import manifest_stream
+from generate_manifest import manifest_sort_key
+from manifest_stream import iter_records, iter_shards, seek_index_path, write_manifest, write_seek_index
+
+def make_records(years):
+    records = [
+        {"relativePath": f"photos/{year}/{month:02d}/01/IMG_{i}.jpg", "slug": f"photos-{year}-{month:02d}-01-IMG_{i}",
+         "dateTaken": f"{year}-{month:02d}-01T10:{i:02d}:00", "title": "Crème brûlée" if i == 0 else None}
+        for year in years for month in range(1, 13) for i in range(5)
+    ]
+    records.append({"relativePath": "photos/undated.jpg", "slug": "photos-undated", "dateTaken": None, "title": None})
+    return sorted(records, key=manifest_sort_key, reverse=True)
+
+def write(path, records, stride=16):
+    with open(path, "w") as f:
+        entries = write_manifest(f, records, stride=stride)
+    write_seek_index(path, entries)
+
+def test_stream_and_filter():
+    """Test that streamed records match json.load, with date and slug filters and seeking"""
+    manifest_stream.READ_CHUNK_SIZE = 100  # Smaller than a record
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "photo_manifest.json"
+            records = make_records(range(2019, 2026))
+            write(path, records)
+            assert list(iter_records(path)) == json.loads(path.read_text()) == records
+
+            may = [r for r in records if r["dateTaken"] and "2021-05" <= r["dateTaken"][:7] <= "2021-08"]
+            assert list(iter_records(path, since="2021-05", until="2021-08")) == may
+            assert manifest_stream._seek_position(path, "2021-08") is not None
+            assert list(iter_records(path, until="2019")) == [r for r in records if r["dateTaken"] and r["dateTaken"] < "2020"]
+            assert [r["slug"] for r in iter_records(path, slug_prefix="photos-2020-02")] == [
+                r["slug"] for r in records if r["slug"].startswith("photos-2020-02")
+            ]
+
+            # A stale seek index (same size, other records) is detected and ignored
+            index = json.loads(seek_index_path(path).read_text())
+            index["entries"] = [[date, "photos-elsewhere", position] for date, _, position in index["entries"]]
+            seek_index_path(path).write_text(json.dumps(index))
+            assert list(iter_records(path, since="2021-05", until="2021-08")) == may
+
+            path.write_text('[{"slug": "a"}, {"slug": "b"')
+            try:
+                list(iter_records(path))
+                raise AssertionError("A truncated manifest must not be read as complete")
+            except ValueError:
+                pass
+    finally:
+        manifest_stream.READ_CHUNK_SIZE = 1 << 16
+
+    print(f"✓ Streamed {len(records)} records; {len(may)} in the date range")
+
+def test_shards():
+    """Test that partial manifests merge in manifest order and out-of-range years are skipped"""
+    with tempfile.TemporaryDirectory() as tmp:
+        early = make_records([2019, 2020])
+        late = [r for r in make_records([2021, 2022]) if r["dateTaken"]]
+        write(Path(tmp) / "photo_manifest.years-2019-2020.json", early)
+        write(Path(tmp) / "photo_manifest.years-2021-2022.json", late)
+        shards = sorted(Path(tmp).glob("photo_manifest.years-*.json")) + [Path(tmp) / "photo_manifest.years-2010-2011.json"]
+
+        merged = list(iter_shards(shards[:2]))
+        assert merged == sorted(early + late, key=manifest_sort_key, reverse=True)
+        # The 2010-2011 shard doesn't exist: it must not be opened for this range
+        assert list(iter_shards(shards, since="2020-11", until="2021-02")) == [
+            r for r in merged if r["dateTaken"] and "2020-11" <= r["dateTaken"][:7] <= "2021-02"
+        ]
+
+    print(f"✓ Merged {len(merged)} records from 2 shards")
+
+if __name__ == "__main__":
+    test_stream_and_filter()
+    test_shards()
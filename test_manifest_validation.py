@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Test per-record and batch schema validation of manifests
+"""
+
+import contextlib
+import io
+import json
+import sys
+import tempfile
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent))
+
+from generate_manifest import write_photo_outputs
+from manifest_validation import IMAGE_SCHEMA_FILE, PHOTO_SCHEMA_FILE, RecordValidator, validate_manifest
+from photo_record import METADATA_FIELDS, PhotoRecord, metadata_row
+
+def make_image_record(name="diagram"):
+    return {
+        "relativePath": f"images/{name}.png", "filename": f"{name}.png",
+        "width": 640, "height": 480, "slug": f"images-{name}",
+        "fileSize": 1234, "lastModified": "2025-05-17T10:00:00",
+    }
+
+def test_record_validation():
+    """Test that a single record is checked against the schema's item definition"""
+    validator = RecordValidator(IMAGE_SCHEMA_FILE)
+    assert validator.errors(make_image_record()) == []
+
+    record = make_image_record()
+    record["width"] = 0
+    del record["slug"]
+    errors = validator.errors(record)
+    assert len(errors) == 2
+    assert any(error.startswith("width:") for error in errors)
+    assert any("'slug' is a required property" in error for error in errors)
+
+    photo_errors = RecordValidator(PHOTO_SCHEMA_FILE).errors({"relativePath": "elsewhere/x.jpg"})
+    assert any(error.startswith("relativePath:") for error in photo_errors)
+
+    print(f"✓ Record errors: {errors}")
+
+def test_batch_validation_reports_every_error():
+    """Test that batch mode keeps going after the first error"""
+    manifest = [make_image_record("a"), make_image_record("b"), make_image_record("c")]
+    manifest[0]["height"] = "tall"
+    manifest[2]["fileSize"] = -1.5
+    errors = validate_manifest(manifest, IMAGE_SCHEMA_FILE)
+    assert [error.split(":")[0] for error in errors] == ["0.height", "2.fileSize"]
+    assert validate_manifest(manifest[1:2], IMAGE_SCHEMA_FILE) == []
+    assert validate_manifest({"not": "a list"}, IMAGE_SCHEMA_FILE)[0].startswith("<root>:")
+
+    print(f"✓ Batch errors: {errors}")
+
+def test_duplicate_marks_are_validated():
+    """Test that duplicateOf, set after the records were validated, is validated too"""
+    records = []
+    for name in ("a", "b"):
+        metadata = dict.fromkeys(METADATA_FIELDS)
+        metadata.update(width=600, height=400, dateTaken="2025-05-17T10:00:00")
+        path_values = (f"photos/2025/05/17/{name}.jpg", f"{name}.jpg", 2025, 5, 17, f"photos-2025-05-17-{name}")
+        records.append(PhotoRecord.from_row(path_values, metadata_row(metadata), {"perceptualHash": "b3a9dcf647c2082d"}))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # A schema that only accepts short slugs in duplicateOf
+        schema = json.loads(Path(PHOTO_SCHEMA_FILE).read_text())
+        schema["items"]["properties"]["duplicateOf"]["maxLength"] = 8
+        schema_path = Path(tmp) / "schema.json"
+        schema_path.write_text(json.dumps(schema))
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            write_photo_outputs(records, Path(tmp) / "manifest.json", duplicate_radius=4, record_validator=RecordValidator(schema_path))
+
+    assert records[1]["duplicateOf"] == "photos-2025-05-17-a"
+    warnings = [line for line in out.getvalue().splitlines() if line.startswith("Warning:")]
+    assert warnings == ["Warning: photos/2025/05/17/b.jpg does not match the schema:"]
+    assert RecordValidator(PHOTO_SCHEMA_FILE).errors(records[1].to_dict()) == []
+
+    print("✓ Duplicate marks are validated")
+
+if __name__ == "__main__":
+    test_record_validation()
+    test_batch_validation_reports_every_error()
+    test_duplicate_marks_are_validated()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Test the memory-mapped metadata reader against Pillow
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent))
+sys.path.append(str(Path(__file__).parent / "benchmarks"))
+
+import mapped_image
+from corpus import make_photo_corpus
+from generate_manifest import extract_photo_metadata, get_exif_data
+from mapped_image import open_mapped
+
+def test_same_metadata():
+    """Test that both readers give the same records for JPEG and AVIF photos"""
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = make_photo_corpus(Path(tmp) / "corpus", count=8, avif_share=0.5)
+        formats = set()
+        for path in paths:
+            assert extract_photo_metadata(path, reader="mmap") == extract_photo_metadata(path), path
+            image = open_mapped(path)
+            try:
+                formats.add(image.format)
+                assert isinstance(image.info["exif"], memoryview) and isinstance(image.info["xmp"], memoryview)
+            finally:
+                image.close()
+        assert formats == {"JPEG", "AVIF"}
+
+    print(f"✓ {len(paths)} photos read the same through the mapping")
+
+def test_fallback_to_pillow():
+    """Test that files the mapped reader doesn't handle are read through Pillow"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = make_photo_corpus(Path(tmp) / "corpus", count=1, avif_share=0)[0]
+        truncated = path.with_name("truncated.jpg")
+        truncated.write_bytes(path.read_bytes()[:20])
+        try:
+            open_mapped(truncated)
+            raise AssertionError("A truncated header is not mapped")
+        except ValueError:
+            pass
+
+        png = path.with_suffix(".png")
+        png.write_bytes(b"")
+        try:
+            open_mapped(png)
+            raise AssertionError("Only JPEG and AVIF files are mapped")
+        except ValueError:
+            pass
+
+        # The same record either way: the mapped reader hands the photo to Pillow
+        renamed = path.with_suffix(".jpeg.bak")
+        path.rename(renamed)
+        assert get_exif_data(renamed, reader="mmap") == get_exif_data(renamed)
+
+    print("✓ Unsupported files fall back to Pillow")
+
+def test_reader_failures_fall_back_to_pillow():
+    """Test that a failing or disabled mapped reader never yields a photo without metadata"""
+    def broken_open_mapped(image_path):
+        raise AttributeError("'NoneType' object has no attribute 'get'")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = make_photo_corpus(Path(tmp) / "corpus", count=1, avif_share=0)[0]
+        expected = extract_photo_metadata(path)
+        assert expected["dateTaken"] and expected["tags"]
+
+        original = mapped_image.open_mapped
+        mapped_image.open_mapped = broken_open_mapped
+        try:
+            assert extract_photo_metadata(path, reader="mmap") == expected
+        finally:
+            mapped_image.open_mapped = original
+
+        # Without Pillow's JPEG marker tables, nothing is mapped
+        mapped_image.UNAVAILABLE = "Pillow's JPEG marker tables are missing (test)"
+        try:
+            try:
+                open_mapped(path)
+                raise AssertionError("The reader is disabled")
+            except ValueError as e:
+                assert "marker tables" in str(e)
+            assert extract_photo_metadata(path, reader="mmap") == expected
+        finally:
+            mapped_image.UNAVAILABLE = None
+
+    print("✓ Reader failures fall back to Pillow")
+
+def test_close_releases_views():
+    """Test that closing the image releases the EXIF and XMP views and the mapping"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = make_photo_corpus(Path(tmp) / "corpus", count=1, avif_share=0)[0]
+        image = open_mapped(path)
+        exif, xmp = image.info["exif"], image.info["xmp"]
+        assert image.getxmp()
+        image.close()
+        assert image._mapping.closed
+        for view in (exif, xmp):
+            try:
+                bytes(view)
+                raise AssertionError("Views must not outlive the mapping")
+            except ValueError:
+                pass
+
+    print("✓ Views are released on close")
+
+if __name__ == "__main__":
+    test_same_metadata()
+    test_fallback_to_pillow()
+    test_reader_failures_fall_back_to_pillow()
+    test_close_releases_views()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Test partition selectors and the merge of partial manifests
+"""
+
+import json
+import sys
+import tempfile
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent))
+
+from generate_manifest import manifest_sort_key, parse_partition, path_bucket
+from merge_manifests import find_slug_collisions, read_partial
+from photo_record import RECORD_FIELDS
+
+def make_record(path, date):
+    record = dict.fromkeys(RECORD_FIELDS)
+    record.update(relativePath=path, filename=path.rsplit("/", 1)[-1], dateTaken=date,
+                  slug=path.rsplit(".", 1)[0].replace("/", "-"))
+    return record
+
+def test_parse_partition():
+    """Test the years and bucket selectors"""
+    assert parse_partition("years:2019-2021") == {"name": "years-2019-2021", "years": (2019, 2021)}
+    assert parse_partition("years:2020")["years"] == (2020, 2020)
+    assert parse_partition("bucket:2/8") == {"name": "bucket-2-of-8", "bucket": (2, 8)}
+    for invalid in ("years:2021-2019", "bucket:0/4", "bucket:5/4", "bucket:x", "decade:1990"):
+        try:
+            parse_partition(invalid)
+            assert False, f"{invalid} should be rejected"
+        except ValueError:
+            pass
+
+    paths = [f"photos/2025/05/{day:02d}/DSC_{i:04d}.jpg" for day in range(1, 29) for i in range(20)]
+    buckets = [path_bucket(path, 4) for path in paths]
+    assert set(buckets) == {1, 2, 3, 4}
+    assert all(buckets.count(k) > len(paths) // 8 for k in range(1, 5))  # Roughly balanced
+    assert path_bucket(paths[0], 4) == path_bucket(paths[0], 4)
+
+    print(f"✓ Bucket sizes: {[buckets.count(k) for k in range(1, 5)]}")
+
+def test_read_partial_and_collisions():
+    """Test that unsorted partials are rejected and slug collisions are found"""
+    newer = make_record("photos/2025/05/17/a.jpg", "2025-05-17T10:00:00")
+    older = make_record("photos/2024/01/02/b.jpg", "2024-01-02T08:00:00")
+    undated = make_record("photos/2023/03/04/c.jpg", None)
+    with tempfile.TemporaryDirectory() as tmp:
+        sorted_path = Path(tmp) / "sorted.json"
+        sorted_path.write_text(json.dumps([newer, older, undated]))
+        records = read_partial(sorted_path)
+        assert [record["slug"] for record in records] == [newer["slug"], older["slug"], undated["slug"]]
+        assert sorted(records, key=manifest_sort_key, reverse=True) == records
+
+        unsorted_path = Path(tmp) / "unsorted.json"
+        unsorted_path.write_text(json.dumps([older, newer]))
+        try:
+            read_partial(unsorted_path)
+            assert False, "Unsorted partials must be rejected"
+        except ValueError:
+            pass
+
+    lookalike = make_record("photos/2025-05/17/a.jpg", "2025-05-17T11:00:00")  # Same slug as `newer`
+    collisions = find_slug_collisions([newer, older, lookalike])
+    assert collisions == {newer["slug"]: [newer["relativePath"], lookalike["relativePath"]]}
+
+    print(f"✓ Slug collisions: {collisions}")
+
+if __name__ == "__main__":
+    test_parse_partition()
+    test_read_partial_and_collisions()
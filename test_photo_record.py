@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Test the compact photo record representation
+"""
+
+import json
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent))
+
+from photo_record import METADATA_FIELDS, RECORD_FIELDS, PhotoRecord, ValuePool, metadata_row, record_to_json
+
+def make_metadata(index):
+    metadata = dict.fromkeys(METADATA_FIELDS)
+    metadata.update(
+        width=6000, height=4000, dateTaken=f"2025-05-17T10:{index:02d}:00",
+        tags=["street", "paris"], cameraModel="RICOH GR III", apertureValue=2.8,
+        isoSpeedRatings=100, flash=False,
+    )
+    return metadata
+
+def test_record_serializes_like_a_dict():
+    """Test that a record dumps to the same JSON as the equivalent dict"""
+    path_values = ("photos/2025/05/17/a.avif", "a.avif", 2025, 5, 17, "photos-2025-05-17-a")
+    metadata = make_metadata(1)
+    analysis = {"thumbhash": "1QcSHQRnh493V4dIh4eXh1h4kJUI", "perceptualHash": "b3a9dcf647c2082d"}
+    record = PhotoRecord.from_row(path_values, metadata_row(metadata), analysis)
+
+    expected = {
+        **dict(zip(["relativePath", "filename", "year", "month", "day", "slug"], path_values)),
+        **metadata,
+        "thumbhash": analysis["thumbhash"], "dominantColor": None, "palette": None,
+        "perceptualHash": analysis["perceptualHash"], "duplicateOf": None,
+    }
+    assert list(record.to_dict()) == list(RECORD_FIELDS)
+    assert json.dumps([record], indent=2, default=record_to_json) == json.dumps([expected], indent=2)
+    assert PhotoRecord(**expected).to_dict() == expected
+
+    record["duplicateOf"] = "photos-2025-05-16-a"
+    assert record.get("duplicateOf") == record.duplicateOf == "photos-2025-05-16-a"
+    assert record.get("missing", "default") == "default"
+    try:
+        record["missing"] = 1
+        assert False, "Unknown fields must be rejected"
+    except KeyError:
+        pass
+
+    print(f"✓ Record fields: {len(RECORD_FIELDS)}")
+
+def test_value_pool_shares_repeated_values():
+    """Test that repeated metadata values end up as one shared instance"""
+    pool = ValuePool()
+    rows = [pool.share_row(metadata_row(json.loads(json.dumps(make_metadata(i))))) for i in range(3)]
+    camera = METADATA_FIELDS.index("cameraModel")
+    tags = METADATA_FIELDS.index("tags")
+    date = METADATA_FIELDS.index("dateTaken")
+    assert rows[0][camera] is rows[2][camera]
+    assert rows[0][tags] is rows[1][tags]
+    assert rows[0][date] is not rows[1][date]  # Not a shared field
+
+    # Equal values of different types must not be merged
+    assert pool.share(1.0) is not pool.share(1)
+    assert type(pool.share(1)) is int and pool.share(True) is True
+
+    print("✓ Repeated values are shared")
+
+if __name__ == "__main__":
+    test_record_serializes_like_a_dict()
+    test_value_pool_shares_repeated_values()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Test the staged pipeline: every item arrives, stages run concurrently, queues stay bounded
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent))
+
+from pipeline import Stage, run_pipeline
+
+def test_items_flow_through_stages():
+    """Test that items pass every stage once, skip stages that don't apply, and dropped items stop"""
+    results = []
+    stages = [
+        Stage("double", lambda n: n * 2, workers=3),
+        Stage("odd", lambda n: None if n % 4 == 0 else n, workers=2, when=lambda n: n > 10),
+        Stage("collect", results.append),
+    ]
+    report = run_pipeline(iter(range(100)), stages, queue_size=4)
+    assert sorted(results) == [0, 2, 4, 6, 8, 10] + [n for n in range(12, 200, 2) if n % 4]
+    assert [stage.items for stage in stages] == [100, 94, len(results)]
+    assert not report.stopped and len(report.lines()) == 5
+
+    print("✓ Items flow through the stages")
+
+def test_slow_stage_fills_its_queue():
+    """Test that a slow stage runs its workers concurrently and backs up the queue in front of it"""
+    running, peak = 0, 0
+    lock = threading.Lock()
+
+    def slow(item):
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.02)
+        with lock:
+            running -= 1
+        return item
+
+    stages = [Stage("read", lambda item: item, workers=2), Stage("slow", slow, workers=4), Stage("write", lambda item: None)]
+    report = run_pipeline(iter(range(80)), stages, queue_size=8)
+    assert peak == 4
+    assert stages[1].depth_max == 8 and stages[2].depth_max <= 8
+    assert stages[1].busy > stages[0].busy
+
+    # Stopping ends the scan; items already read are finished
+    seen = []
+    report = run_pipeline(iter(range(10_000)), [Stage("collect", seen.append)], stop=lambda: len(seen) >= 50)
+    assert report.stopped and 50 <= len(seen) < 10_000
+
+    print(f"✓ Slow stage: {peak} concurrent workers, queue depth up to {stages[1].depth_max}")
+
+if __name__ == "__main__":
+    test_items_flow_through_stages()
+    test_slow_stage_fills_its_queue()
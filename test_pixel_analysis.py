@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Test the cached single-decode pixel analysis stage and its built-in analyzers
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent))
+
+import numpy as np
+from PIL import Image
+
+from manifest_cache import MetadataCache
+from pixel_analysis import ANALYZERS, analysis_cache_name, analyze_palette, cached_analysis, decode_for_analysis, register_analyzer, run_analyzers
+from thumbhash import rgba_to_thumbhash
+
+def test_thumbhash_encoding():
+    """Test hash layout for opaque, transparent and oversized inputs"""
+    gradient = np.zeros((60, 100, 4), dtype=np.uint8)
+    gradient[..., 0] = np.linspace(0, 255, 100, dtype=np.uint8)
+    gradient[..., 3] = 255
+    opaque = rgba_to_thumbhash(gradient)
+    # 5 header bytes, then 4-bit AC terms: 18 from the 7x4 luminance triangle + 2 x 5 chroma
+    assert len(opaque) == 5 + (18 + 5 + 5) // 2
+    assert opaque[4] >> 7 == 1  # Landscape flag
+
+    transparent = gradient.copy()
+    transparent[:, :50, 3] = 0
+    assert rgba_to_thumbhash(transparent)[2] >> 7 == 1  # Alpha flag
+
+    red = np.full((10, 10, 4), (255, 0, 0, 255), dtype=np.uint8)
+    blue = np.full((10, 10, 4), (0, 0, 255, 255), dtype=np.uint8)
+    assert rgba_to_thumbhash(red) != rgba_to_thumbhash(blue)
+
+    try:
+        rgba_to_thumbhash(np.zeros((101, 10, 4), dtype=np.uint8))
+        assert False, "Expected ValueError for images larger than 100x100"
+    except ValueError:
+        pass
+
+def analyze(image_path, fingerprint, cache, analyzer_names):
+    """Runs the analyzers whose results are not cached, and caches them, like the generator's look_up, extract and assemble steps."""
+    fields, pending = cached_analysis(fingerprint, cache, analyzer_names)
+    for name, results in run_analyzers(image_path, pending).items():
+        cache.put(fingerprint, analysis_cache_name(name), results)
+        fields.update(results)
+    return fields, pending
+
+def test_analysis_decodes_once_and_caches():
+    """Test that analyzers share one decode and unchanged content is never decoded again"""
+    calls = []
+
+    @register_analyzer("test-shape", fields=("testShape",))
+    def analyze_shape(pixels):
+        calls.append(pixels.shape)
+        return {"testShape": list(pixels.shape)}
+
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            image_path = Path(tmp) / "photo.jpg"
+            Image.new("RGB", (1200, 800), (40, 120, 200)).save(image_path)
+            analyzers = ["thumbhash", "test-shape"]
+
+            cache = MetadataCache.load(Path(tmp) / "cache.json")
+            fingerprint = cache.fingerprint(image_path, "photo.jpg")
+            fields, pending = analyze(image_path, fingerprint, cache, analyzers)
+            assert pending == analyzers
+            assert fields["testShape"] == list(decode_for_analysis(image_path).shape)
+            assert fields["thumbhash"]
+            cache.save(prune=True)
+
+            reloaded = MetadataCache.load(Path(tmp) / "cache.json")
+            assert reloaded.fingerprint(image_path, "photo.jpg") == fingerprint
+            assert analyze(image_path, fingerprint, reloaded, analyzers) == (fields, [])
+            assert len(calls) == 1
+
+            print(f"✓ Analysis fields {fields} cached after a single decode")
+    finally:
+        del ANALYZERS["test-shape"]
+
+def test_palette_extraction():
+    """Test that the dominant color is the one covering most of the image"""
+    pixels = np.zeros((90, 120, 4), dtype=np.uint8)
+    pixels[...] = (20, 60, 160, 255)  # Blue sky covering two thirds
+    pixels[60:] = (200, 180, 40, 255)  # Yellow field
+    pixels[:10, :10] = (255, 0, 0, 0)  # Transparent corner must be ignored
+    fields = analyze_palette(pixels)
+    assert fields["dominantColor"] == "#143ca0"
+    # Resampling blends the boundary row into the field, so allow a small shift
+    field_color = [int(fields["palette"][1][i:i + 2], 16) for i in (1, 3, 5)]
+    assert all(abs(a - b) <= 4 for a, b in zip(field_color, (200, 180, 40)))
+    assert all(color != "#ff0000" for color in fields["palette"])
+
+    transparent = np.zeros((10, 10, 4), dtype=np.uint8)
+    assert analyze_palette(transparent) == {"dominantColor": None, "palette": None}
+
+    print(f"✓ Palette {fields['palette']}")
+
+if __name__ == "__main__":
+    test_thumbhash_encoding()
+    test_analysis_decodes_once_and_caches()
+    test_palette_extraction()
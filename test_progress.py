@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Test progress reporting: summaries, verbose logging, problems and the status line
+"""
+
+import io
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent))
+
+import progress
+from progress import ProgressReporter, format_duration
+
+def test_summary():
+    """Test that a run off a terminal prints no per-file lines, only problems and a summary"""
+    out = io.StringIO()
+    reporter = ProgressReporter("photos", stream=out)
+    assert not reporter.live
+    for index in range(10):
+        reporter.reading(f"photos/IMG_{index}.jpg")
+        reporter.file_done(extracted=index < 3)
+    reporter.problem("Error processing photos/broken.jpg: truncated file")
+    reporter.finish()
+
+    lines = out.getvalue().splitlines()
+    assert lines[0] == "Error processing photos/broken.jpg: truncated file"
+    assert len(lines) == 2 and lines[1].startswith("photos: 10 files in ")
+    assert lines[1].endswith("3 read, 7 from cache)")
+    print(f"✓ {lines[1]}")
+
+def test_verbose():
+    """Test that --verbose logs every file read"""
+    out = io.StringIO()
+    reporter = ProgressReporter("photos", verbose=True, stream=out)
+    reporter.reading("photos/IMG_1.jpg")
+    reporter.file_done(extracted=True)
+    assert out.getvalue().splitlines()[0] == "Processing: photos/IMG_1.jpg"
+    print("✓ Verbose mode logs each file")
+
+def test_live():
+    """Test that the status line is redrawn in place and cleared before other output"""
+    out = io.StringIO()
+    interval = progress.LIVE_INTERVAL
+    progress.LIVE_INTERVAL = 0
+    try:
+        reporter = ProgressReporter("photos", live=True, expected=4, stream=out)
+        reporter.file_done(extracted=False)
+        reporter.file_done(extracted=False)
+        assert out.getvalue().startswith("\r\x1b[Kphotos: 1 files (0 read, 1 from cache)")
+        assert "ETA" in out.getvalue() and "\n" not in out.getvalue()
+        reporter.problem("Quarantined photos/IMG_3.jpg: timed out")
+        assert out.getvalue().endswith("\r\x1b[KQuarantined photos/IMG_3.jpg: timed out\n")
+    finally:
+        progress.LIVE_INTERVAL = interval
+
+    assert [format_duration(s) for s in (45, 725, 12000)] == ["45s", "12m05s", "3h20m"]
+    print("✓ The status line stays on one line")
+
+if __name__ == "__main__":
+    test_summary()
+    test_verbose()
+    test_live()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Test the sharded full-text search index and its in-place updates
+"""
+
+import json
+import sys
+import tempfile
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent))
+
+from search_index import record_terms, tokenize, write_search_index
+
+def make_records():
+    return [
+        {"slug": "cafe", "title": "Café Crème", "description": "Morning in PARIS", "notes": None, "tags": ["places|France|Paris"]},
+        {"slug": "kyoto", "title": "Fushimi Inari", "description": None, "notes": "Straße, 2 a.m.", "tags": ["places|Japan|Kyoto"]},
+    ] + [{"slug": f"blank-{i}", "title": None, "description": None, "notes": None, "tags": None} for i in range(6)]
+
+def load_shard(index_dir, term):
+    index = json.loads((index_dir / "index.json").read_text())
+    shard = index["shards"][term[:index["prefixLength"]]]
+    terms = json.loads((index_dir / shard["file"]).read_text())
+    return {index["docs"][number] for number in terms.get(term, [])}
+
+def index_files(index_dir):
+    """Returns (files in the folder, files index.json refers to, index.json included)."""
+    index = json.loads((index_dir / "index.json").read_text())
+    return {path.name for path in index_dir.iterdir()}, {"index.json", *(shard["file"] for shard in index["shards"].values())}
+
+def test_tokenize():
+    """Test case and diacritic folding, word splitting and short words"""
+    assert tokenize("Ça Crème, x-ray à 5h!") == ["ca", "creme", "ray", "5h"]
+    assert tokenize("Straße") == ["strasse"]
+    assert record_terms(make_records()[1]) == {"fushimi", "inari", "strasse", "places", "japan", "kyoto"}
+
+    print("✓ Terms are folded")
+
+def test_incremental_index():
+    """Test lookups, stable doc numbers and that only changed shards are rewritten"""
+    with tempfile.TemporaryDirectory() as tmp:
+        index_dir = Path(tmp) / "photo_search"
+        records = make_records()
+        written, total = write_search_index(records, index_dir)
+        assert written == total
+        assert load_shard(index_dir, "paris") == {"cafe"} and load_shard(index_dir, "places") == {"cafe", "kyoto"}
+        assert load_shard(index_dir, "creme") == {"cafe"}
+
+        assert write_search_index(records, index_dir) == (0, total)
+
+        # A new photo only touches the shards of its terms; old photos keep their numbers
+        records.insert(0, {"slug": "lyon", "title": "Lyon", "description": None, "notes": None, "tags": ["places|France|Lyon"]})
+        written, total = write_search_index(records, index_dir)
+        assert written == 3  # "ly" (new), "pl" and "fr"
+        index = json.loads((index_dir / "index.json").read_text())
+        assert index["docs"][:2] == ["cafe", "kyoto"] and index["docs"][-1] == "lyon"
+        assert load_shard(index_dir, "france") == {"cafe", "lyon"}
+
+        # Removed photos leave a hole, and shards nobody uses any more are deleted
+        del records[2]
+        write_search_index(records, index_dir)
+        index = json.loads((index_dir / "index.json").read_text())
+        assert index["docs"][:2] == ["cafe", None] and len(index["docs"]) == 9
+        assert "ky" not in index["shards"] and not list(index_dir.glob("ky.*"))
+
+        # Once many photos are gone, the rest are renumbered in manifest order. Renumbered
+        # shards get new files, so a client with the old index.json never mixes up numbers.
+        old_files = {shard["file"] for shard in index["shards"].values()}
+        write_search_index(records[:2], index_dir)
+        index = json.loads((index_dir / "index.json").read_text())
+        assert index["docs"] == ["lyon", "cafe"]
+        assert load_shard(index_dir, "france") == {"cafe", "lyon"}
+        assert not old_files & {shard["file"] for shard in index["shards"].values()}
+        files, referenced = index_files(index_dir)
+        assert files == referenced  # The old shards are gone
+
+    print("✓ Search index is updated in place")
+
+if __name__ == "__main__":
+    test_tokenize()
+    test_incremental_index()
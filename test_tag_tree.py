@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Test hierarchical tags: extraction, exclusion and the tag tree
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent))
+
+from PIL import Image
+
+from generate_manifest import extract_photo_metadata, filter_tags
+from tag_tree import build_tag_tree
+
+XMP = b"""<x:xmpmeta xmlns:x="adobe:ns:meta/"><rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#">
+<rdf:Description xmlns:dc="http://purl.org/dc/elements/1.1/" xmlns:lr="http://ns.adobe.com/lightroom/1.0/">
+<dc:subject><rdf:Bag><rdf:li>Paris</rdf:li><rdf:li>exported</rdf:li></rdf:Bag></dc:subject>
+<lr:hierarchicalSubject><rdf:Bag><rdf:li>places|France|Paris</rdf:li><rdf:li>darktable|exported</rdf:li></rdf:Bag></lr:hierarchicalSubject>
+</rdf:Description></rdf:RDF></x:xmpmeta>"""
+
+def test_hierarchical_tags():
+    """Test that keyword paths are read from lr:hierarchicalSubject, apart from the tags, and filtered by any part"""
+    with tempfile.TemporaryDirectory() as tmp:
+        image_path = Path(tmp) / "paris.jpg"
+        Image.new("RGB", (32, 24)).save(image_path, xmp=XMP)
+        metadata = extract_photo_metadata(image_path)
+        assert metadata["tags"] == ["Paris"] and metadata["tagPaths"] == ["places|France|Paris"]
+
+    tags = ["darktable|format|avif", "Subjects|Street", "places|France", "RAW"]
+    assert filter_tags(tags) == ["Subjects|Street", "places|France"]
+    assert filter_tags(tags, {"subjects|street", "france"}) == ["darktable|format|avif", "RAW"]
+    assert filter_tags(["darktable|exported"]) is None
+
+    print("✓ Hierarchical tags extracted and filtered")
+
+def test_tag_tree():
+    """Test node counts and slugs, which include every descendant once"""
+    records = [
+        {"slug": "paris-1", "tags": ["Paris", "street"], "tagPaths": ["places|France|Paris", "subjects|street"]},
+        {"slug": "lyon", "tags": ["Lyon"], "tagPaths": ["places|France|Lyon"]},
+        {"slug": "untagged", "tags": None, "tagPaths": None},
+        {"slug": "paris-2", "tags": None, "tagPaths": ["places|France|Paris", "places|France|Lyon"]},
+        {"slug": "cat", "tags": ["favorite"], "tagPaths": None},  # Flat tags only
+        {"slug": "kyoto", "tags": None, "tagPaths": ["places| Japan |Kyoto"]},
+    ]
+    tree = build_tag_tree(records)
+    assert tree["tagged"] == 5 and tree["roots"] == ["favorite", "places", "subjects"]
+    nodes = tree["nodes"]
+    france = nodes["places|France"]
+    assert france["count"] == 3 and france["slugs"] == ["paris-1", "lyon", "paris-2"]
+    assert france["children"] == ["places|France|Lyon", "places|France|Paris"] and france["parent"] == "places"
+    assert nodes["places"]["count"] == 4 and nodes["places"]["cover"] == "paris-1"
+    assert nodes["places|France|Lyon"] == {
+        "name": "Lyon", "parent": "places|France", "children": [], "count": 2, "cover": "lyon", "slugs": ["lyon", "paris-2"],
+    }
+    assert nodes["places|Japan|Kyoto"]["slugs"] == ["kyoto"]
+    assert nodes["favorite"]["parent"] is None and nodes["favorite"]["children"] == []
+
+    print(f"✓ Tag tree: {len(nodes)} nodes")
+
+if __name__ == "__main__":
+    test_hierarchical_tags()
+    test_tag_tree()
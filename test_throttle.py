@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Test read-rate pacing and load-based pausing of throttled runs
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent))
+
+from PIL import Image
+
+from image_io import DECODER_THREADS_VARIABLE
+from isolated_worker import WorkerPool
+from throttle import THREAD_LIMIT_VARIABLES, Throttle, limit_threads
+
+class FakeClock:
+    """Clock that only advances when the throttle sleeps (or the test says so)."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+def test_read_rate_cap():
+    """Test that reads are paced to the byte rate after the initial one-second burst"""
+    clock = FakeClock()
+    throttle = Throttle(max_bytes_per_second=1000, clock=clock, sleep=clock.sleep)
+    for _ in range(10):
+        throttle.before_read(500)
+    assert abs(clock.now - 4.0) < 1e-9  # 5000 bytes: 1000 from the burst, 4000 at 1000 B/s
+    assert throttle.rate_pause == clock.now
+
+    # An idle gap only refills one second's worth
+    clock.now += 60
+    throttle.before_read(3000)
+    assert abs(clock.now - 66.0) < 1e-9
+
+    print(f"✓ Paused {throttle.rate_pause:g} s to stay under 1000 B/s")
+
+def test_pause_while_loaded():
+    """Test that reads wait until the load average drops below the threshold"""
+    clock = FakeClock()
+    loads = iter([3.5, 3.0, 2.5, 1.0])
+    throttle = Throttle(max_load=2.0, load_check_interval=5, clock=clock, sleep=clock.sleep,
+                        load_average=lambda: (next(loads), 0.0, 0.0))
+    throttle.before_read(1)
+    assert throttle.load_pause == 15 and clock.now == 15
+    throttle.before_read(1)  # Within the check interval: no new check
+    assert throttle.rate_pause == 0 and clock.now == 15
+
+    # A time budget ends the wait even if the load stays high
+    loads = iter([9.0] * 10)
+    clock.now = 100
+    throttle.before_read(1, deadline=112)
+    assert clock.now == 115
+
+    print(f"✓ Paused {throttle.load_pause:g} s for load")
+
+def avif_decoder_threads(image_path):
+    """Opens an AVIF file and returns the decoder thread cap it was opened with."""
+    import pillow_avif
+
+    from image_io import open_image
+
+    open_image(image_path).close()
+    return pillow_avif.AvifImagePlugin.DEFAULT_MAX_THREADS
+
+def test_thread_cap_reaches_pool_workers():
+    """Test that the decoder thread cap applies in worker processes started after it was set"""
+    import pillow_avif  # noqa: F401  Registers AVIF support in PIL
+
+    saved = {variable: os.environ.get(variable) for variable in (DECODER_THREADS_VARIABLE, *THREAD_LIMIT_VARIABLES)}
+    with tempfile.TemporaryDirectory() as tmp:
+        image_path = Path(tmp) / "photo.avif"
+        Image.new("RGB", (32, 24)).save(image_path)
+        try:
+            # The fork server is already running when the cap is set
+            with WorkerPool(1, 30) as pool:
+                pool.call(avif_decoder_threads, image_path)
+            limit_threads(3)
+            with WorkerPool(1, 30) as pool:
+                assert pool.call(avif_decoder_threads, image_path) == 3
+        finally:
+            for variable, value in saved.items():
+                if value is None:
+                    os.environ.pop(variable, None)
+                else:
+                    os.environ[variable] = value
+
+    print("✓ Pool workers decode with the thread cap")
+
+if __name__ == "__main__":
+    test_read_rate_cap()
+    test_pause_while_loaded()
+    test_thread_cap_reaches_pool_workers()
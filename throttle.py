@@ -0,0 +1,126 @@
+"""
+Throttling for background runs on the host that serves the collection.
+
+A full rescan reads every photo and keeps every core busy decoding, which competes with
+the web server for disk and CPU. In throttled mode the generator:
+
+- lowers its CPU (nice) and IO (ionice) scheduling priority; worker processes inherit it,
+- caps the threads the decoders and NumPy use (they default to one per core),
+- paces file reads to a maximum number of bytes per second, and
+- pauses while the 1-minute load average is above a threshold.
+
+Throttle only acts before a file's content is read, so files served from the cache cost
+nothing extra.
+"""
+
+import os
+import shutil
+import subprocess
+import threading
+import time
+
+# Environment variables read by the BLAS/OpenMP thread pools behind NumPy. They only take
+# effect in processes that import NumPy after they are set, which includes the worker.
+THREAD_LIMIT_VARIABLES = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS")
+
+
+def lower_priority(niceness=10):
+    """
+    Lowers the CPU and IO scheduling priority of this process (and of its future children).
+
+    Returns:
+        List of warnings for the parts that could not be applied
+    """
+    warnings = []
+    try:
+        os.nice(niceness)
+    except OSError as e:
+        warnings.append(f"Could not lower CPU priority: {e}")
+    # Best-effort class, lowest level: yields to other IO without starving entirely
+    if shutil.which("ionice"):
+        result = subprocess.run(
+            ["ionice", "-c", "2", "-n", "7", "-p", str(os.getpid())],
+            capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            warnings.append(f"Could not lower IO priority: {result.stderr.strip()}")
+    else:
+        warnings.append("Could not lower IO priority: ionice is not installed")
+    return warnings
+
+
+def limit_threads(max_workers):
+    """Caps the threads used by the image decoders and by NumPy in this process and its children."""
+    from image_io import DECODER_THREADS_VARIABLE
+
+    for variable in (DECODER_THREADS_VARIABLE, *THREAD_LIMIT_VARIABLES):
+        os.environ[variable] = str(max_workers)
+
+
+class Throttle:
+    """Paces file reads to a byte rate and pauses while the system load is too high."""
+
+    def __init__(self, max_bytes_per_second=None, max_load=None, load_check_interval=5.0,
+                 clock=time.monotonic, sleep=time.sleep, load_average=os.getloadavg):
+        """
+        Args:
+            max_bytes_per_second: Read rate cap, or None for no cap
+            max_load: 1-minute load average above which reads pause, or None
+            load_check_interval: Seconds between load average checks
+            clock, sleep, load_average: Injectable for tests
+        """
+        self.max_bytes_per_second = max_bytes_per_second
+        self.max_load = max_load
+        self.load_check_interval = load_check_interval
+        self.rate_pause = 0.0  # Total seconds slept to stay under the read rate
+        self.load_pause = 0.0  # Total seconds slept waiting for the load to drop
+        self._clock = clock
+        self._sleep = sleep
+        self._load_average = load_average
+        self._next_load_check = clock()
+        # Token bucket holding up to one second of reads, so short idle gaps are not
+        # followed by an unbounded burst
+        self._available = max_bytes_per_second or 0
+        self._refilled = clock()
+        self._lock = threading.Lock()
+
+    def before_read(self, nbytes, deadline=None):
+        """
+        Blocks until reading nbytes more stays within the rate cap and the load limit.
+
+        Args:
+            nbytes: Number of bytes about to be read
+            deadline: Clock time after which to stop waiting for the load to drop
+        """
+        # Collections generated concurrently share one throttle: reads queue up here
+        with self._lock:
+            if self.max_load is not None:
+                self._wait_for_load(deadline)
+            if self.max_bytes_per_second:
+                now = self._clock()
+                self._available = min(
+                    self.max_bytes_per_second,
+                    self._available + (now - self._refilled) * self.max_bytes_per_second,
+                )
+                self._refilled = now
+                self._available -= nbytes
+                if self._available < 0:
+                    delay = -self._available / self.max_bytes_per_second
+                    self._sleep(delay)
+                    self.rate_pause += delay
+                    self._available = 0
+                    self._refilled = self._clock()
+
+    def _wait_for_load(self, deadline):
+        if self._clock() < self._next_load_check:
+            return
+        load = self._load_average()[0]
+        if load > self.max_load:
+            print(f"Load average {load:.2f} is above {self.max_load:g}; pausing...")
+            while load > self.max_load and (deadline is None or self._clock() < deadline):
+                self._sleep(self.load_check_interval)
+                self.load_pause += self.load_check_interval
+                load = self._load_average()[0]
+            if load <= self.max_load:
+                print(f"Load average down to {load:.2f}; resuming.")
+        self._next_load_check = self._clock() + self.load_check_interval
@@ -1,54 +1,82 @@
 #!/usr/bin/env python3
 """
-Quick schema validation test for the generated manifest
+Batch schema validation of generated manifests.
+
+The generators already validate every new or changed record as they produce it; this
+script re-checks whole manifests and reports every error instead of stopping at the first.
+Without arguments it validates the photo and image manifests the generators write.
+
+Usage:
+    python validate_manifest.py [MANIFEST ...] [--schema SCHEMA]
 """
 
-import json
-import jsonschema
+import argparse
+import sys
 from pathlib import Path
 
-def validate_manifest():
-    """Validate the test manifest against the schema"""
-    
-    # Load schema
-    schema_path = Path("image_manifest.schema.json")
-    if not schema_path.exists():
-        print("Schema file not found")
-        return
-    
-    with open(schema_path) as f:
-        schema = json.load(f)
-    
-    # Load test manifest
-    manifest_path = Path("test_image_manifest.json")
-    if not manifest_path.exists():
-        print("Test manifest file not found")
-        return
-    
-    with open(manifest_path) as f:
-        manifest = json.load(f)
-    
+import generate_image_manifest
+import generate_manifest
+from manifest_stream import iter_records
+from manifest_validation import IMAGE_SCHEMA_FILE, PHOTO_SCHEMA_FILE, validate_manifest
+
+# Only show this many errors per manifest; the total is always reported
+MAX_REPORTED_ERRORS = 50
+
+
+def schema_for(manifest_path):
+    """Picks the schema matching a manifest file name."""
+    if Path(manifest_path).name.startswith("image_manifest"):
+        return IMAGE_SCHEMA_FILE
+    return PHOTO_SCHEMA_FILE
+
+
+def validate_file(manifest_path, schema_path=None):
+    """
+    Validates one manifest file and prints every error. Records are streamed, so the
+    manifest is never loaded whole.
+
+    Returns:
+        Number of errors found (1 if the file cannot be read)
+    """
+    schema_path = Path(schema_path) if schema_path else schema_for(manifest_path)
+    record_count = 0
+
+    def counted(records):
+        nonlocal record_count
+        for record_count, record in enumerate(records, 1):
+            yield record
+
     try:
-        jsonschema.validate(manifest, schema)
-        print(f"✅ Validation successful!")
-        print(f"📊 Validated {len(manifest)} images")
-        
-        # Show specific data types for key fields
-        if manifest:
-            sample = manifest[-1]  # Get the AVIF file (last in list)
-            print(f"\n🔍 Sample data types (from {sample['filename']}):")
-            print(f"  apertureValue: {type(sample.get('apertureValue')).__name__} = {sample.get('apertureValue')}")
-            print(f"  isoSpeedRatings: {type(sample.get('isoSpeedRatings')).__name__} = {sample.get('isoSpeedRatings')}")
-            print(f"  focalLength: {type(sample.get('focalLength')).__name__} = {sample.get('focalLength')}")
-            print(f"  exposureTime: {type(sample.get('exposureTime')).__name__} = {sample.get('exposureTime')}")
-            
-    except jsonschema.ValidationError as e:
-        print(f"❌ Validation failed:")
-        print(f"  Path: {' -> '.join(map(str, e.path))}")
-        print(f"  Error: {e.message}")
-        print(f"  Value: {e.instance}")
-    except Exception as e:
-        print(f"❌ Error during validation: {e}")
+        errors = validate_manifest(counted(iter_records(manifest_path)), schema_path)
+    except (OSError, ValueError) as e:
+        print(f"❌ Could not read {manifest_path}: {e}")
+        return 1
+
+    if not errors:
+        print(f"✅ {manifest_path}: {record_count} records match {schema_path.name}")
+        return 0
+    print(f"❌ {manifest_path}: {len(errors)} errors against {schema_path.name}")
+    for error in errors[:MAX_REPORTED_ERRORS]:
+        print(f"  {error}")
+    if len(errors) > MAX_REPORTED_ERRORS:
+        print(f"  ... and {len(errors) - MAX_REPORTED_ERRORS} more")
+    return len(errors)
+
+
+def main(args):
+    manifests = args.manifests
+    if not manifests:
+        defaults = [generate_manifest.OUTPUT_JSON_FILE, generate_image_manifest.OUTPUT_JSON_FILE]
+        manifests = [path for path in defaults if path.exists()]
+        if not manifests:
+            print("No manifest found. Pass the manifest files to validate.")
+            return 1
+    error_count = sum(validate_file(path, args.schema) for path in manifests)
+    return 1 if error_count else 0
+
 
 if __name__ == "__main__":
-    validate_manifest()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Validate manifests against their JSON schemas.")
+    parser.add_argument("manifests", nargs="*", type=str, help="Manifest files (default: the generators' outputs).")
+    parser.add_argument("--schema", type=str, help="Schema file (default: chosen from each manifest's file name).")
+    sys.exit(main(parser.parse_args()))